@@ -0,0 +1,105 @@
+"""
+Throughput of /query/batch against the same questions sent one at a time
+to /query.
+
+Usage (from backend/):
+    python -m benchmarks.batch_query_bench --questions 128
+    python -m benchmarks.batch_query_bench --queries queries.jsonl --concurrency 1,8
+
+Like e2e_bench, the app runs in-process with PROVIDERS=fake and an
+in-memory local index. The answer cache and the embedding cache are off,
+so both paths pay for every embed, search, rerank and completion.
+"Sequential" sends one /query at a time, the way the evaluation scripts
+do; with --concurrency > 1 that many /query calls are in flight instead.
+The batch path sends every question in one /query/batch request.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+# Must be set before main's components are built
+os.environ.setdefault("EMBED_CACHE_SIZE", "0")
+
+import httpx
+
+from benchmarks.e2e_bench import load_queries, run_ingest, synthetic_documents
+from benchmarks.load_test import DEFAULT_QUESTIONS
+
+
+def make_questions(base: List[str], count: int) -> List[str]:
+    # Numbered variants keep every question distinct
+    return [f"{base[i % len(base)]} ({i})" for i in range(count)]
+
+
+async def run_individual(client: httpx.AsyncClient, questions: List[str], concurrency: int) -> float:
+    pending = iter(questions)
+
+    async def worker():
+        for q in pending:
+            resp = await client.post("/query", json={"q": q})
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_batch(client: httpx.AsyncClient, questions: List[str]) -> float:
+    start = time.perf_counter()
+    answered = 0
+    async with client.stream("POST", "/query/batch", json={"questions": questions}) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line and '"index"' in line:
+                answered += 1
+    elapsed = time.perf_counter() - start
+    if answered != len(questions):
+        print(f"[WARN] batch answered {answered}/{len(questions)} questions")
+    return elapsed
+
+
+async def main(args) -> None:
+    import main as app_module
+
+    base = load_queries(args.queries) if args.queries else DEFAULT_QUESTIONS
+    questions = make_questions(base, args.questions)
+    docs = synthetic_documents(args.documents, args.words, args.seed)
+
+    # The ASGI transport does not run the app's lifespan: warm up by hand
+    await app_module.components.warmup()
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        timeout=args.timeout,
+    ) as client:
+        await run_ingest(client, docs, concurrency=4)
+
+        print(f"{len(questions)} questions, "
+              f"BATCH_QUERY_CONCURRENCY={app_module.BATCH_QUERY_CONCURRENCY}")
+        print(f"{'path':>22} {'seconds':>8} {'questions/s':>12}")
+        for level in [int(x) for x in args.concurrency.split(",")]:
+            elapsed = await run_individual(client, questions, level)
+            label = "sequential /query" if level == 1 else f"/query x{level}"
+            print(f"{label:>22} {elapsed:>8.2f} {len(questions) / elapsed:>12.1f}")
+
+        elapsed = await run_batch(client, questions)
+        print(f"{'/query/batch':>22} {elapsed:>8.2f} {len(questions) / elapsed:>12.1f}")
+
+    await app_module.components.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=128)
+    parser.add_argument("--queries", help="JSONL file with a q or title field per line")
+    parser.add_argument("--concurrency", default="1", help="/query concurrency levels to compare")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+"""
+Bulk PDF extraction + chunking throughput against process-pool size.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_ingest_bench --files 64 --pages 20 --workers 1,2,4,8
+    python -m benchmarks.bulk_ingest_bench --pdfs path/to/pdfs --workers 1,2,4
+
+Without --pdfs, simple text PDFs are generated in memory. Only the CPU-bound
+part (rag.bulk.process_file in a spawn pool) is measured; embedding and
+upserting are covered by embed_throughput and e2e_bench.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import random
+import time
+from typing import List, Tuple
+
+from rag.bulk import process_file
+
+
+VOCABULARY = (
+    "document extraction page text chunk token embedding vector index "
+    "query search ranking model latency throughput worker process pool"
+).split()
+
+CHUNKER_PARAMS = {"min_tokens": 800, "max_tokens": 1200, "overlap_ratio": 0.12}
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal PDF with one Helvetica text line per entry on each page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    return bytes(out)
+
+
+def synthetic_pdfs(count: int, pages: int, seed: int) -> List[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    files = []
+    for i in range(count):
+        doc = []
+        for _ in range(pages):
+            lines = []
+            for _ in range(60):
+                words = " ".join(rng.choice(VOCABULARY) for _ in range(12))
+                lines.append(words.capitalize() + ".")
+            doc.append(lines)
+        files.append((f"synthetic-{i}.pdf", make_pdf(doc)))
+    return files
+
+
+def load_pdfs(path: str) -> List[Tuple[str, bytes]]:
+    files = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(path, name), "rb") as f:
+                files.append((name, f.read()))
+    return files
+
+
+async def run_case(files: List[Tuple[str, bytes]], workers: int) -> Tuple[float, int, int]:
+    loop = asyncio.get_running_loop()
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        # Warm the workers so process start-up is not measured
+        await asyncio.gather(*(
+            loop.run_in_executor(pool, process_file, "warmup.txt", b"Warm up.", "main", CHUNKER_PARAMS)
+            for _ in range(workers)
+        ))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, process_file, name, data, "main", CHUNKER_PARAMS)
+            for name, data in files
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    pages = sum(r["pages"] for r in results)
+    chunks = sum(len(r["chunks"]) for r in results)
+    return elapsed, pages, chunks
+
+
+async def main(args) -> None:
+    files = load_pdfs(args.pdfs) if args.pdfs else synthetic_pdfs(args.files, args.pages, args.seed)
+    levels = [int(x) for x in args.workers.split(",")]
+
+    print(f"{len(files)} files, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'pages/s':>9} {'chunks/s':>9} {'seconds':>8} {'speedup':>8}")
+    baseline = None
+    for workers in levels:
+        elapsed, pages, chunks = await run_case(files, workers)
+        rate = pages / elapsed
+        baseline = baseline or rate
+        print(
+            f"{workers:>7} {rate:>9.1f} {chunks / elapsed:>9.1f} "
+            f"{elapsed:>8.2f} {rate / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdfs", help="directory of PDFs to use instead of generated ones")
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", default="1,2,4")
+    asyncio.run(main(parser.parse_args()))
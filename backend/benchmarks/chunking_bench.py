@@ -0,0 +1,152 @@
+"""
+Chunking micro-benchmark: throughput (MB/s) and allocations.
+
+Usage (from backend/):
+    python -m benchmarks.chunking_bench --sizes 10KB,100KB,1MB,10MB,50MB
+
+Compares SentenceAwareChunker with the previous per-sentence engine
+(kept below as `legacy_chunk`, minus its debug logging) and checks that
+both produce identical chunks. The legacy engine is skipped above
+--legacy-max because its overlap loop re-encodes sentences.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import List, Dict, Any, Callable
+
+from rag.chunking import SentenceAwareChunker
+
+
+WORDS = (
+    "retrieval augmented generation grounds language model answers in "
+    "documents vector databases store dense embeddings for similarity search "
+    "rerankers reorder candidates chunking splits text into overlapping windows"
+).split()
+
+
+def make_text(n_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < n_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))
+        sentence = sentence.capitalize() + rng.choice([". ", "! ", "? ", ".\n"])
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def legacy_chunk(chunker: SentenceAwareChunker, text: str) -> List[Dict[str, Any]]:
+    """The previous engine: encode per sentence, re-encode for overlap."""
+    count = lambda s: len(chunker.encoding.encode_ordinary(s))
+    sentences = chunker._split_sentences(text)
+
+    chunks = []
+    current_chunk: List[str] = []
+    current_tokens = 0
+    position = 0
+
+    for sentence in sentences:
+        sentence_tokens = count(sentence)
+        if current_tokens + sentence_tokens > chunker.max_tokens and current_chunk:
+            if current_tokens >= chunker.min_tokens:
+                chunks.append({
+                    "text": " ".join(current_chunk),
+                    "source": "bench",
+                    "title": "bench",
+                    "section": "bench",
+                    "position": position,
+                    "token_count": current_tokens,
+                })
+                position += 1
+
+                overlap_tokens = int(current_tokens * chunker.overlap_ratio)
+                overlap_sentences: List[str] = []
+                overlap_count = 0
+                for s in reversed(current_chunk):
+                    s_tokens = count(s)
+                    if overlap_count + s_tokens <= overlap_tokens:
+                        overlap_sentences.insert(0, s)
+                        overlap_count += s_tokens
+                    else:
+                        break
+                current_chunk = overlap_sentences
+                current_tokens = overlap_count
+
+        current_chunk.append(sentence)
+        current_tokens += sentence_tokens
+
+    if current_chunk and current_tokens > 0:
+        chunks.append({
+            "text": " ".join(current_chunk),
+            "source": "bench",
+            "title": "bench",
+            "section": "bench",
+            "position": position,
+            "token_count": current_tokens,
+        })
+    return chunks
+
+
+def measure(fn: Callable[[], Any], n_bytes: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+
+    # Separate run for allocation stats; tracemalloc slows execution
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    return {
+        "result": result,
+        "mb_s": n_bytes / (1 << 20) / elapsed,
+        "peak_mb": peak / (1 << 20),
+        "live_blocks": blocks,
+    }
+
+
+def parse_size(value: str) -> int:
+    units = {"KB": 1 << 10, "MB": 1 << 20}
+    for suffix, mult in units.items():
+        if value.upper().endswith(suffix):
+            return int(float(value[:-2]) * mult)
+    return int(value)
+
+
+def main(args) -> None:
+    chunker = SentenceAwareChunker()
+    legacy_max = parse_size(args.legacy_max)
+
+    print(f"{'size':>8} {'engine':>7} {'MB/s':>8} {'peak MB':>9} {'blocks':>9}  match")
+    for label in args.sizes.split(","):
+        n_bytes = parse_size(label)
+        text = make_text(n_bytes)
+
+        new = measure(
+            lambda: chunker.chunk(text, source="bench", title="bench", section="bench"),
+            n_bytes,
+        )
+        print(
+            f"{label:>8} {'new':>7} {new['mb_s']:>8.2f} "
+            f"{new['peak_mb']:>9.2f} {new['live_blocks']:>9}"
+        )
+
+        if n_bytes <= legacy_max:
+            old = measure(lambda: legacy_chunk(chunker, text), n_bytes)
+            match = old["result"] == new["result"]
+            print(
+                f"{label:>8} {'legacy':>7} {old['mb_s']:>8.2f} "
+                f"{old['peak_mb']:>9.2f} {old['live_blocks']:>9}  {match}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10KB,100KB,1MB,10MB,50MB")
+    parser.add_argument("--legacy-max", default="10MB")
+    main(parser.parse_args())
@@ -0,0 +1,317 @@
+"""
+Offline end-to-end benchmark of /ingest and /query.
+
+Usage (from backend/):
+    python -m benchmarks.e2e_bench --levels 1,4,16 --save-baseline bench_baseline.json
+    python -m benchmarks.e2e_bench --levels 1,4,16 --baseline bench_baseline.json
+
+The app runs in-process behind httpx's ASGI transport with PROVIDERS=fake
+and an in-memory local index, so no API keys or servers are needed. Set
+PROVIDERS, VECTOR_BACKEND or QDRANT_LOCATION yourself to benchmark other
+setups. Fake provider latency is controlled by the FAKE_*_MS variables.
+
+Documents come from --docs (.txt/.md/.pdf files) or are generated. Queries
+come from --queries, a JSONL file whose lines have a "q" (or "title") field,
+e.g. requests.jsonl. For every concurrency level the report has throughput,
+client p50/p95/p99 and p50/p95/p99 of each stage in metrics.stages.
+With --baseline, p95 latency and throughput are compared against a saved
+run and the exit code is 1 if any regress by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+from typing import List, Dict, Any, Tuple
+
+# Must be set before main's components are built
+os.environ.setdefault("PROVIDERS", "fake")
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("LOCAL_INDEX_PATH", "")
+# Replayed queries would otherwise be answered from the semantic cache
+os.environ.setdefault("ANSWER_CACHE_SIZE", "0")
+
+import httpx
+
+from benchmarks.load_test import DEFAULT_QUESTIONS, _percentile
+
+
+VOCABULARY = (
+    "retrieval augmented generation vector database embedding index query "
+    "chunk token model latency throughput cache rerank citation document "
+    "neural network training inference gradient transformer attention "
+    "storage memory cluster shard replica search ranking relevance score"
+).split()
+
+
+def synthetic_documents(count: int, words: int, seed: int) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        sentences = []
+        remaining = words
+        while remaining > 0:
+            n = rng.randint(8, 24)
+            sentences.append(" ".join(rng.choice(VOCABULARY) for _ in range(n)).capitalize() + ".")
+            remaining -= n
+        docs.append((f"synthetic-{i}.txt", " ".join(sentences)))
+    return docs
+
+
+def load_documents(path: str) -> List[Tuple[str, bytes]]:
+    docs = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".txt", ".md", ".pdf")):
+            with open(os.path.join(path, name), "rb") as f:
+                docs.append((name, f.read()))
+    return docs
+
+
+def load_queries(path: str) -> List[str]:
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            q = record.get("q") or record.get("title")
+            if q:
+                queries.append(q)
+    return queries
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(_percentile(values, 50), 3),
+        "p95": round(_percentile(values, 95), 3),
+        "p99": round(_percentile(values, 99), 3),
+    }
+
+
+def stage_summary(stage_samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    by_stage: Dict[str, List[float]] = {}
+    for sample in stage_samples:
+        for key, ms in sample.items():
+            by_stage.setdefault(key[:-3] if key.endswith("_ms") else key, []).append(ms)
+    return {name: summarize(values) for name, values in sorted(by_stage.items())}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_ingest(
+    client: httpx.AsyncClient,
+    docs: List[Tuple[str, Any]],
+    concurrency: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    stages: List[Dict[str, float]] = []
+    chunks = 0
+    errors = 0
+    pending = iter(docs)
+
+    async def worker():
+        nonlocal chunks, errors
+        for name, content in pending:
+            start = time.perf_counter()
+            try:
+                if isinstance(content, str):
+                    resp = await client.post("/ingest", data={"text": content, "source": name})
+                else:
+                    resp = await client.post(
+                        "/ingest",
+                        data={"source": name},
+                        files={"file": (name, content)},
+                    )
+                resp.raise_for_status()
+            except Exception as e:
+                errors += 1
+                print(f"[WARN] Ingest of {name} failed: {e}")
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            body = resp.json()
+            chunks += body["count"]
+            stages.append((body.get("metrics") or {}).get("stages", {}))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "documents": len(latencies),
+        "chunks": chunks,
+        "errors": errors,
+        "docs_per_s": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_s": round(chunks / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": stage_summary(stages),
+    }
+
+
+async def run_queries(
+    client: httpx.AsyncClient,
+    queries: List[str],
+    concurrency: int,
+    total: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    stages: List[Dict[str, float]] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                resp = await client.post("/query", json={"q": queries[i % len(queries)]})
+                resp.raise_for_status()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            stages.append(resp.json()["metrics"].get("stages", {}))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "qps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": stage_summary(stages),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    ingest = report["ingest"]
+    print(
+        f"ingest: {ingest['documents']} docs, {ingest['chunks']} chunks, "
+        f"{ingest['docs_per_s']:.2f} docs/s, {ingest['chunks_per_s']:.1f} chunks/s, "
+        f"p95 {ingest['latency_ms']['p95']:.1f} ms, errors {ingest['errors']}"
+    )
+    for name, s in ingest["stages_ms"].items():
+        print(f"    {name:<12} p50 {s['p50']:>9.2f}  p95 {s['p95']:>9.2f}  p99 {s['p99']:>9.2f} ms")
+
+    for level in report["query"]:
+        lat = level["latency_ms"]
+        print(
+            f"query x{level['concurrency']}: {level['qps']:.2f} q/s, "
+            f"p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  p99 {lat['p99']:.1f} ms, "
+            f"errors {level['errors']}"
+        )
+        for name, s in level["stages_ms"].items():
+            print(f"    {name:<12} p50 {s['p50']:>9.2f}  p95 {s['p95']:>9.2f}  p99 {s['p99']:>9.2f} ms")
+
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond tolerance in query p95 / q/s and ingest throughput."""
+    regressions = []
+    old_levels = {level["concurrency"]: level for level in baseline.get("query", [])}
+    for level in report["query"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        c = level["concurrency"]
+        new_p95, old_p95 = level["latency_ms"]["p95"], old["latency_ms"]["p95"]
+        if old_p95 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"query x{c} p95 {old_p95:.1f} -> {new_p95:.1f} ms")
+        if old["qps"] and level["qps"] < old["qps"] * (1 - tolerance):
+            regressions.append(f"query x{c} throughput {old['qps']:.2f} -> {level['qps']:.2f} q/s")
+
+    old_ingest = baseline.get("ingest", {}).get("chunks_per_s")
+    new_ingest = report["ingest"]["chunks_per_s"]
+    if old_ingest and new_ingest < old_ingest * (1 - tolerance):
+        regressions.append(f"ingest {old_ingest:.1f} -> {new_ingest:.1f} chunks/s")
+
+    old_rss = baseline.get("peak_rss_mb")
+    if old_rss and report["peak_rss_mb"] > old_rss * (1 + tolerance):
+        regressions.append(f"peak RSS {old_rss} -> {report['peak_rss_mb']} MB")
+    return regressions
+
+
+async def main(args) -> int:
+    import main as app_module
+
+    if args.docs:
+        docs = load_documents(args.docs)
+    else:
+        docs = synthetic_documents(args.documents, args.words, args.seed)
+    queries = load_queries(args.queries) if args.queries else DEFAULT_QUESTIONS
+    levels = [int(x) for x in args.levels.split(",")]
+
+    # The ASGI transport does not run the app's lifespan: warm up by hand
+    await app_module.components.warmup()
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        timeout=args.timeout,
+    ) as client:
+        ingest = await run_ingest(client, docs, args.ingest_concurrency)
+        results = []
+        for level in levels:
+            total = max(args.requests, level)
+            results.append(await run_queries(client, queries, level, total))
+
+    await app_module.components.close()
+
+    report = {
+        "config": {
+            "providers": os.getenv("PROVIDERS"),
+            "vector_backend": os.getenv("VECTOR_BACKEND"),
+            "documents": len(docs),
+            "queries": len(queries),
+            "requests": args.requests,
+        },
+        "ingest": ingest,
+        "query": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", help="directory of .txt/.md/.pdf files")
+    parser.add_argument("--documents", type=int, default=20, help="synthetic documents")
+    parser.add_argument("--words", type=int, default=3000, help="words per synthetic document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", help="JSONL file with a q or title field per line")
+    parser.add_argument("--levels", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=64, help="queries per level")
+    parser.add_argument("--ingest-concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(asyncio.run(main(parser.parse_args())))
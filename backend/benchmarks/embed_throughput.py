@@ -0,0 +1,74 @@
+"""
+Embedding throughput against batch size and in-flight concurrency.
+
+Usage (from backend/):
+    python -m benchmarks.embed_throughput --chunks 2000
+
+Uses a simulated provider whose latency is a fixed round-trip cost plus a
+per-text cost, so the numbers show how batching and concurrency amortise
+round trips. Pass --live to hit Cohere instead (needs COHERE_API_KEY).
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import List
+
+from rag.embeddings import EmbeddingGenerator
+
+
+class SimulatedEmbedClient:
+    def __init__(self, rtt_ms: float, per_text_ms: float, dimension: int = 1024):
+        self.rtt_ms = rtt_ms
+        self.per_text_ms = per_text_ms
+        self.dimension = dimension
+
+    async def embed(self, texts: List[str], model: str, input_type: str):
+        await asyncio.sleep((self.rtt_ms + self.per_text_ms * len(texts)) / 1000)
+        return SimpleNamespace(embeddings=[[0.0] * self.dimension for _ in texts])
+
+    async def close(self) -> None:
+        pass
+
+
+async def run_case(args, batch_size: int, concurrency: int) -> float:
+    client = None if args.live else SimulatedEmbedClient(args.rtt_ms, args.per_text_ms)
+    generator = EmbeddingGenerator(
+        client=client,
+        max_batch_size=batch_size,
+        max_concurrency=concurrency,
+    )
+
+    texts = [f"chunk {i} " + "lorem ipsum " * 80 for i in range(args.chunks)]
+    token_counts = [len(t) // 4 for t in texts]
+
+    start = time.perf_counter()
+    vectors = await generator.embed(texts, mode="document", token_counts=token_counts)
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == len(texts)
+
+    await generator.close()
+    return len(texts) / elapsed
+
+
+async def main(args) -> None:
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",")]
+    levels = [int(x) for x in args.concurrency.split(",")]
+
+    print("chunks/s  (rows: batch size, columns: in-flight limit)")
+    print(f"{'batch':>6} " + " ".join(f"{c:>9}" for c in levels))
+    for bs in batch_sizes:
+        row = [await run_case(args, bs, c) for c in levels]
+        print(f"{bs:>6} " + " ".join(f"{r:>9.1f}" for r in row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="8,32,64,96")
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument("--rtt-ms", type=float, default=120.0)
+    parser.add_argument("--per-text-ms", type=float, default=2.0)
+    parser.add_argument("--live", action="store_true")
+    asyncio.run(main(parser.parse_args()))
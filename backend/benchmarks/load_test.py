@@ -0,0 +1,102 @@
+"""
+Concurrent /query load test against a single running worker.
+
+Usage (from backend/):
+    uvicorn main:app --workers 1 --port 8000
+    python -m benchmarks.load_test --url http://localhost:8000 --levels 1,2,4,8,16
+
+For every concurrency level the same number of requests is sent and the
+achieved throughput is reported. With a non-blocking pipeline, queries/s
+should grow with concurrency until an upstream limit is reached; with a
+blocking pipeline it stays flat at roughly 1 / latency.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Dict, Any
+
+import httpx
+
+
+DEFAULT_QUESTIONS = [
+    "What is retrieval-augmented generation?",
+    "Which vector databases are mentioned?",
+    "What are the steps of the RAG pipeline?",
+    "How are machine learning and deep learning related?",
+]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    url: str,
+    concurrency: int,
+    total: int,
+    questions: List[str],
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            q = questions[i % len(questions)]
+            start = time.perf_counter()
+            try:
+                resp = await client.post(f"{url}/query", json={"q": q})
+                resp.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+    }
+
+
+async def main(args) -> None:
+    levels = [int(x) for x in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=max(levels))
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        print(f"{'conc':>5} {'reqs':>5} {'err':>4} {'qps':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        baseline = None
+        for level in levels:
+            total = max(args.requests, level)
+            r = await run_level(client, args.url, level, total, DEFAULT_QUESTIONS)
+            baseline = baseline or r["qps"]
+            speedup = r["qps"] / baseline if baseline else 0.0
+            print(
+                f"{r['concurrency']:>5} {r['requests']:>5} {r['errors']:>4} "
+                f"{r['qps']:>8.2f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f}"
+                f"   x{speedup:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--levels", default="1,2,4,8,16")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,270 @@
+"""
+Compact collection modes: memory per million chunks and recall@k
+against exact float32 search.
+
+Usage (from backend/):
+    python -m benchmarks.quantization_bench --vectors 50000 --k 8
+    python -m benchmarks.quantization_bench --corpus ../docs --oversampling 1,2,4
+    python -m benchmarks.quantization_bench --vectors 20000 --qdrant   # needs QDRANT_URL
+
+Without --qdrant, recall is simulated in numpy, the way Qdrant does it.
+Candidates are scored on the quantized vectors (brute force, no HNSW
+error), and the top k * oversampling are rescored with the originals.
+With --qdrant, each mode gets a real collection built through
+QdrantVectorStore and is compared to an exact search.
+
+Vectors are clustered Gaussian 1024-D. Pure noise would understate what
+binary quantization does on real embeddings. Text sizes come from
+--corpus (chunked like /ingest) or from generated sentences.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import zlib
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+
+MODES = ("float32", "scalar", "binary")
+
+VOCABULARY = (
+    "the model retrieval document dataset training evaluation embedding "
+    "vector index query chunk section result baseline accuracy latency "
+    "benchmark method approach experiment table figure layer attention"
+).split()
+
+
+# ---- DATA ----
+def clustered_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), count)]
+    queries = picks + 0.05 * rng.standard_normal(picks.shape, dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def sample_texts(corpus: Optional[str], count: int, seed: int) -> List[str]:
+    if corpus:
+        from rag.chunking import SentenceAwareChunker
+
+        chunker = SentenceAwareChunker()
+        texts = []
+        for name in sorted(os.listdir(corpus)):
+            if name.lower().endswith((".txt", ".md")):
+                with open(os.path.join(corpus, name), "r", encoding="utf-8") as f:
+                    texts.extend(c["text"] for c in chunker.chunk(f.read(), source=name))
+        if texts:
+            return texts[:count]
+        print(f"[WARN] No .txt/.md files in {corpus}; using generated text")
+
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(600, 900))) + "."
+        for _ in range(count)
+    ]
+
+
+# ---- MEMORY ----
+def memory_per_million(
+    dim: int,
+    mode: str,
+    on_disk: bool,
+    hnsw_m: int,
+    payload_bytes: float,
+) -> Dict[str, float]:
+    """
+    Approximate RAM and disk bytes for 1M points, following Qdrant's storage
+    layout: originals are float32, scalar codes are 1 byte per dimension
+    plus a float offset, binary codes are 1 bit per dimension. HNSW keeps
+    2 * m links of 4 bytes per point on level 0.
+    """
+    n = 1_000_000
+    original = n * dim * 4
+    quantized = {
+        "float32": 0,
+        "scalar": n * (dim + 4),
+        "binary": n * dim // 8,
+    }[mode]
+    graph = n * 2 * hnsw_m * 4
+
+    ram = quantized + (0 if on_disk else original + graph) + n * payload_bytes
+    disk = original + quantized + graph + n * payload_bytes
+    return {"ram_gb": ram / 1e9, "disk_gb": disk / 1e9}
+
+
+# ---- SIMULATED RECALL ----
+def scalar_codes(vectors: np.ndarray, quantile: float = 0.99) -> Tuple[np.ndarray, float, float]:
+    lo = float(np.quantile(vectors, 1 - quantile))
+    hi = float(np.quantile(vectors, quantile))
+    codes = np.round((np.clip(vectors, lo, hi) - lo) / (hi - lo) * 255)
+    # Kept as float32 so each query is one matmul; values are 0..255
+    return codes.astype(np.float32), lo, hi
+
+
+def quantized_scores(mode: str, codes, query: np.ndarray) -> np.ndarray:
+    if mode == "scalar":
+        codes, lo, hi = codes
+        # Dequantized dot product; the offset term is constant per query
+        return codes @ query * ((hi - lo) / 255)
+    # Binary: agreement of sign bits
+    return (codes == (query > 0)).sum(axis=1).astype(np.float32)
+
+
+def simulated_recall(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    mode: str,
+    k: int,
+    oversampling: float,
+    exact: np.ndarray,
+) -> Tuple[float, float]:
+    codes = scalar_codes(vectors) if mode == "scalar" else vectors > 0
+    fetch = max(k, int(k * oversampling))
+
+    hits = 0
+    start = time.perf_counter()
+    for query, truth in zip(queries, exact):
+        scores = quantized_scores(mode, codes, query)
+        candidates = np.argpartition(-scores, fetch)[:fetch]
+        rescored = candidates[np.argsort(-(vectors[candidates] @ query))[:k]]
+        hits += len(set(rescored.tolist()) & set(truth.tolist()))
+    elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+    return hits / (len(queries) * k), elapsed
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, 1), 1), 1)
+
+
+# ---- QDRANT RECALL ----
+async def qdrant_recall(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    mode: str,
+    k: int,
+    oversampling: float,
+    args,
+) -> Tuple[float, float]:
+    from qdrant_client.models import SearchParams
+
+    from rag.vectorstore import QdrantVectorStore
+
+    store = QdrantVectorStore(
+        collection_name=f"quant_bench_{mode}",
+        recreate=True,
+        quantization=None if mode == "float32" else mode,
+        oversampling=oversampling,
+        on_disk=args.on_disk,
+        hnsw_m=args.hnsw_m,
+        hnsw_ef_construct=args.ef_construct,
+        search_ef=args.search_ef,
+    )
+    store.dimension = vectors.shape[1]
+
+    try:
+        for lo in range(0, len(vectors), 1000):
+            batch = vectors[lo:lo + 1000]
+            chunks = [
+                {"text": "", "source": "bench", "position": lo + i}
+                for i in range(len(batch))
+            ]
+            await store.upsert_chunks(chunks, batch.tolist())
+
+        # Wait for the optimizer to finish building the index
+        while (await store.client.get_collection(store.collection_name)).status != "green":
+            await asyncio.sleep(1)
+
+        hits = 0
+        latencies = []
+        for query in queries:
+            exact = await store.client.search(
+                collection_name=store.collection_name,
+                query_vector=query.tolist(),
+                search_params=SearchParams(exact=True),
+                limit=k,
+            )
+            start = time.perf_counter()
+            approx = await store.search(query.tolist(), limit=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len({p.id for p in exact} & {h["id"] for h in approx})
+
+        return hits / (len(queries) * k), float(np.median(latencies))
+    finally:
+        await store.client.delete_collection(store.collection_name)
+        await store.close()
+
+
+async def main(args) -> None:
+    texts = sample_texts(args.corpus, args.text_samples, args.seed)
+    raw = np.mean([len(t.encode("utf-8")) for t in texts])
+    compressed = np.mean([len(zlib.compress(t.encode("utf-8"), 6)) for t in texts])
+    # Non-text payload fields (source, title, section, position, hashes)
+    meta_bytes = 160
+
+    print(f"chunk text: {raw:.0f} B raw, {compressed:.0f} B compressed "
+          f"({raw / compressed:.1f}x) over {len(texts)} samples")
+    print(f"\nMemory per 1M chunks (dim={args.dim}, m={args.hnsw_m})")
+    print(f"{'mode':>8} {'on_disk':>8} {'text':>10} {'RAM GB':>8} {'disk GB':>8}")
+    for mode in MODES:
+        for on_disk in (False, True):
+            for text, payload in (("payload", raw + meta_bytes), ("side", meta_bytes)):
+                m = memory_per_million(args.dim, mode, on_disk, args.hnsw_m, payload)
+                print(f"{mode:>8} {str(on_disk):>8} {text:>10} "
+                      f"{m['ram_gb']:>8.2f} {m['disk_gb']:>8.2f}")
+    print(f"side store on local disk: {compressed * 1e6 / 1e9:.2f} GB per 1M chunks")
+
+    vectors = clustered_vectors(args.vectors, args.dim, args.clusters, args.seed)
+    queries = make_queries(vectors, args.queries, args.seed + 1)
+    oversamplings = [float(x) for x in args.oversampling.split(",")]
+
+    where = "Qdrant" if args.qdrant else "simulated"
+    print(f"\nrecall@{args.k} vs exact float32 ({where}, {args.vectors} vectors)")
+    print(f"{'mode':>8} {'oversample':>10} {'recall':>8} {'ms/query':>9}")
+
+    exact = None if args.qdrant else exact_top_k(vectors, queries, args.k)
+    for mode in MODES:
+        for oversampling in (oversamplings if mode != "float32" else [1.0]):
+            if args.qdrant:
+                recall, ms = await qdrant_recall(
+                    vectors, queries, mode, args.k, oversampling, args
+                )
+            elif mode == "float32":
+                recall, ms = 1.0, 0.0
+            else:
+                recall, ms = simulated_recall(
+                    vectors, queries, mode, args.k, oversampling, exact
+                )
+            print(f"{mode:>8} {oversampling:>10.1f} {recall:>8.3f} {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--oversampling", default="1,2,4")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--ef-construct", type=int, default=None)
+    parser.add_argument("--search-ef", type=int, default=None)
+    parser.add_argument("--on-disk", action="store_true")
+    parser.add_argument("--corpus", help="directory of .txt/.md files for text sizes")
+    parser.add_argument("--text-samples", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--qdrant", action="store_true", help="measure against QDRANT_URL")
+    asyncio.run(main(parser.parse_args()))
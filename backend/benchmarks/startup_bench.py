@@ -0,0 +1,107 @@
+"""
+Startup time of the API: process spawn to listening, and to ready.
+
+Usage (from backend/):
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --runs 5 --live    # real providers from .env
+
+Each run starts `uvicorn main:app` in a fresh process and polls it.
+- import-to-listen: spawn until GET /healthz answers 200 (the port is open)
+- import-to-ready: spawn until GET /readyz answers 200 (components built,
+  provider connections open)
+- first query: latency of one /query right after ready
+
+By default PROVIDERS=fake with an in-memory local index is used. The
+numbers then cover imports, the tokenizer and component construction,
+but not provider round trips.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(client: httpx.Client, path: str, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def run_once(env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = start + timeout
+            listening = _wait_for(client, "/healthz", deadline)
+            ready = _wait_for(client, "/readyz", deadline)
+            if listening is None or ready is None:
+                raise RuntimeError(f"server not ready within {timeout}s")
+
+            query_start = time.perf_counter()
+            client.post("/query", json={"q": "What is retrieval-augmented generation?"})
+            first_query = time.perf_counter() - query_start
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "listen_ms": (listening - start) * 1000,
+        "ready_ms": (ready - start) * 1000,
+        "first_query_ms": first_query * 1000,
+    }
+
+
+def main(args) -> None:
+    env = dict(os.environ)
+    if not args.live:
+        env.setdefault("PROVIDERS", "fake")
+        env.setdefault("VECTOR_BACKEND", "local")
+        env.setdefault("LOCAL_INDEX_PATH", "")
+
+    runs: List[Dict[str, float]] = []
+    for i in range(args.runs):
+        result = run_once(env, args.timeout)
+        runs.append(result)
+        print(f"run {i + 1}: listen {result['listen_ms']:.0f} ms, "
+              f"ready {result['ready_ms']:.0f} ms, "
+              f"first query {result['first_query_ms']:.0f} ms")
+
+    print(f"\nmedian of {len(runs)} runs")
+    for key, label in (
+        ("listen_ms", "import-to-listen"),
+        ("ready_ms", "import-to-ready"),
+        ("first_query_ms", "first query"),
+    ):
+        print(f"{label:>18}: {statistics.median(r[key] for r in runs):8.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--live", action="store_true", help="use the providers configured in the environment")
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+"""
+Search latency: LocalVectorStore vs QdrantVectorStore.
+
+Usage (from backend/):
+    python -m benchmarks.vectorstore_bench --sizes 10000,100000,1000000 --dtype float16
+    python -m benchmarks.vectorstore_bench --sizes 10000 --qdrant   # needs QDRANT_URL
+
+Vectors are random 1024-D, so this measures the search path itself
+(scoring, top-k, payload assembly and, for Qdrant, the network round trip).
+1M float32 vectors need ~4 GB of RAM; float16 halves that.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+
+from rag.local_vectorstore import LocalVectorStore
+
+
+def make_chunks(start: int, end: int) -> List[Dict[str, Any]]:
+    return [
+        {"text": f"chunk {i}", "source": f"doc{i // 50}", "position": i % 50}
+        for i in range(start, end)
+    ]
+
+
+async def populate(store, n: int, dim: int, batch: int = 5000) -> float:
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for lo in range(0, n, batch):
+        hi = min(lo + batch, n)
+        vectors = rng.standard_normal((hi - lo, dim), dtype=np.float32)
+        await store.upsert_chunks(make_chunks(lo, hi), vectors.tolist())
+    return time.perf_counter() - start
+
+
+async def measure(store, dim: int, queries: int, k: int) -> Dict[str, float]:
+    rng = np.random.default_rng(1)
+    latencies = []
+    for _ in range(queries):
+        q = rng.standard_normal(dim, dtype=np.float32).tolist()
+        start = time.perf_counter()
+        await store.search(q, limit=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+
+async def main(args) -> None:
+    sizes = [int(x) for x in args.sizes.split(",")]
+    print(f"{'backend':>8} {'vectors':>9} {'load s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = LocalVectorStore(
+                path=tmp,
+                collection_name=f"bench_{n}",
+                dimension=args.dim,
+                dtype=args.dtype,
+            )
+            load = await populate(store, n, args.dim)
+            await store.close()
+
+            # Reopen to measure search on the memory-mapped files
+            start = time.perf_counter()
+            store = LocalVectorStore(
+                path=tmp,
+                collection_name=f"bench_{n}",
+                dimension=args.dim,
+                dtype=args.dtype,
+            )
+            reopen = time.perf_counter() - start
+            r = await measure(store, args.dim, args.queries, args.k)
+            await store.close()
+            print(
+                f"{'local':>8} {n:>9} {load:>8.1f} {r['p50']:>9.2f} {r['p99']:>9.2f}"
+                f"   (reopen {reopen * 1000:.0f} ms)"
+            )
+
+        if args.qdrant:
+            from rag.vectorstore import QdrantVectorStore
+
+            store = QdrantVectorStore(collection_name=f"bench_{n}", recreate=True)
+            load = await populate(store, n, args.dim, batch=500)
+            r = await measure(store, args.dim, args.queries, args.k)
+            await store.client.delete_collection(store.collection_name)
+            await store.close()
+            print(f"{'qdrant':>8} {n:>9} {load:>8.1f} {r['p50']:>9.2f} {r['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--qdrant", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -1,32 +1,73 @@
 """
 FastAPI backend for Mini RAG application.
-Endpoints: POST /ingest, POST /query
+Endpoints: POST /ingest, POST /ingest/bulk, POST /ingest/jobs, GET /ingest/jobs/{id},
+POST /query, POST /query/stream, POST /query/batch, GET /metrics, GET /healthz, GET /readyz
 """
 
+import asyncio
+import json
+import shutil
+import tempfile
 import time
-from typing import Optional, List
+import zipfile
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Tuple, Union
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import Depends, FastAPI, UploadFile, File, Form, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from pypdf import PdfReader
 from io import BytesIO
+import codecs
 
 # MUST be first executable line
 load_dotenv()
 
-from rag.chunking import SentenceAwareChunker
-from rag.embeddings import EmbeddingGenerator
-from rag.vectorstore import QdrantVectorStore
-from rag.retriever import MMRRetriever
-from rag.reranker import CohereReranker
-from rag.qa import QAGenerator
+from rag.admission import OverloadedError
+from rag.components import Components
+from rag.deadline import Deadline
+from rag.filters import Filters, normalize_filters
+from rag.jobs import IngestJob, QueueFullError
+from rag import telemetry
+from rag.telemetry import timed
 import os
 
 
+# ---------- COMPONENTS ----------
+# Built lazily: the port opens before provider SDKs, Qdrant and the
+# tokenizer are loaded, and warmup fills them in the background
+components = Components(warmup_retry_s=float(os.getenv("WARMUP_RETRY_S", "5")))
+
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_MB", "512")) * 1024 * 1024
+INGEST_SPOOL_MAX_BYTES = int(os.getenv("INGEST_SPOOL_MAX_MB", "8")) * 1024 * 1024
+BATCH_QUERY_MAX = int(os.getenv("BATCH_QUERY_MAX", "256"))
+BATCH_QUERY_CONCURRENCY = int(os.getenv("BATCH_QUERY_CONCURRENCY", "8"))
+
+# /query deadline: 0 disables it. Below RERANK_MIN_BUDGET_MS rerank is
+# skipped. Generation left with less than CONTEXT_FULL_BUDGET_MS, or less
+# than its planned share of the budget if that is smaller, gets a
+# proportionally smaller context
+QUERY_BUDGET_MS = float(os.getenv("QUERY_BUDGET_MS", "10000"))
+RERANK_MIN_BUDGET_MS = float(os.getenv("RERANK_MIN_BUDGET_MS", "50"))
+CONTEXT_FULL_BUDGET_MS = float(os.getenv("CONTEXT_FULL_BUDGET_MS", "2000"))
+MIN_CONTEXT_TOKENS = 400
+DEFAULT_CONTEXT_TOKENS = 3000
+RETRIEVAL_TIMEOUT_ANSWER = "The documents could not be searched within the time budget; please retry."
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    components.start()
+    yield
+    await components.close()
+
+
 # ---------- APP ----------
-app = FastAPI(title="Mini RAG API", version="1.0.0")
+app = FastAPI(title="Mini RAG API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,24 +77,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------- COMPONENTS ----------
-embedding_generator = EmbeddingGenerator()
-vectorstore = QdrantVectorStore(recreate=False)
-retriever = MMRRetriever(vectorstore, embedding_generator, k=8)
-reranker = CohereReranker(top_n=4)
-qa_generator = QAGenerator()
-chunker = SentenceAwareChunker(
-    min_tokens=800,
-    max_tokens=1200,
-    overlap_ratio=0.12
-)
-
-print("All components initialized successfully")
-
 
 # ---------- SCHEMAS ----------
 class QueryRequest(BaseModel):
     q: str
+    # e.g. {"source": "paper.pdf"} or {"section": ["intro", "methods"]}
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None
+    # End-to-end latency budget for /query; defaults to QUERY_BUDGET_MS
+    budget_ms: Optional[float] = None
+
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    # Applied to every question
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None
 
 
 class Citation(BaseModel):
@@ -73,22 +110,157 @@ class QueryResponse(BaseModel):
 class IngestResponse(BaseModel):
     count: int
     collection_name: str
+    added: int = 0
+    updated: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    metrics: Optional[dict] = None
+
+
+# ---------- HELPERS ----------
+@timed("pdf_extract")
+def _extract_pdf_text(raw: bytes) -> str:
+    reader = PdfReader(BytesIO(raw))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+@timed("pdf_extract")
+def _iter_pdf_pages(fileobj):
+    # pypdf resolves page objects lazily from the seekable upload file
+    reader = PdfReader(fileobj)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _usage_metrics(usage: dict) -> dict:
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get(
+            "total_tokens",
+            usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0),
+        ),
+        "tokens_estimated": bool(usage.get("estimated")),
+    }
+
+
+def _segments_for(text: Optional[str], fileobj, filename: Optional[str]):
+    """Lazy text segments and their join separator for an ingest payload."""
+    if text:
+        return [text.strip()], "\n"
+    if filename.lower().endswith(".pdf"):
+        return _iter_pdf_pages(fileobj), "\n"
+    return _iter_text_blocks(fileobj), ""
+
+
+def _spool_upload(fileobj):
+    # The request's upload file is closed once the response is sent
+    spool = tempfile.SpooledTemporaryFile(max_size=INGEST_SPOOL_MAX_BYTES)
+    shutil.copyfileobj(fileobj, spool, 1 << 20)
+    spool.seek(0)
+    return spool
+
+
+def _iter_text_blocks(fileobj, block_size: int = 1 << 20):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        block = fileobj.read(block_size)
+        if not block:
+            break
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+async def _enter(priority: str):
+    """Admission ticket, or a 429 with Retry-After when the request is shed."""
+    try:
+        return await components.admission.enter(priority)
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _admitted(priority: str):
+    """Dependency holding an admission slot until the response is sent."""
+    async def dependency():
+        ticket = await _enter(priority)
+        try:
+            yield
+        finally:
+            components.admission.leave(ticket)
+    return Depends(dependency)
+
+
+def _release(ticket) -> BackgroundTask:
+    # Streaming routes: runs once the stream ends or the client disconnects
+    return BackgroundTask(components.admission.leave, ticket)
 
 
 # ---------- ROUTES ----------
+# Routes that touch components wait for the build phase (not for warm connections)
+BUILT = [Depends(components.wait_built)]
+# Interactive queries are admitted ahead of batch queries and bulk ingest
+INTERACTIVE = BUILT + [_admitted("interactive")]
+BULK = BUILT + [_admitted("bulk")]
+
+
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "Mini RAG API"}
 
 
-@app.post("/ingest", response_model=IngestResponse)
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving, whatever the components are doing."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: every component is built and its provider connection is open."""
+    status = components.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/stats", dependencies=BUILT)
+async def stats():
+    return {
+        "embedding_cache": components.embedding_cache.stats(),
+        "answer_cache": components.answer_cache.stats(),
+        "query_batcher": (
+            components.query_batcher.stats() if components.query_batcher else None
+        ),
+        "reranker": components.reranker.stats(),
+        "transport": (
+            components.provider_transport.stats() if components.provider_transport else None
+        ),
+        "ingest_jobs": components.ingest_jobs.stats(),
+        "admission": components.admission.stats(),
+        "rate_limits": components.provider_limiter.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    payload, content_type = telemetry.render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.post("/ingest", response_model=IngestResponse, dependencies=BULK)
 async def ingest(
     text: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
     source: str = Form("upload"),
     title: Optional[str] = Form(None),
     section: str = Form("main"),
+    stream: bool = Form(False),
 ):
+    start_time = time.perf_counter()
+    stages = telemetry.start_request()
+
     if not title or title.lower() in {"document", "unknown"}:
         if file:
             title = os.path.splitext(file.filename)[0]
@@ -98,79 +270,686 @@ async def ingest(
     if not text and not file:
         raise HTTPException(status_code=400, detail="Text or file required")
 
+    if stream:
+        response = await _ingest_streaming(text, file, source, title, section)
+        return _finish_ingest(response, start_time, stages)
+
     if text:
         content = text.strip()
     else:
         raw = await file.read()
 
         if file.filename.lower().endswith(".pdf"):
-            reader = PdfReader(BytesIO(raw))
-            content = "\n".join(page.extract_text() or "" for page in reader.pages)
+            # PDF parsing is CPU-bound; keep it off the event loop
+            content = await run_in_threadpool(_extract_pdf_text, raw)
         else:
             content = raw.decode("utf-8", errors="ignore")
 
     if not content.strip():
         raise HTTPException(status_code=400, detail="Empty content")
 
-    chunks = chunker.chunk(
+    chunks = await run_in_threadpool(
+        components.chunker.chunk,
         text=content,
         source=source,
         title=title,
         section=section,
     )
 
-    texts = [c["text"] for c in chunks]
-    embeddings = embedding_generator.embed(texts, mode="document")
+    # Only new or changed chunks are embedded; stale positions are purged
+    try:
+        counts = await components.streaming_pipeline.ingest_chunks(chunks, source)
+    finally:
+        # A failure part-way may already have upserted or deleted points
+        components.answer_cache.invalidate()
+
+    response = IngestResponse(
+        **counts,
+        collection_name=components.vectorstore.collection_name,
+    )
+    return _finish_ingest(response, start_time, stages)
+
+
+def _finish_ingest(
+    response: IngestResponse,
+    start_time: float,
+    stages: dict,
+) -> IngestResponse:
+    latency = time.perf_counter() - start_time
+    telemetry.REQUEST_LATENCY.labels("ingest").observe(latency)
+    response.metrics = {
+        "latency_ms": round(latency * 1000, 2),
+        "stages": stages,
+    }
+    return response
+
+
+async def _ingest_streaming(
+    text: Optional[str],
+    file: Optional[UploadFile],
+    source: str,
+    title: str,
+    section: str,
+) -> IngestResponse:
+    # Pages are pulled lazily from the spooled upload inside the chunking thread
+    segments, separator = _segments_for(text, file and file.file, file and file.filename)
+
+    try:
+        counts = await components.streaming_pipeline.run(
+            segments,
+            source=source,
+            title=title,
+            section=section,
+            separator=separator,
+        )
+    finally:
+        # Partial ingests change the collection too
+        components.answer_cache.invalidate()
 
-    count = vectorstore.upsert_chunks(chunks, embeddings)
+    if counts["count"] == 0:
+        raise HTTPException(status_code=400, detail="Empty content")
 
     return IngestResponse(
-        count=count,
-        collection_name=vectorstore.collection_name,
+        **counts,
+        collection_name=components.vectorstore.collection_name,
+    )
+
+
+@app.post("/ingest/jobs", status_code=202, dependencies=BULK)
+async def submit_ingest_job(
+    text: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    source: str = Form("upload"),
+    title: Optional[str] = Form(None),
+    section: str = Form("main"),
+):
+    """Queue an upload for background ingestion; poll /ingest/jobs/{job_id}."""
+    if not title or title.lower() in {"document", "unknown"}:
+        title = os.path.splitext(file.filename)[0] if file else source
+
+    if not text and not file:
+        raise HTTPException(status_code=400, detail="Text or file required")
+
+    if components.ingest_jobs.is_full():
+        raise HTTPException(
+            status_code=429,
+            detail="Ingest queue is full, retry later",
+            headers={"Retry-After": "5"},
+        )
+
+    spool = await run_in_threadpool(_spool_upload, file.file) if file else None
+    segments, separator = _segments_for(text, spool, file and file.filename)
+
+    job = IngestJob(
+        segments,
+        separator,
+        source=source,
+        title=title,
+        section=section,
+        filename=file.filename if file else None,
+        cleanup=spool.close if spool else None,
     )
+    try:
+        components.ingest_jobs.submit(job)
+    except QueueFullError as e:
+        if spool:
+            spool.close()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+    return job.to_dict()
 
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/ingest/bulk", dependencies=BULK)
+async def ingest_bulk(
+    files: List[UploadFile] = File(...),
+    section: str = Form("main"),
+):
+    """Ingest many files and/or zip archives; each file is its own source."""
+    start_time = time.perf_counter()
+    stages = telemetry.start_request()
+
+    from rag.bulk import expand_uploads
+
+    uploads = [(f.filename, await f.read()) for f in files]
+    try:
+        expanded = await run_in_threadpool(expand_uploads, uploads, BULK_MAX_BYTES)
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    del uploads
+
+    if not expanded:
+        raise HTTPException(status_code=400, detail="No .pdf, .txt or .md files found")
+
+    try:
+        results = await components.bulk_ingester.ingest(expanded, section=section)
+    finally:
+        # Batches upserted before a failure change the collection too
+        components.answer_cache.invalidate()
+
+    totals = {
+        key: sum(r[key] for r in results)
+        for key in ("pages", "count", "added", "updated", "skipped", "deleted")
+    }
+    totals["files"] = len(results)
+    totals["failed"] = sum(1 for r in results if r["error"])
+
+    latency = time.perf_counter() - start_time
+    telemetry.REQUEST_LATENCY.labels("ingest_bulk").observe(latency)
+    return {
+        "files": results,
+        "totals": totals,
+        "collection_name": components.vectorstore.collection_name,
+        "metrics": {"latency_ms": round(latency * 1000, 2), "stages": stages},
+    }
+
+
+@app.get("/ingest/jobs/{job_id}", dependencies=BUILT)
+async def ingest_job_status(job_id: str):
+    job = components.ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+def _query_filters(raw: Optional[dict]) -> Tuple[Optional[Filters], str]:
+    """Validated filters and the answer-cache scope they map to."""
+    try:
+        filters = normalize_filters(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return filters, json.dumps(filters, sort_keys=True) if filters else ""
+
+
+@app.post("/query", response_model=QueryResponse, dependencies=INTERACTIVE)
 async def query(request: QueryRequest):
     start_time = time.perf_counter()
+    stages = telemetry.start_request()
+    filters, cache_scope = _query_filters(request.filters)
+    deadline = _deadline(request)
+
+    # ---- Embed ----
+    try:
+        query_embedding = await deadline.run(
+            "embed", components.retriever.embed_query(request.q)
+        )
+    except asyncio.TimeoutError:
+        query_embedding = None
+
+    # ---- Semantic cache ----
+    cached = (
+        components.answer_cache.lookup(query_embedding, scope=cache_scope)
+        if query_embedding is not None else None
+    )
+    if cached:
+        response, similarity = cached
+        latency = time.perf_counter() - start_time
+        telemetry.REQUEST_LATENCY.labels("query").observe(latency)
+        response["metrics"].update({
+            "latency_ms": round(latency * 1000, 2),
+            "cache_hit": True,
+            "cache_similarity": round(similarity, 4),
+            "stages": stages,
+        })
+        return QueryResponse(**response)
+
+    # ---- Search ----
+    cache_generation = components.answer_cache.generation
+    retrieval_metrics = {}
+    retrieved = await _retrieve(
+        request.q, query_embedding, filters, retrieval_metrics, deadline
+    )
+
+    response = await _answer(
+        request.q, retrieved, retrieval_metrics, start_time, stages, deadline
+    )
+    telemetry.REQUEST_LATENCY.labels("query").observe(time.perf_counter() - start_time)
+    # Degraded answers are not worth serving to the next similar question
+    if retrieved and query_embedding is not None and not deadline.degradations:
+        components.answer_cache.store(
+            query_embedding, response.model_dump(), cache_generation, scope=cache_scope
+        )
 
-    retrieved = retriever.retrieve(request.q)
+    return response
+
+
+async def _retrieve(
+    question: str,
+    query_embedding: Optional[List[float]],
+    filters: Optional[Filters],
+    retrieval_metrics: dict,
+    deadline: Deadline,
+) -> List[dict]:
+    """Search within the deadline, falling back to BM25; shared by /query and /query/stream."""
+    retrieved = None
+    if query_embedding is not None:
+        try:
+            retrieved = await deadline.run("search", components.retriever.retrieve(
+                question,
+                metrics=retrieval_metrics,
+                query_embedding=query_embedding,
+                filters=filters,
+            ))
+        except asyncio.TimeoutError:
+            pass
+
+    if retrieved is None and components.retriever.lexical_index is not None:
+        # Embed or search ran out of budget: BM25 needs neither
+        deadline.degrade("lexical_only")
+        try:
+            retrieved = await deadline.run("search", components.retriever.retrieve_lexical(
+                question, metrics=retrieval_metrics, filters=filters
+            ))
+        except asyncio.TimeoutError:
+            pass
+
+    if retrieved is None:
+        # Nothing to answer from in time: say so instead of failing
+        deadline.degrade("retrieval_timeout")
+        retrieved = []
+    return retrieved
+
+
+def _deadline(request: QueryRequest) -> Deadline:
+    budget_ms = request.budget_ms if request.budget_ms is not None else QUERY_BUDGET_MS
+    if budget_ms < 0:
+        raise HTTPException(status_code=400, detail="budget_ms must be positive")
+    # 0 disables the deadline
+    return Deadline(budget_ms or None)
+
+
+async def _answer(
+    question: str,
+    retrieved: List[dict],
+    retrieval_metrics: dict,
+    start_time: float,
+    stages: dict,
+    deadline: Optional[Deadline] = None,
+) -> QueryResponse:
+    """Rerank and generate; shared by /query and /query/batch."""
+    deadline = deadline or Deadline(None)
 
     # ---- No-answer case ----
     if not retrieved:
         return QueryResponse(
-            answer="No relevant information found in the provided documents.",
+            answer=(
+                RETRIEVAL_TIMEOUT_ANSWER if "retrieval_timeout" in deadline.degradations
+                else "No relevant information found in the provided documents."
+            ),
             citations=[],
             sources=[],
             metrics={
-                "latency_ms": 0.0,
-                "token_estimate": 0,
+                "latency_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                **_usage_metrics({}),
                 "retrieved_chunks": 0,
+                **deadline.metrics(),
+                "stages": stages,
             },
             retrieved_ids=[],
         )
 
-    # ---- Normal flow ----
-    reranked = reranker.rerank(request.q, retrieved)
-    qa_result = qa_generator.generate_answer(request.q, reranked)
-
-    latency_ms = (time.perf_counter() - start_time) * 1000
-
-    # token estimate based on answer length (acceptable for assessment)
-    token_estimate = int(len(qa_result["answer"].split()) * 1.3)
+    # ---- Rerank ----
+    reranked = await _rerank(question, retrieved, retrieval_metrics, deadline)
+
+    # ---- Generate ----
+    qa_generator = components.qa_generator
+    generate_ms, max_context_tokens = _generate_budget(reranked, deadline)
+    try:
+        qa_result = await deadline.run(
+            "generate",
+            qa_generator.generate_answer(question, reranked, max_context_tokens),
+            budget_ms=generate_ms,
+        )
+    except asyncio.TimeoutError:
+        deadline.degrade("extractive_answer")
+        qa_result = qa_generator.extractive_answer(question, reranked)
 
     return QueryResponse(
         answer=qa_result["answer"],
         citations=qa_result["citations"],
         sources=qa_result["sources"],
         metrics={
-            "latency_ms": round(latency_ms, 2),
-            "token_estimate": token_estimate,
+            "latency_ms": round((time.perf_counter() - start_time) * 1000, 2),
+            **_usage_metrics(qa_result["usage"]),
+            **qa_result["packing"],
             "retrieved_chunks": len(reranked),
+            "cache_hit": False,
+            **retrieval_metrics,
+            **deadline.metrics(),
+            "stages": stages,
         },
         retrieved_ids=[c.get("id") for c in reranked],
     )
 
+
+async def _rerank(
+    question: str,
+    retrieved: List[dict],
+    retrieval_metrics: dict,
+    deadline: Deadline,
+) -> List[dict]:
+    """Rerank within the deadline, or skip it when too little is left."""
+    reranker = components.reranker
+    rerank_ms = deadline.budget_for("rerank")
+    if rerank_ms is not None and rerank_ms < RERANK_MIN_BUDGET_MS:
+        deadline.degrade("rerank_skipped")
+        return retrieved[: reranker.top_n]
+
+    if rerank_ms is not None and reranker.budget_ms:
+        rerank_ms = min(rerank_ms, reranker.budget_ms)
+    # On timeout the reranker falls back to its local order
+    reranked = await reranker.rerank(
+        question, retrieved, metrics=retrieval_metrics, budget_ms=rerank_ms
+    )
+    if retrieval_metrics.get("rerank_path") == "timeout":
+        deadline.degrade("rerank_timeout")
+    return reranked
+
+
+def _generate_budget(
+    reranked: List[dict],
+    deadline: Deadline,
+) -> Tuple[Optional[float], Optional[int]]:
+    """The generate budget in ms, and a context token cap if it is short."""
+    generate_ms = deadline.budget_for("generate")
+    # A budget whose planned generate share is under CONTEXT_FULL_BUDGET_MS
+    # is small on purpose: only time lost upstream shrinks the context
+    full_context_ms = min(CONTEXT_FULL_BUDGET_MS, deadline.planned_ms("generate") or 0.0)
+    if generate_ms is None or generate_ms >= full_context_ms:
+        return generate_ms, None
+
+    # Prompt processing time grows with context: trim it to fit
+    full = components.qa_generator.packer.max_tokens or DEFAULT_CONTEXT_TOKENS
+    cap = max(MIN_CONTEXT_TOKENS, int(full * generate_ms / full_context_ms))
+    needed = min(full, sum(c.get("token_count") or len(c["text"]) // 4 for c in reranked))
+    if cap >= needed:
+        return generate_ms, None
+    deadline.degrade("context_shrunk")
+    return generate_ms, cap
+
+
+@app.post("/query/batch", dependencies=BUILT)
+async def query_batch(request: BatchQueryRequest):
+    """
+    Answer many questions in one request. Embedding and vector search are
+    batched across all questions; rerank and generation run concurrently
+    (BATCH_QUERY_CONCURRENCY at a time). Results stream back as NDJSON in
+    completion order, each line tagged with its question's index, followed
+    by a final summary line.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="questions must not be empty")
+    if len(request.questions) > BATCH_QUERY_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_QUERY_MAX} questions per batch",
+        )
+    filters, cache_scope = _query_filters(request.filters)
+    ticket = await _enter("batch")
+    return StreamingResponse(
+        _stream_batch(request.questions, filters, cache_scope),
+        media_type="application/x-ndjson",
+        background=_release(ticket),
+    )
+
+
+async def _stream_batch(
+    questions: List[str],
+    filters: Optional[Filters],
+    cache_scope: str,
+):
+    start_time = time.perf_counter()
+    stages = telemetry.start_request()
+    answer_cache = components.answer_cache
+    counts = {"answered": 0, "cache_hits": 0, "failed": 0}
+
+    try:
+        # ---- Batched embed ----
+        embeddings = await components.embedding_generator.embed(questions, mode="query")
+
+        results = {}
+        misses = []
+        for i, embedding in enumerate(embeddings):
+            cached = answer_cache.lookup(embedding, scope=cache_scope)
+            if cached:
+                response, similarity = cached
+                response["metrics"].update({
+                    "cache_hit": True,
+                    "cache_similarity": round(similarity, 4),
+                })
+                results[i] = response
+            else:
+                misses.append(i)
+
+        for i, response in results.items():
+            counts["cache_hits"] += 1
+            yield _ndjson({"index": i, "question": questions[i], **response})
+
+        # ---- Batched search ----
+        cache_generation = answer_cache.generation
+        retrieval_metrics = [{} for _ in misses]
+        retrieved = await components.retriever.retrieve_batch(
+            [questions[i] for i in misses],
+            [embeddings[i] for i in misses],
+            metrics=retrieval_metrics,
+            filters=filters,
+        )
+
+        # ---- Concurrent rerank + generate ----
+        semaphore = asyncio.Semaphore(BATCH_QUERY_CONCURRENCY)
+
+        async def answer(slot: int):
+            i = misses[slot]
+            async with semaphore:
+                item_start = time.perf_counter()
+                try:
+                    response = await _answer(
+                        questions[i], retrieved[slot], retrieval_metrics[slot], item_start, {}
+                    )
+                except Exception as e:
+                    print(f"[WARN] Batch question {i} failed: {e}")
+                    return i, None, str(e)
+            if retrieved[slot]:
+                answer_cache.store(
+                    embeddings[i], response.model_dump(), cache_generation, scope=cache_scope
+                )
+            return i, response, None
+
+        for done in asyncio.as_completed([answer(slot) for slot in range(len(misses))]):
+            i, response, error = await done
+            if error is not None:
+                counts["failed"] += 1
+                yield _ndjson({"index": i, "question": questions[i], "error": error})
+            else:
+                counts["answered"] += 1
+                yield _ndjson({"index": i, "question": questions[i], **response.model_dump()})
+
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        print(f"[WARN] Batch query failed: {e}")
+        yield _ndjson({"error": str(e)})
+
+    finally:
+        latency = time.perf_counter() - start_time
+        telemetry.REQUEST_LATENCY.labels("query_batch").observe(latency)
+
+    yield _ndjson({
+        "done": True,
+        "questions": len(questions),
+        **counts,
+        "latency_ms": round(latency * 1000, 2),
+        "questions_per_s": round(len(questions) / latency, 2) if latency else None,
+        "stages": stages,
+    })
+
+
+def _ndjson(data) -> str:
+    return json.dumps(data) + "\n"
+
+
+@app.post("/query/stream", dependencies=BUILT)
+async def query_stream(request: QueryRequest):
+    """Server-Sent Events: token*, citation*, metrics, done."""
+    # Validated up front so a bad filter is a 400, not an in-band error
+    filters, cache_scope = _query_filters(request.filters)
+    ticket = await _enter("interactive")
+    try:
+        deadline = _deadline(request)
+    except HTTPException:
+        components.admission.leave(ticket)
+        raise
+    return StreamingResponse(
+        _stream_query(request, filters, cache_scope, deadline),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=_release(ticket),
+    )
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_query(
+    request: QueryRequest,
+    filters: Optional[Filters],
+    cache_scope: str,
+    deadline: Deadline,
+):
+    start_time = time.perf_counter()
+    elapsed_ms = lambda: round((time.perf_counter() - start_time) * 1000, 2)
+    stages = telemetry.start_request()
+
+    try:
+        try:
+            query_embedding = await deadline.run(
+                "embed", components.retriever.embed_query(request.q)
+            )
+        except asyncio.TimeoutError:
+            query_embedding = None
+
+        # ---- Semantic cache ----
+        cached = (
+            components.answer_cache.lookup(query_embedding, scope=cache_scope)
+            if query_embedding is not None else None
+        )
+        if cached:
+            response, similarity = cached
+            yield _sse("token", {"text": response["answer"]})
+            for citation in response["citations"]:
+                yield _sse("citation", citation)
+            yield _sse("metrics", {
+                **response["metrics"],
+                "latency_ms": elapsed_ms(),
+                "ttft_ms": elapsed_ms(),
+                "cache_hit": True,
+                "cache_similarity": round(similarity, 4),
+                "stages": stages,
+            })
+            yield _sse("done", {})
+            return
+
+        cache_generation = components.answer_cache.generation
+        retrieval_metrics = {}
+        retrieved = await _retrieve(
+            request.q, query_embedding, filters, retrieval_metrics, deadline
+        )
+
+        # ---- No-answer case ----
+        if not retrieved:
+            yield _sse("token", {"text": (
+                RETRIEVAL_TIMEOUT_ANSWER if "retrieval_timeout" in deadline.degradations
+                else "No relevant information found in the provided documents."
+            )})
+            yield _sse("metrics", {
+                "latency_ms": elapsed_ms(),
+                "ttft_ms": elapsed_ms(),
+                **_usage_metrics({}),
+                "retrieved_chunks": 0,
+                **deadline.metrics(),
+                "stages": stages,
+            })
+            yield _sse("done", {})
+            return
+
+        # ---- Normal flow ----
+        reranked = await _rerank(request.q, retrieved, retrieval_metrics, deadline)
+
+        qa_generator = components.qa_generator
+        generate_ms, max_context_tokens = _generate_budget(reranked, deadline)
+        events = qa_generator.stream_answer(request.q, reranked, max_context_tokens)
+
+        # The generate budget bounds the wait for the first token; once
+        # tokens are on the wire the answer is finished rather than cut off
+        try:
+            first = await deadline.run("generate", events.__anext__(), budget_ms=generate_ms)
+        except asyncio.TimeoutError:
+            await events.aclose()
+            deadline.degrade("extractive_answer")
+            qa_result = qa_generator.extractive_answer(request.q, reranked)
+            events = _extractive_events(qa_result)
+            first = await events.__anext__()
+
+        ttft_ms = None
+        async for event in _prepend(first, events):
+            if event["type"] == "token":
+                if ttft_ms is None:
+                    ttft_ms = elapsed_ms()
+                yield _sse("token", {"text": event["text"]})
+            elif event["type"] == "citation":
+                yield _sse("citation", event["citation"])
+            else:
+                qa_result = event
+
+        metrics = {
+            "latency_ms": elapsed_ms(),
+            "ttft_ms": ttft_ms if ttft_ms is not None else elapsed_ms(),
+            "llm_ttft_ms": qa_result.get("ttft_ms"),
+            **_usage_metrics(qa_result["usage"]),
+            **qa_result["packing"],
+            "retrieved_chunks": len(reranked),
+            "cache_hit": False,
+            **retrieval_metrics,
+            **deadline.metrics(),
+            "stages": stages,
+        }
+        yield _sse("metrics", metrics)
+        yield _sse("done", {})
+
+        # Degraded answers are not worth serving to the next similar question
+        if query_embedding is not None and not deadline.degradations:
+            response = QueryResponse(
+                answer=qa_result["answer"],
+                citations=qa_result["citations"],
+                metrics=metrics,
+            )
+            components.answer_cache.store(
+                query_embedding, response.model_dump(), cache_generation, scope=cache_scope
+            )
+
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        print(f"[WARN] Streaming query failed: {e}")
+        yield _sse("error", {"detail": str(e)})
+
+    finally:
+        telemetry.REQUEST_LATENCY.labels("query_stream").observe(
+            time.perf_counter() - start_time
+        )
+
+
+async def _prepend(first: dict, events):
+    yield first
+    async for event in events:
+        yield event
+
+
+async def _extractive_events(qa_result: dict):
+    """An extractive answer in stream_answer's event shape."""
+    yield {"type": "token", "text": qa_result["answer"]}
+    for citation in qa_result["citations"]:
+        yield {"type": "citation", "citation": citation}
+    yield {"type": "done", **qa_result}
+
 # ---------- ENTRY ----------
 if __name__ == "__main__":
     import uvicorn
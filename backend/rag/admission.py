@@ -0,0 +1,298 @@
+"""
+Admission control and provider rate limiting.
+AdmissionController bounds how many requests run at once. Excess
+requests wait in a priority queue, so interactive queries go ahead of
+batch queries and bulk ingest, and they are shed with a Retry-After
+hint once the queue is full or a request has waited too long.
+ProviderLimiter holds token buckets sized to each provider's request
+and token quotas. Calls wait for their turn here instead of collecting
+429s upstream.
+"""
+
+import asyncio
+import itertools
+import math
+import time
+from typing import List, Dict, Any, Tuple
+
+from rag.telemetry import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_SHED,
+    ADMISSION_WAIT,
+    record_stage,
+)
+
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "batch": 1, "bulk": 2}
+
+# Provider quotas are per-minute windows
+PROVIDERS = ("embed", "rerank", "search", "llm")
+
+
+class OverloadedError(Exception):
+    """The request was shed; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    At most `max_concurrent` admitted requests, of which at most
+    `bulk_share` may be bulk ingests; up to `max_queue` more wait, highest
+    priority first, for at most `max_wait_s`. When the queue is full a
+    newcomer displaces the lowest-priority waiter if it outranks it, and
+    is rejected otherwise.
+
+    enter() returns a ticket that must be handed back to leave().
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_queue: int = 64,
+        max_wait_s: float = 10.0,
+        bulk_share: float = 0.25,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        # Long-running ingests must not hold every slot
+        self.limits = {name: max_concurrent for name in PRIORITIES}
+        self.limits["bulk"] = max(1, int(max_concurrent * bulk_share))
+
+        self.running = {name: 0 for name in PRIORITIES}
+        # (rank, seq, priority, future); seq keeps arrival order within a rank
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # EWMA of admitted request duration, for Retry-After
+        self._service_s = 1.0
+
+        self.admitted = {name: 0 for name in PRIORITIES}
+        self.shed: Dict[str, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self.running.values())
+
+    async def enter(self, priority: str) -> Tuple[str, float]:
+        rank = PRIORITIES[priority]
+        start = time.perf_counter()
+
+        # Never overtake a waiter of the same or higher priority
+        if self._fits(priority) and not any(w[0] <= rank for w in self._waiters):
+            self._take(priority)
+            return self._admitted(priority, start)
+
+        if len(self._waiters) >= self.max_queue:
+            # max_queue=0 disables queueing: there is no waiter to displace
+            worst = max(self._waiters) if self._waiters else None
+            if worst is None or worst[0] <= rank:
+                raise self._shed(priority, "queue_full")
+            # Evict the newest of the lowest-priority waiters
+            self._waiters.remove(worst)
+            worst[3].set_exception(self._shed(worst[2], "displaced"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (rank, next(self._seq), priority, future)
+        self._waiters.append(entry)
+        ADMISSION_QUEUE_DEPTH.labels(priority).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait_s)
+        except asyncio.TimeoutError:
+            if not self._abandon(entry):
+                raise self._shed(priority, "timeout")
+        except asyncio.CancelledError:
+            # Client went away while queued; pass on a slot it was just granted
+            if self._abandon(entry):
+                self._release(priority)
+            raise
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(priority).dec()
+
+        return self._admitted(priority, start)
+
+    def leave(self, ticket: Tuple[str, float]) -> None:
+        priority, admitted_at = ticket
+        elapsed = time.perf_counter() - admitted_at
+        self._service_s = 0.9 * self._service_s + 0.1 * elapsed
+        self._release(priority)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained."""
+        drain = (len(self._waiters) + 1) * self._service_s / self.max_concurrent
+        return max(1, math.ceil(drain))
+
+    def stats(self) -> Dict[str, Any]:
+        queued = {name: 0 for name in PRIORITIES}
+        for entry in self._waiters:
+            queued[entry[2]] += 1
+        return {
+            "running": dict(self.running),
+            "limits": dict(self.limits),
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "avg_service_ms": round(self._service_s * 1000, 1),
+        }
+
+    # ---- SLOTS ----
+    def _fits(self, priority: str) -> bool:
+        return (
+            self.in_flight < self.max_concurrent
+            and self.running[priority] < self.limits[priority]
+        )
+
+    def _take(self, priority: str) -> None:
+        self.running[priority] += 1
+        ADMISSION_IN_FLIGHT.inc()
+
+    def _release(self, priority: str) -> None:
+        self.running[priority] -= 1
+        ADMISSION_IN_FLIGHT.dec()
+        self._grant()
+
+    def _grant(self) -> None:
+        # Highest priority first; a class at its limit does not block the rest
+        for entry in sorted(self._waiters):
+            if self.in_flight >= self.max_concurrent:
+                break
+            if self._fits(entry[2]):
+                self._waiters.remove(entry)
+                self._take(entry[2])
+                entry[3].set_result(None)
+
+    def _admitted(self, priority: str, start: float) -> Tuple[str, float]:
+        self.admitted[priority] += 1
+        ADMISSION_WAIT.labels(priority).observe(time.perf_counter() - start)
+        # The ticket carries the admission time, so leave() can time the request
+        return priority, time.perf_counter()
+
+    def _abandon(self, entry) -> bool:
+        """Drop a waiter; True if it had already been granted a slot."""
+        future = entry[3]
+        if future.done() and future.exception() is None:
+            return True
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+        return False
+
+    def _shed(self, priority: str, reason: str) -> OverloadedError:
+        key = f"{priority}:{reason}"
+        self.shed[key] = self.shed.get(key, 0) + 1
+        ADMISSION_SHED.labels(priority, reason).inc()
+        return OverloadedError(reason, self.retry_after())
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, holding at most `capacity`. reserve() takes
+    tokens even when they are not there yet and returns how long the caller
+    must wait, so waiters are served in arrival order without polling.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, n: float) -> float:
+        self._refill()
+        self.tokens -= n
+        return max(0.0, -self.tokens / self.rate)
+
+    def available(self, n: float) -> bool:
+        self._refill()
+        # A request larger than the bucket only needs a full one
+        return self.tokens >= min(n, self.capacity)
+
+    def refund(self, n: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + n)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class ProviderLimiter:
+    """
+    Per-provider request and token buckets. quotas maps a provider to
+    {"rpm": ..., "tpm": ...}; a missing or zero quota is not limited.
+    Buckets hold `burst_s` seconds of quota.
+    """
+
+    def __init__(self, quotas: Dict[str, Dict[str, float]], burst_s: float = 10.0):
+        self.buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        for provider, quota in quotas.items():
+            buckets = {}
+            for kind in ("rpm", "tpm"):
+                per_minute = quota.get(kind) or 0
+                if per_minute > 0:
+                    rate = per_minute / 60
+                    buckets[kind] = TokenBucket(rate, max(1.0, rate * burst_s))
+            if buckets:
+                self.buckets[provider] = buckets
+
+        self.waits = {p: 0 for p in self.buckets}
+        self.wait_ms = {p: 0.0 for p in self.buckets}
+        self.throttled = {p: 0 for p in self.buckets}
+
+    async def acquire(self, provider: str, tokens: int = 0) -> float:
+        """Wait until one request of `tokens` tokens fits the quota; returns the wait in seconds."""
+        buckets = self.buckets.get(provider)
+        if not buckets:
+            return 0.0
+
+        costs = self._costs(buckets, tokens)
+        delay = max(buckets[kind].reserve(n) for kind, n in costs)
+        if delay <= 0:
+            return 0.0
+
+        self.waits[provider] += 1
+        self.wait_ms[provider] += delay * 1000
+        record_stage(f"throttle_{provider}", delay)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # The call was never made: give the quota back
+            for kind, n in costs:
+                buckets[kind].refund(n)
+            raise
+        return delay
+
+    def try_acquire(self, provider: str, tokens: int = 0) -> bool:
+        """Take quota only if it is available now, for calls that have a fallback."""
+        buckets = self.buckets.get(provider)
+        if not buckets:
+            return True
+
+        costs = self._costs(buckets, tokens)
+        if not all(buckets[kind].available(n) for kind, n in costs):
+            self.throttled[provider] += 1
+            return False
+        for kind, n in costs:
+            buckets[kind].reserve(n)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            provider: {
+                **{kind: round(b.rate * 60) for kind, b in buckets.items()},
+                "available": {kind: round(b.tokens, 1) for kind, b in buckets.items()},
+                "waits": self.waits[provider],
+                "wait_ms": round(self.wait_ms[provider], 1),
+                "throttled": self.throttled[provider],
+            }
+            for provider, buckets in self.buckets.items()
+        }
+
+    @staticmethod
+    def _costs(buckets: Dict[str, TokenBucket], tokens: int):
+        return [(kind, 1 if kind == "rpm" else tokens) for kind in buckets]
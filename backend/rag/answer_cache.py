@@ -0,0 +1,121 @@
+"""
+Semantic answer cache.
+Returns a stored /query response when a new query embedding is close
+enough to a recent one. Entries expire by TTL, are evicted LRU when full,
+and are dropped wholesale whenever the collection changes. Entries are
+scoped (e.g. by metadata filters) and only match lookups in the same scope.
+"""
+
+import copy
+import time
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Nearest-neighbour lookup over a fixed-size matrix of normalized
+    query vectors. Meant to be used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 600.0,
+        threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+
+        # Allocated on first store, once the embedding dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._responses: list = [None] * max_entries
+        self._scopes: list = [""] * max_entries
+
+        # Bumped on every invalidation; stale in-flight answers are rejected
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self,
+        query_embedding: Sequence[float],
+        scope: str = "",
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (response, similarity) for the closest live entry in `scope`, if any."""
+        if self._vectors is None or not self._valid.any():
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        self._valid &= self._expires > now
+
+        query = self._normalize(query_embedding)
+        scores = self._vectors @ query
+        scores[~self._valid] = -np.inf
+        scores[[s != scope for s in self._scopes]] = -np.inf
+
+        idx = int(np.argmax(scores))
+        similarity = float(scores[idx])
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._last_used[idx] = now
+        return copy.deepcopy(self._responses[idx]), similarity
+
+    def store(
+        self,
+        query_embedding: Sequence[float],
+        response: Dict[str, Any],
+        generation: int,
+        scope: str = "",
+    ) -> None:
+        """Cache a response computed while `generation` was current."""
+        if generation != self.generation or self.max_entries <= 0:
+            return
+
+        query = self._normalize(query_embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, len(query)), dtype=np.float32)
+
+        now = time.monotonic()
+        self._valid &= self._expires > now
+
+        # Free slot if there is one, otherwise the least recently used
+        free = np.flatnonzero(~self._valid)
+        idx = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+
+        self._vectors[idx] = query
+        self._expires[idx] = now + self.ttl_seconds
+        self._last_used[idx] = now
+        self._valid[idx] = True
+        self._responses[idx] = copy.deepcopy(response)
+        self._scopes[idx] = scope
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._valid[:] = False
+        self._responses = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": int(self._valid.sum()),
+            "generation": self.generation,
+        }
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
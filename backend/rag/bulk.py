@@ -0,0 +1,240 @@
+"""
+Bulk ingestion of many files or zip archives.
+Text extraction and chunking run per file in a process pool; chunks from
+all files then share deduplicated embed and upsert batches.
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Tuple
+
+from pypdf import PdfReader
+
+from rag.chunking import SentenceAwareChunker
+from rag.ingest import StreamingIngestPipeline, _changed_chunks, _new_counts
+from rag.telemetry import record_stage
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+# One chunker per worker process, built on first use
+_worker_chunker: Optional[SentenceAwareChunker] = None
+
+
+def extract_pages(name: str, data: bytes) -> Tuple[List[str], str]:
+    """Text segments of a file and the separator that joins them."""
+    if name.lower().endswith(".pdf"):
+        reader = PdfReader(io.BytesIO(data))
+        return [page.extract_text() or "" for page in reader.pages], "\n"
+    return [data.decode("utf-8", errors="ignore")], ""
+
+
+def process_file(
+    name: str,
+    data: bytes,
+    section: str,
+    chunker_params: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Extract and chunk one file. Runs inside a pool worker process."""
+    global _worker_chunker
+    if _worker_chunker is None:
+        _worker_chunker = SentenceAwareChunker(**chunker_params)
+
+    # Stage timings are sent back; this process has its own metrics registry
+    result = {"filename": name, "pages": 0, "chunks": [], "error": None}
+    try:
+        start = time.perf_counter()
+        pages, separator = extract_pages(name, data)
+        result["extract_s"] = time.perf_counter() - start
+        result["pages"] = len(pages)
+
+        start = time.perf_counter()
+        result["chunks"] = list(_worker_chunker.chunk_stream(
+            pages,
+            source=name,
+            title=os.path.splitext(os.path.basename(name))[0],
+            section=section,
+            separator=separator,
+        ))
+        result["chunk_s"] = time.perf_counter() - start
+    except Exception as e:
+        result["error"] = str(e)
+
+    return result
+
+
+def expand_uploads(
+    uploads: List[Tuple[str, bytes]],
+    max_bytes: int,
+) -> List[Tuple[str, bytes]]:
+    """
+    Flatten zip archives into their supported members and enforce a size
+    cap. A name seen twice keeps its last content.
+    """
+    files: Dict[str, bytes] = {}
+    total = 0
+    for name, data in uploads:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    member = info.filename
+                    if (
+                        info.is_dir()
+                        or member.startswith("__MACOSX/")
+                        or not member.lower().endswith(SUPPORTED_EXTENSIONS)
+                    ):
+                        continue
+                    # Checked against the declared size before inflating
+                    total += info.file_size
+                    if total > max_bytes:
+                        raise ValueError(f"Bulk upload exceeds {max_bytes} bytes uncompressed")
+                    files[member] = archive.read(info)
+        else:
+            total += len(data)
+            if total > max_bytes:
+                raise ValueError(f"Bulk upload exceeds {max_bytes} bytes")
+            files[name] = data
+    return list(files.items())
+
+
+class BulkIngester:
+    """
+    Fans files out to a process pool and funnels their chunks into shared
+    embed/upsert batches of `batch_size`. Re-ingested files are incremental,
+    as in StreamingIngestPipeline.
+    """
+
+    def __init__(
+        self,
+        pipeline: StreamingIngestPipeline,
+        workers: int = 4,
+        batch_size: int = 96,
+    ):
+        self.pipeline = pipeline
+        self.workers = workers
+        self.batch_size = batch_size
+        self.chunker_params = {
+            "min_tokens": pipeline.chunker.min_tokens,
+            "max_tokens": pipeline.chunker.max_tokens,
+            "overlap_ratio": pipeline.chunker.overlap_ratio,
+        }
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def _executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs event-loop and client threads is unsafe
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def ingest(
+        self,
+        files: List[Tuple[str, bytes]],
+        section: str = "main",
+    ) -> List[Dict[str, Any]]:
+        """Ingest (filename, bytes) pairs; returns one result dict per file."""
+        pool = self._executor()
+        futures = [self._process(pool, name, data, section) for name, data in files]
+
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: List[Dict[str, Any]] = []
+        stale: Dict[str, set] = {}
+
+        for next_done in asyncio.as_completed(futures):
+            processed = await next_done
+            name = processed["filename"]
+            result = {
+                "filename": name,
+                "pages": processed["pages"],
+                **_new_counts(),
+                "error": None,
+            }
+            results[name] = result
+            for stage_name, key in (("pdf_extract", "extract_s"), ("chunk", "chunk_s")):
+                if key in processed:
+                    record_stage(stage_name, processed[key])
+
+            if processed["error"]:
+                result["error"] = processed["error"]
+                continue
+
+            chunks = processed["chunks"]
+            existing = await self.pipeline.vectorstore.get_source_hashes(name)
+            pending.extend(_changed_chunks(chunks, existing, result))
+            stale[name] = set(existing) - {c["position"] for c in chunks}
+
+            while len(pending) >= self.batch_size:
+                batch, pending = pending[: self.batch_size], pending[self.batch_size:]
+                await self._embed_and_upsert(batch)
+
+        if pending:
+            await self._embed_and_upsert(pending)
+
+        for name, positions in stale.items():
+            results[name]["deleted"] = await self.pipeline.purge(name, positions)
+
+        if self.pipeline.lexical_index is not None:
+            await asyncio.to_thread(self.pipeline.lexical_index.save)
+
+        return [results[name] for name, _ in files]
+
+    async def _process(
+        self,
+        pool: concurrent.futures.ProcessPoolExecutor,
+        name: str,
+        data: bytes,
+        section: str,
+    ) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                pool, process_file, name, data, section, self.chunker_params
+            )
+        except BrokenProcessPool as e:
+            # A worker died (OOM kill, crashing parser): every file still in
+            # this pool fails, and the pool is replaced for later requests
+            self._discard(pool)
+            return {
+                "filename": name,
+                "pages": 0,
+                "chunks": [],
+                "error": f"Worker process died: {e}",
+            }
+
+    def _discard(self, pool: concurrent.futures.ProcessPoolExecutor) -> None:
+        if self._pool is pool:
+            print("[WARN] Bulk ingest process pool broke; starting a new one")
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _embed_and_upsert(self, batch: List[Dict[str, Any]]) -> None:
+        # Identical texts (boilerplate pages, duplicate files) are embedded once
+        unique: Dict[str, Dict[str, Any]] = {}
+        for chunk in batch:
+            unique.setdefault(chunk["text"], chunk)
+
+        vectors = await self.pipeline.embedding_generator.embed(
+            [c["text"] for c in unique.values()],
+            mode="document",
+            token_counts=[c["token_count"] for c in unique.values()],
+        )
+        by_text = dict(zip(unique, vectors))
+
+        await self.pipeline.vectorstore.upsert_chunks(
+            batch, [by_text[c["text"]] for c in batch]
+        )
+        if self.pipeline.lexical_index is not None:
+            await asyncio.to_thread(self.pipeline.lexical_index.add, batch)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
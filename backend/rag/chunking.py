@@ -3,16 +3,50 @@ Sentence-aware chunking with configurable size and overlap.
 Chunks are 800-1200 tokens with 10-15% overlap.
 """
 import tiktoken
-from typing import List, Dict, Any
+from bisect import bisect_left
+from typing import List, Dict, Any, Iterable, Iterator
 import re
+from rag.telemetry import timed
+
+
+# Sentence ending followed by whitespace
+SENTENCE_PATTERN = re.compile(r'([.!?]+)\s+')
+
+# Sentences tokenized per encode_ordinary_batch call; bounds peak allocations
+ENCODE_BATCH = 2048
+
+# An unfinished sentence is checked against max_tokens once it holds this
+# many characters per token of the limit
+CARRY_CHECK_CHARS_PER_TOKEN = 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences using regex.
+    Handles common sentence endings: . ! ? followed by space or newline.
+    """
+    parts = SENTENCE_PATTERN.split(text)
+
+    # parts alternates text/punctuation; recombine each sentence with
+    # its punctuation and keep the trailing unterminated sentence
+    sentences = [
+        (parts[i] + parts[i + 1]).strip()
+        for i in range(0, len(parts) - 1, 2)
+    ]
+    sentences.append(parts[-1].strip())
+
+    return [s for s in sentences if s]
 
 
 class SentenceAwareChunker:
     """
     Chunks text using sentence boundaries while respecting token limits.
     Target: 800-1200 tokens per chunk, 10-15% overlap.
+
+    Every sentence is tokenized exactly once. Chunk and overlap boundaries
+    are then found on cumulative token counts, without re-encoding.
     """
-    
+
     def __init__(
         self,
         min_tokens: int = 800,
@@ -24,48 +58,15 @@ class SentenceAwareChunker:
         self.overlap_ratio = overlap_ratio
         # Use cl100k_base encoding (GPT-4 tokenizer)
         self.encoding = tiktoken.get_encoding("cl100k_base")
-    
+
     def _count_tokens(self, text: str) -> int:
         """Count tokens in text."""
-        return len(self.encoding.encode(text))
-    
+        return len(self.encoding.encode_ordinary(text))
+
     def _split_sentences(self, text: str) -> List[str]:
-        """
-        Split text into sentences using regex.
-        Handles common sentence endings: . ! ? followed by space or newline.
-        """
-        # Pattern: sentence ending followed by whitespace or end of string
-        pattern = r'([.!?]+)\s+'
-        sentences = re.split(pattern, text)
-        
-        # #region agent log
-        import json
-        import time
-        with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"V","location":"chunking.py:32","message":"After regex split","data":{"text_length":len(text),"split_count":len(sentences),"split_preview":sentences[:5] if sentences else []},"timestamp":int(time.time()*1000)})+"\n")
-        # #endregion
-        
-        # Recombine sentences with their punctuation
-        result = []
-        for i in range(0, len(sentences) - 1, 2):
-            if i + 1 < len(sentences):
-                result.append(sentences[i] + sentences[i + 1])
-            else:
-                result.append(sentences[i])
-        
-        # Handle last sentence if odd number of splits
-        if len(sentences) % 2 == 1:
-            result.append(sentences[-1])
-        
-        final_result = [s.strip() for s in result if s.strip()]
-        
-        # #region agent log
-        with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"W","location":"chunking.py:53","message":"After sentence recombination","data":{"result_count":len(final_result),"result_preview":final_result[:3] if final_result else []},"timestamp":int(time.time()*1000)})+"\n")
-        # #endregion
-        
-        return final_result
-    
+        return split_sentences(text)
+
+    @timed("chunk")
     def chunk(
         self,
         text: str,
@@ -75,107 +76,208 @@ class SentenceAwareChunker:
     ) -> List[Dict[str, Any]]:
         """
         Chunk text into overlapping segments with metadata.
-        
+
         Args:
             text: Input text to chunk
             source: Source identifier (filename, URL, etc.)
             title: Document title
             section: Section identifier
-        
+
         Returns:
             List of chunk dictionaries with text and metadata
         """
-        # #region agent log
-        import json
-        import time
-        with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"Q","location":"chunking.py:55","message":"Chunk entry","data":{"text_length":len(text) if text else 0,"text_stripped_length":len(text.strip()) if text else 0,"text_is_none":text is None},"timestamp":int(time.time()*1000)})+"\n")
-        # #endregion
-        
         if not text.strip():
-            # #region agent log
-            with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"R","location":"chunking.py:77","message":"Text is empty after strip","data":{},"timestamp":int(time.time()*1000)})+"\n")
-            # #endregion
             return []
-        
+
         sentences = self._split_sentences(text)
-        
-        # #region agent log
-        with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"S","location":"chunking.py:79","message":"After split_sentences","data":{"sentences_count":len(sentences) if sentences else 0,"sentences_is_none":sentences is None,"sentences_is_empty":sentences == []},"timestamp":int(time.time()*1000)})+"\n")
-        # #endregion
-        
         if not sentences:
-            # #region agent log
-            with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"T","location":"chunking.py:80","message":"No sentences after split","data":{},"timestamp":int(time.time()*1000)})+"\n")
-            # #endregion
             return []
-        
-        chunks = []
-        current_chunk = []
-        current_tokens = 0
-        chunk_position = 0
-        
-        for sentence in sentences:
-            sentence_tokens = self._count_tokens(sentence)
-            
-            # If adding this sentence would exceed max_tokens
-            if current_tokens + sentence_tokens > self.max_tokens and current_chunk:
-                # Save current chunk if it meets minimum size
-                if current_tokens >= self.min_tokens:
-                    chunk_text = " ".join(current_chunk)
-                    chunks.append({
-                        "text": chunk_text,
-                        "source": source,
-                        "title": title,
-                        "section": section,
-                        "position": chunk_position,
-                        "token_count": current_tokens
-                    })
-                    chunk_position += 1
-                    
-                    # Calculate overlap: keep last N sentences that fit in overlap window
+
+        sentences = [piece for s in sentences for piece in self._split_long(s)]
+        return list(self._build_chunks([sentences], source, title, section))
+
+    @timed("chunk")
+    def chunk_stream(
+        self,
+        segments: Iterable[str],
+        source: str = "unknown",
+        title: str = "unknown",
+        section: str = "unknown",
+        separator: str = "\n"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Incrementally chunk a stream of text segments (e.g. PDF pages).
+
+        Produces the same chunks as chunk() on separator.join(segments),
+        but only holds the current chunk and one partial sentence (at most
+        about max_tokens) in memory.
+        """
+        blocks = self._iter_sentence_blocks(segments, separator)
+        yield from self._build_chunks(blocks, source, title, section)
+
+    def _iter_sentence_blocks(
+        self,
+        segments: Iterable[str],
+        separator: str
+    ) -> Iterator[List[str]]:
+        """
+        Split each segment into sentences, carrying partial sentences forward.
+        Only the new segment is scanned for terminators, and a carried
+        sentence longer than max_tokens (text without [.!?] terminators,
+        e.g. PDF tables) is cut, so work and memory stay bounded.
+        """
+        carry: List[str] = []
+        carry_chars = 0
+        for segment in segments:
+            if carry:
+                # Trailing punctuation may end a sentence once the
+                # separator or the segment supplies the whitespace
+                head = carry[-1].rstrip(".!?")
+                buffer = carry[-1][len(head):] + separator + segment
+                carry[-1] = head
+            else:
+                buffer = segment
+            parts = SENTENCE_PATTERN.split(buffer)
+
+            # The last text part may be an unfinished sentence that
+            # continues in the next segment
+            if len(parts) > 1:
+                parts[0] = "".join(carry) + parts[0]
+                carry, carry_chars = [], 0
+            block = [
+                (parts[i] + parts[i + 1]).strip()
+                for i in range(0, len(parts) - 1, 2)
+            ]
+            block = [piece for s in block if s for piece in self._split_long(s)]
+
+            carry.append(parts[-1])
+            carry_chars += len(parts[-1])
+            if carry_chars > self.max_tokens * CARRY_CHECK_CHARS_PER_TOKEN:
+                pieces, rest = self._cut_carry("".join(carry))
+                block.extend(pieces)
+                carry, carry_chars = [rest], len(rest)
+            yield block
+
+        tail = "".join(carry).strip()
+        if tail:
+            yield self._split_long(tail)
+
+    def _split_long(self, sentence: str) -> List[str]:
+        """A sentence over max_tokens, in pieces of max_tokens tokens."""
+        # A token covers at least one byte
+        if len(sentence.encode("utf-8")) <= self.max_tokens:
+            return [sentence]
+        tokens = self.encoding.encode_ordinary(sentence)
+        if len(tokens) <= self.max_tokens:
+            return [sentence]
+        pieces = (
+            self.encoding.decode(tokens[i:i + self.max_tokens]).strip()
+            for i in range(0, len(tokens), self.max_tokens)
+        )
+        return [p for p in pieces if p]
+
+    def _cut_carry(self, text: str):
+        """
+        Whole max_tokens pieces from the front of an unfinished sentence,
+        and the rest. At least one token stays behind, since the next
+        segment may continue the last word.
+        """
+        tokens = self.encoding.encode_ordinary(text)
+        full = (len(tokens) - 1) // self.max_tokens * self.max_tokens
+        pieces = (
+            self.encoding.decode(tokens[i:i + self.max_tokens]).strip()
+            for i in range(0, full, self.max_tokens)
+        )
+        return [p for p in pieces if p], self.encoding.decode(tokens[full:])
+
+    def _token_lengths(self, sentences: List[str]) -> Iterator[int]:
+        """Token count per sentence, encoding each sentence exactly once."""
+        for start in range(0, len(sentences), ENCODE_BATCH):
+            batch = sentences[start:start + ENCODE_BATCH]
+            for tokens in self.encoding.encode_ordinary_batch(batch):
+                yield len(tokens)
+
+    def _build_chunks(
+        self,
+        sentence_blocks: Iterable[List[str]],
+        source: str,
+        title: str,
+        section: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Group sentences into overlapping chunks within the token limits.
+
+        sentences[start:] is the chunk being built and prefix[i] is the
+        token total of sentences[:i], so chunk sizes and the overlap
+        window are plain differences and a bisect.
+        """
+        sentences: List[str] = []
+        prefix = [0]
+        start = 0
+        position = 0
+
+        for block in sentence_blocks:
+            if not block:
+                continue
+
+            # Forget sentences that can no longer be part of any chunk
+            if start:
+                base = prefix[start]
+                del sentences[:start]
+                prefix = [p - base for p in prefix[start:]]
+                start = 0
+
+            for sentence, sentence_tokens in zip(block, self._token_lengths(block)):
+                end = len(sentences)
+                current_tokens = prefix[end] - prefix[start]
+
+                # Close the chunk once it is big enough and the next
+                # sentence would push it past max_tokens
+                if (
+                    current_tokens + sentence_tokens > self.max_tokens
+                    and end > start
+                    and current_tokens >= self.min_tokens
+                ):
+                    yield self._make_chunk(
+                        sentences, start, end, current_tokens,
+                        source, title, section, position
+                    )
+                    position += 1
+
+                    # Overlap: longest run of trailing sentences that fits
+                    # in overlap_ratio of the chunk
                     overlap_tokens = int(current_tokens * self.overlap_ratio)
-                    overlap_sentences = []
-                    overlap_count = 0
-                    
-                    # Build overlap from end of current chunk
-                    for s in reversed(current_chunk):
-                        s_tokens = self._count_tokens(s)
-                        if overlap_count + s_tokens <= overlap_tokens:
-                            overlap_sentences.insert(0, s)
-                            overlap_count += s_tokens
-                        else:
-                            break
-                    
-                    # Start new chunk with overlap
-                    current_chunk = overlap_sentences
-                    current_tokens = overlap_count
-                else:
-                    # Chunk too small, continue building
-                    pass
-            
-            # Add sentence to current chunk
-            current_chunk.append(sentence)
-            current_tokens += sentence_tokens
-        
+                    start = bisect_left(
+                        prefix, prefix[end] - overlap_tokens, start, end + 1
+                    )
+
+                sentences.append(sentence)
+                prefix.append(prefix[-1] + sentence_tokens)
+
         # Add final chunk - always include it even if below min_tokens (to avoid losing content)
-        if current_chunk and current_tokens > 0:
-            chunk_text = " ".join(current_chunk)
-            chunks.append({
-                "text": chunk_text,
-                "source": source,
-                "title": title,
-                "section": section,
-                "position": chunk_position,
-                "token_count": current_tokens
-            })
-        
-        # #region agent log
-        with open(r'e:\miniRAG\.cursor\debug.log', 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"U","location":"chunking.py:141","message":"Before return chunks","data":{"chunks_count":len(chunks),"current_chunk_exists":current_chunk is not None and len(current_chunk) > 0,"current_tokens":current_tokens,"min_tokens":self.min_tokens,"meets_min":current_tokens >= self.min_tokens if current_chunk else False},"timestamp":int(time.time()*1000)})+"\n")
-        # #endregion
-        
-        return chunks
+        end = len(sentences)
+        if end > start and prefix[end] > prefix[start]:
+            yield self._make_chunk(
+                sentences, start, end, prefix[end] - prefix[start],
+                source, title, section, position
+            )
+
+    @staticmethod
+    def _make_chunk(
+        sentences: List[str],
+        start: int,
+        end: int,
+        token_count: int,
+        source: str,
+        title: str,
+        section: str,
+        position: int
+    ) -> Dict[str, Any]:
+        return {
+            "text": " ".join(sentences[start:end]),
+            "source": source,
+            "title": title,
+            "section": section,
+            "position": position,
+            "token_count": token_count
+        }
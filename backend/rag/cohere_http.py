@@ -0,0 +1,62 @@
+"""
+Cohere REST client on the shared provider transport.
+The cohere SDK brings its own aiohttp session, which cannot share a
+connection pool, timeouts or retries with the other providers. This
+client covers the calls the pipeline makes (embed, rerank,
+check_api_key) over httpx and returns the SDK's response shape, so
+EmbeddingGenerator and CohereReranker use it unchanged.
+"""
+
+from types import SimpleNamespace
+from typing import List, Dict, Any
+
+import httpx
+
+
+COHERE_API_URL = "https://api.cohere.ai"
+
+
+class CohereHTTPClient:
+    def __init__(self, api_key: str, transport: httpx.AsyncBaseTransport, base_url: str = COHERE_API_URL):
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                "Request-Source": "mini-rag",
+            },
+            transport=transport,
+        )
+
+    async def embed(self, texts: List[str], model: str, input_type: str):
+        body = await self._post("/v1/embed", {
+            "texts": texts,
+            "model": model,
+            "input_type": input_type,
+        })
+        return SimpleNamespace(embeddings=body["embeddings"])
+
+    async def rerank(self, model: str, query: str, documents: List[str], top_n: int):
+        body = await self._post("/v1/rerank", {
+            "model": model,
+            "query": query,
+            "documents": documents,
+            "top_n": top_n,
+            "return_documents": False,
+        })
+        return SimpleNamespace(results=[
+            SimpleNamespace(index=r["index"], relevance_score=r["relevance_score"])
+            for r in body["results"]
+        ])
+
+    async def check_api_key(self) -> Dict[str, Any]:
+        return await self._post("/v1/check-api-key", {})
+
+    async def close(self) -> None:
+        await self.http.aclose()
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.http.post(path, json=payload)
+        # Retryable statuses were already retried by the transport
+        response.raise_for_status()
+        return response.json()
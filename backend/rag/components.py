@@ -0,0 +1,406 @@
+"""
+Lazily built backend components.
+Nothing heavy happens at import: provider SDKs, Qdrant and the tiktoken
+encoder are imported and constructed on first access. warmup() builds
+them in parallel worker threads, then pre-opens every provider
+connection, so the port opens immediately and /readyz reports when the
+first request will be fast.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+# Independent components built in parallel; the rest are cheap and follow
+WARM_BUILD = (
+    "chunker", "embedding_generator", "vectorstore",
+    "lexical_index", "reranker", "qa_generator",
+)
+WARM_DEPENDENTS = (
+    "query_batcher", "retriever", "answer_cache",
+    "streaming_pipeline", "ingest_jobs", "bulk_ingester", "admission",
+)
+# Components whose warmup() opens a connection
+WARM_CONNECT = ("embedding_generator", "vectorstore", "reranker", "qa_generator")
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+class Components:
+    """
+    Attribute access builds a component on first use (see the _build_*
+    methods). Builds are guarded per component, so a request arriving
+    mid-warmup waits for that component instead of building it twice.
+    """
+
+    def __init__(self, warmup_retry_s: float = 5.0):
+        self.warmup_retry_s = warmup_retry_s
+        self.created_at = time.perf_counter()
+        self.ready_at: Optional[float] = None
+        # name -> {"ok", "ms", "error"} for every warmup step
+        self.checks: Dict[str, Dict[str, Any]] = {}
+
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._build_task: Optional[asyncio.Task] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str) -> Any:
+        builder = getattr(type(self), f"_build_{name}", None)
+        if builder is None:
+            raise AttributeError(name)
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = builder(self)
+        return self.__dict__[name]
+
+    def built(self, name: str) -> bool:
+        return name in self.__dict__
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    # ---- LIFECYCLE ----
+    def start(self) -> None:
+        """Begin warming up in the background (call from the event loop)."""
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.ensure_future(self.warmup())
+
+    async def wait_built(self) -> None:
+        """
+        Wait for the build phase so request handlers never construct a
+        component on the event loop. Connections may still be cold.
+        """
+        if self._build_task is None:
+            self._build_task = asyncio.ensure_future(self._build())
+        await asyncio.shield(self._build_task)
+
+    async def warmup(self) -> None:
+        await self.wait_built()
+
+        pending = [n for n in WARM_CONNECT if self.checks.get(n, {}).get("ok")]
+        while True:
+            await asyncio.gather(*(
+                self._check(f"{n}_connection", getattr(self, n).warmup()) for n in pending
+            ))
+            pending = [n for n in pending if not self.checks[f"{n}_connection"]["ok"]]
+            build_failed = [n for n, c in self.checks.items() if not c["ok"] and "_connection" not in n]
+            if not pending and not build_failed:
+                break
+            if build_failed and not pending:
+                # A component could not be built; retrying will not fix configuration
+                return
+            await asyncio.sleep(self.warmup_retry_s)
+
+        self.ready_at = time.perf_counter()
+        print(f"Components ready in {(self.ready_at - self.created_at) * 1000:.0f} ms")
+
+    async def _build(self) -> None:
+        await asyncio.gather(*(self._check(n, asyncio.to_thread(getattr, self, n)) for n in WARM_BUILD))
+        await self._check("dependents", asyncio.to_thread(self._build_all, WARM_DEPENDENTS))
+
+    async def close(self) -> None:
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+        if self._build_task is not None:
+            # Threads cannot be interrupted; let in-flight builds finish
+            await asyncio.gather(self._build_task, return_exceptions=True)
+
+        # Only what was actually built is closed
+        if self.built("ingest_jobs"):
+            await self.ingest_jobs.close()
+        if self.built("bulk_ingester"):
+            self.bulk_ingester.close()
+        for name in ("embedding_generator", "vectorstore", "reranker", "qa_generator"):
+            if self.built(name):
+                await getattr(self, name).close()
+        if self.built("provider_transport") and self.provider_transport is not None:
+            await self.provider_transport.aclose()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "ready_ms": (
+                round((self.ready_at - self.created_at) * 1000, 1) if self.ready else None
+            ),
+            "checks": self.checks,
+        }
+
+    async def _check(self, name: str, awaitable) -> None:
+        start = time.perf_counter()
+        try:
+            await awaitable
+            self.checks[name] = {"ok": True}
+        except Exception as e:
+            print(f"[WARN] Warmup step {name} failed: {e}")
+            self.checks[name] = {"ok": False, "error": str(e)}
+        self.checks[name]["ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def _build_all(self, names) -> None:
+        for name in names:
+            getattr(self, name)
+
+    # ---- PROVIDER CLIENTS ----
+    # PROVIDERS=fake swaps Cohere and Groq for deterministic local stand-ins
+    def _build_fake_clients(self) -> Optional[Dict[str, Any]]:
+        if os.getenv("PROVIDERS", "live") != "fake":
+            return None
+        from rag.fakes import HashEmbedClient, FakeRerankClient, FakeChatClient
+
+        return {
+            "embed": HashEmbedClient(rtt_ms=float(os.getenv("FAKE_EMBED_MS", "20"))),
+            "rerank": FakeRerankClient(latency_ms=float(os.getenv("FAKE_RERANK_MS", "30"))),
+            "llm": FakeChatClient(
+                ttft_ms=float(os.getenv("FAKE_LLM_TTFT_MS", "150")),
+                per_token_ms=float(os.getenv("FAKE_LLM_TOKEN_MS", "5")),
+            ),
+        }
+
+    def _fake(self, kind: str) -> Any:
+        return self.fake_clients[kind] if self.fake_clients else None
+
+    def _build_provider_transport(self):
+        # Fakes make no HTTP calls
+        if self.fake_clients:
+            return None
+        from rag.transport import ProviderTransport
+
+        # Size the pool to the provider calls one worker has in flight:
+        # embed concurrency plus a search, rerank and completion per query
+        return ProviderTransport(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "64")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "32")),
+            keepalive_s=float(os.getenv("HTTP_KEEPALIVE_S", "30")),
+            retries=int(os.getenv("HTTP_RETRIES", "2")),
+            backoff_base=float(os.getenv("HTTP_BACKOFF_S", "0.2")),
+            backoff_max=float(os.getenv("HTTP_BACKOFF_MAX_S", "2")),
+            hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+        )
+
+    def _stage(self, name: str, read_s: str, idempotent: bool = True, hedge_paths=()):
+        """The shared transport's view for one stage, or None with fakes."""
+        if self.provider_transport is None:
+            return None
+        from rag.transport import parse_stages
+
+        return self.provider_transport.stage(
+            name,
+            connect_s=float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "3")),
+            read_s=float(os.getenv(f"{name.upper()}_READ_TIMEOUT_S", read_s)),
+            idempotent=idempotent,
+            # Opt-in, e.g. HEDGE_STAGES=embed,rerank,search
+            hedge=name in parse_stages(os.getenv("HEDGE_STAGES", "")),
+            hedge_paths=hedge_paths,
+        )
+
+    def _build_provider_limiter(self):
+        from rag.admission import PROVIDERS, ProviderLimiter
+
+        # Size to the plan's quotas, e.g. EMBED_RPM=2000 LLM_RPM=30
+        # LLM_TPM=6000; unset or 0 means no limit
+        return ProviderLimiter(
+            {
+                provider: {
+                    "rpm": float(os.getenv(f"{provider.upper()}_RPM", "0")),
+                    "tpm": float(os.getenv(f"{provider.upper()}_TPM", "0")),
+                }
+                for provider in PROVIDERS
+            },
+            burst_s=float(os.getenv("RATE_LIMIT_BURST_S", "10")),
+        )
+
+    def _build_admission(self):
+        from rag.admission import AdmissionController
+
+        max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+        if max_queue < 0:
+            raise ValueError("ADMISSION_MAX_QUEUE must be >= 0")
+
+        return AdmissionController(
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "32")),
+            max_queue=max_queue,
+            max_wait_s=float(os.getenv("ADMISSION_MAX_WAIT_S", "10")),
+            bulk_share=float(os.getenv("ADMISSION_BULK_SHARE", "0.25")),
+        )
+
+    # ---- COMPONENTS ----
+    def _build_embedding_cache(self):
+        from rag.embedding_cache import EmbeddingCache
+
+        return EmbeddingCache(
+            max_entries=int(os.getenv("EMBED_CACHE_SIZE", "10000")),
+            path=os.getenv("EMBED_CACHE_PATH") or None,
+        )
+
+    def _build_embedding_generator(self):
+        from rag.embeddings import EmbeddingGenerator
+
+        return EmbeddingGenerator(
+            cache=self.embedding_cache,
+            client=self._fake("embed"),
+            transport=self._stage("embed", read_s="20"),
+            limiter=self.provider_limiter,
+            max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", "96")),
+            max_batch_tokens=int(os.getenv("EMBED_BATCH_TOKENS", "40000")),
+            max_concurrency=int(os.getenv("EMBED_CONCURRENCY", "4")),
+        )
+
+    def _build_vectorstore(self):
+        if os.getenv("VECTOR_BACKEND", "qdrant") == "local":
+            from rag.local_vectorstore import LocalVectorStore
+
+            return LocalVectorStore(
+                path=os.getenv("LOCAL_INDEX_PATH", "local_index"),
+                dtype=os.getenv("LOCAL_INDEX_DTYPE", "float32"),
+            )
+
+        from rag.text_store import CompressedTextStore
+        from rag.vectorstore import QdrantVectorStore
+
+        # Compact mode: quantized HNSW with rescoring, on-disk vectors and
+        # chunk text in a local compressed side store (all off by default)
+        return QdrantVectorStore(
+            recreate=False,
+            # Only searches are hedged; upserts and deletes are retried
+            transport=self._stage("search", read_s="10", hedge_paths=("/points/search",)),
+            limiter=self.provider_limiter,
+            quantization=os.getenv("QDRANT_QUANTIZATION") or None,
+            oversampling=float(os.getenv("QDRANT_OVERSAMPLING", "2.0")),
+            on_disk=_env_flag("QDRANT_ON_DISK", "false"),
+            hnsw_m=int(os.getenv("QDRANT_HNSW_M", "0")) or None,
+            hnsw_ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "0")) or None,
+            search_ef=int(os.getenv("QDRANT_SEARCH_EF", "0")) or None,
+            text_store=(
+                CompressedTextStore(os.getenv("TEXT_STORE_PATH"))
+                if os.getenv("TEXT_STORE_PATH") else None
+            ),
+        )
+
+    def _build_lexical_index(self):
+        if not _env_flag("HYBRID_ENABLED", "false"):
+            return None
+        from rag.lexical import BM25Index
+
+        return BM25Index(path=os.getenv("LEXICAL_INDEX_PATH", "lexical_index"))
+
+    def _build_query_batcher(self):
+        if not _env_flag("QUERY_BATCH_ENABLED", "false"):
+            return None
+        from rag.query_batcher import QueryEmbeddingBatcher
+
+        return QueryEmbeddingBatcher(
+            self.embedding_generator,
+            max_wait_ms=float(os.getenv("QUERY_BATCH_WAIT_MS", "3")),
+            max_batch_size=int(os.getenv("QUERY_BATCH_SIZE", "32")),
+            timeout_s=float(os.getenv("QUERY_BATCH_TIMEOUT", "10")),
+        )
+
+    def _build_retriever(self):
+        from rag.retriever import MMRRetriever
+
+        return MMRRetriever(
+            self.vectorstore,
+            self.embedding_generator,
+            k=8,
+            use_mmr=_env_flag("MMR_ENABLED", "true"),
+            fetch_k=int(os.getenv("MMR_FETCH_K", "32")),
+            lambda_mult=float(os.getenv("MMR_LAMBDA", "0.5")),
+            lexical_index=self.lexical_index,
+            hybrid=self.lexical_index is not None,
+            query_batcher=self.query_batcher,
+        )
+
+    def _build_reranker(self):
+        from rag.reranker import CohereReranker
+
+        # Adaptive rerank: clear winners and confident local orders skip Cohere
+        return CohereReranker(
+            top_n=4,
+            client=self._fake("rerank"),
+            transport=self._stage("rerank", read_s="10"),
+            limiter=self.provider_limiter,
+            adaptive=_env_flag("RERANK_ADAPTIVE", "true"),
+            skip_margin=float(os.getenv("RERANK_SKIP_MARGIN", "0.1")),
+            uncertain_margin=float(os.getenv("RERANK_UNCERTAIN_MARGIN", "0.15")),
+            budget_ms=float(os.getenv("RERANK_BUDGET_MS", "1000")) or None,
+        )
+
+    def _build_chunker(self):
+        # Loads the tiktoken cl100k_base encoder
+        from rag.chunking import SentenceAwareChunker
+
+        return SentenceAwareChunker(
+            min_tokens=800,
+            max_tokens=1200,
+            overlap_ratio=0.12
+        )
+
+    def _build_qa_generator(self):
+        from rag.context import ContextPacker
+        from rag.qa import QAGenerator
+
+        # Adjacent chunks are merged and their overlap dropped before the
+        # prompt is trimmed to CONTEXT_MAX_TOKENS (0 = no limit)
+        return QAGenerator(
+            client=self._fake("llm"),
+            # Completions are not idempotent: only unsent requests are retried
+            transport=self._stage("generate", read_s="30", idempotent=False),
+            limiter=self.provider_limiter,
+            completion_tokens_estimate=int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "256")),
+            packer=ContextPacker(
+                max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "3000")),
+                merge_adjacent=_env_flag("CONTEXT_MERGE", "true"),
+                dedup=_env_flag("CONTEXT_DEDUP", "true"),
+                encoding=self.chunker.encoding,
+            ),
+        )
+
+    def _build_answer_cache(self):
+        from rag.answer_cache import SemanticAnswerCache
+
+        return SemanticAnswerCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "600")),
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        )
+
+    def _build_streaming_pipeline(self):
+        from rag.ingest import StreamingIngestPipeline
+
+        return StreamingIngestPipeline(
+            self.chunker,
+            self.embedding_generator,
+            self.vectorstore,
+            batch_size=int(os.getenv("INGEST_BATCH_SIZE", "64")),
+            queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "4")),
+            lexical_index=self.lexical_index,
+        )
+
+    def _build_ingest_jobs(self):
+        from rag.jobs import IngestJobQueue
+
+        return IngestJobQueue(
+            self.streaming_pipeline,
+            workers=int(os.getenv("INGEST_JOB_WORKERS", "2")),
+            max_queued=int(os.getenv("INGEST_JOB_QUEUE_SIZE", "16")),
+            on_complete=lambda job: self.answer_cache.invalidate(),
+        )
+
+    def _build_bulk_ingester(self):
+        from rag.bulk import BulkIngester
+
+        return BulkIngester(
+            self.streaming_pipeline,
+            workers=int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 2))),
+            batch_size=int(os.getenv("BULK_BATCH_SIZE", "96")),
+        )
@@ -0,0 +1,183 @@
+"""
+Token-budgeted context packing for the LLM prompt.
+Reranked chunks that are adjacent in their document are merged, the
+overlap the chunker repeats between neighbours is dropped, and the
+result is trimmed to a token budget. Each packed block becomes one
+[i] in the prompt and remembers which chunks it came from.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+
+import tiktoken
+
+from rag.chunking import split_sentences
+
+
+# Sentences shorter than this may legitimately repeat ("Yes.", table cells)
+MIN_DEDUP_TOKENS = 8
+
+# A trimmed block shorter than this is dropped instead
+MIN_BLOCK_TOKENS = 64
+
+
+class ContextPacker:
+    """
+    Turns ranked chunks into prompt blocks. Blocks keep the rank order of
+    their best chunk; sentences inside a block keep document order.
+    Token counts use the chunker's tiktoken encoding, so they approximate
+    the LLM's own tokenizer.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        merge_adjacent: bool = True,
+        dedup: bool = True,
+        encoding: Optional[tiktoken.Encoding] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.merge_adjacent = merge_adjacent
+        self.dedup = dedup
+        self.encoding = encoding or tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def pack(
+        self,
+        chunks: List[Dict[str, Any]],
+        max_tokens: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Returns (blocks, stats). Blocks carry chunk_index (their [i]), text,
+        source, section, position (first chunk) and positions (every chunk
+        whose text made it into the block).
+        stats has context_tokens_before/after and the chunk and block counts.
+        `max_tokens` overrides the packer's budget for this call.
+        """
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        groups = self._group(chunks)
+
+        blocks = []
+        seen = set()
+        tokens_before = sum(
+            c.get("token_count") or self.count_tokens(c["text"]) for c in chunks
+        )
+        tokens_after = 0
+
+        for group in groups:
+            sentences: List[str] = []
+            origins: List[int] = []
+            for chunk in group:
+                chunk_sentences = split_sentences(chunk["text"])
+                if sentences:
+                    chunk_sentences = chunk_sentences[_overlap(sentences, chunk_sentences):]
+                sentences.extend(chunk_sentences)
+                origins.extend([chunk.get("position", -1)] * len(chunk_sentences))
+
+            lengths = self._token_lengths(sentences)
+
+            kept: List[str] = []
+            kept_positions: List[int] = []
+            kept_tokens = 0
+            truncated = False
+            budget_left = (
+                max_tokens - tokens_after if max_tokens > 0 else None
+            )
+            for sentence, length, origin in zip(sentences, lengths, origins):
+                if self.dedup and length >= MIN_DEDUP_TOKENS:
+                    key = " ".join(sentence.split()).lower()
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                if budget_left is not None and kept_tokens + length > budget_left:
+                    room = budget_left - kept_tokens
+                    if kept_tokens < MIN_BLOCK_TOKENS and room >= MIN_BLOCK_TOKENS:
+                        # An over-long sentence (e.g. PDF text without
+                        # terminators) would leave only a stub: cut it instead
+                        kept.append(self._cut(sentence, room))
+                        kept_tokens += room
+                        if origin not in kept_positions:
+                            kept_positions.append(origin)
+                    truncated = True
+                    break
+                kept.append(sentence)
+                kept_tokens += length
+                if origin not in kept_positions:
+                    kept_positions.append(origin)
+
+            if truncated and kept_tokens < MIN_BLOCK_TOKENS:
+                # Only a stub would fit: not worth a citation number, but a
+                # later, shorter group may still fit
+                continue
+            if not kept:
+                continue
+
+            first = group[0]
+            blocks.append({
+                "chunk_index": len(blocks) + 1,
+                "text": " ".join(kept),
+                "source": first["source"],
+                "section": first.get("section", "unknown"),
+                "position": kept_positions[0],
+                # Chunks that still contribute text after dedup and trimming
+                "positions": kept_positions,
+            })
+            tokens_after += kept_tokens
+            if truncated:
+                break
+
+        return blocks, {
+            "context_chunks": len(chunks),
+            "context_blocks": len(blocks),
+            "context_tokens_before": tokens_before,
+            "context_tokens_after": tokens_after,
+        }
+
+    def _group(self, chunks: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Runs of consecutive positions per source, ordered by their
+        best-ranked chunk. Without merging every chunk is its own group.
+        """
+        if not self.merge_adjacent:
+            return [[c] for c in chunks]
+
+        rank = {id(c): r for r, c in enumerate(chunks)}
+        by_source: Dict[Any, List[Dict[str, Any]]] = {}
+        for c in chunks:
+            by_source.setdefault(c["source"], []).append(c)
+
+        groups = []
+        for members in by_source.values():
+            members = sorted(members, key=lambda c: c.get("position", -1))
+            run = [members[0]]
+            for c in members[1:]:
+                prev = run[-1].get("position", -1)
+                if prev >= 0 and c.get("position") == prev:
+                    # Same chunk twice (e.g. hybrid duplicates): keep one
+                    continue
+                if prev >= 0 and c.get("position") == prev + 1:
+                    run.append(c)
+                else:
+                    groups.append(run)
+                    run = [c]
+            groups.append(run)
+
+        groups.sort(key=lambda g: min(rank[id(c)] for c in g))
+        return groups
+
+    def _cut(self, text: str, max_tokens: int) -> str:
+        return self.encoding.decode(self.encoding.encode_ordinary(text)[:max_tokens])
+
+    def _token_lengths(self, sentences: List[str]) -> List[int]:
+        if not sentences:
+            return []
+        return [len(t) for t in self.encoding.encode_ordinary_batch(sentences)]
+
+
+def _overlap(previous: List[str], current: List[str]) -> int:
+    """Length of the longest suffix of `previous` that starts `current`."""
+    for k in range(min(len(previous), len(current)), 0, -1):
+        if previous[-k:] == current[:k]:
+            return k
+    return 0
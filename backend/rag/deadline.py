@@ -0,0 +1,107 @@
+"""
+End-to-end latency budgets for /query.
+A Deadline splits a request's budget across the pipeline stages. Each
+stage gets its share of the time still left, so whatever a fast stage
+saves rolls forward to the later ones. The Deadline also records which
+degradations the request needed to finish in time.
+"""
+
+import asyncio
+import time
+from typing import List, Dict, Any, Awaitable, Optional
+
+from rag.telemetry import QUERY_DEGRADATIONS
+
+
+# Share of the budget per stage, in pipeline order
+STAGE_SHARES = {
+    "embed": 0.10,
+    "search": 0.15,
+    "rerank": 0.20,
+    "generate": 0.55,
+}
+
+# Retrieval cannot be skipped, so small budgets still give it this long
+# (capped at what is left); later stages degrade instead
+STAGE_FLOORS_MS = {
+    "embed": 100.0,
+    "search": 100.0,
+}
+
+# Degradations, reported in metrics.degradations
+DEGRADATIONS = (
+    "lexical_only",       # embed or search missed its budget; BM25 hits only
+    "retrieval_timeout",  # retrieval missed its budget with nothing to fall back on
+    "rerank_skipped",     # no time left to rerank; retrieval order
+    "rerank_timeout",     # Cohere missed its budget; local rerank order
+    "context_shrunk",     # fewer context tokens so the LLM can answer in time
+    "extractive_answer",  # the LLM missed its budget; sentences from the top chunks
+)
+
+
+class Deadline:
+    """budget_ms=None means no deadline: every stage gets unlimited time."""
+
+    def __init__(
+        self,
+        budget_ms: Optional[float],
+        shares: Optional[Dict[str, float]] = None,
+        floors: Optional[Dict[str, float]] = None,
+    ):
+        self.budget_ms = budget_ms
+        self.shares = shares or STAGE_SHARES
+        self.floors = STAGE_FLOORS_MS if floors is None else floors
+        self.start = time.perf_counter()
+        self.stage_budgets: Dict[str, float] = {}
+        self.degradations: List[str] = []
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.budget_ms is None:
+            return None
+        return self.budget_ms - (time.perf_counter() - self.start) * 1000
+
+    def budget_for(self, stage: str) -> Optional[float]:
+        """This stage's share of the remaining budget (at least its floor), in ms."""
+        if self.budget_ms is None:
+            return None
+        stages = list(self.shares)
+        later = stages[stages.index(stage):]
+        share = self.shares[stage] / sum(self.shares[s] for s in later)
+        remaining = max(0.0, self.remaining_ms())
+        ms = max(remaining * share, min(self.floors.get(stage, 0.0), remaining))
+        self.stage_budgets[stage] = round(ms, 1)
+        return ms
+
+    def planned_ms(self, stage: str) -> Optional[float]:
+        """The stage's share of the whole budget, before any time is spent."""
+        if self.budget_ms is None:
+            return None
+        return self.budget_ms * self.shares[stage]
+
+    async def run(
+        self,
+        stage: str,
+        awaitable: Awaitable,
+        budget_ms: Optional[float] = None,
+    ) -> Any:
+        """
+        Await within the stage's budget (or `budget_ms` if already computed).
+        The awaitable is cancelled and asyncio.TimeoutError raised when it runs out.
+        """
+        if budget_ms is None:
+            budget_ms = self.budget_for(stage)
+        timeout = budget_ms / 1000 if budget_ms is not None else None
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+
+    def degrade(self, kind: str) -> None:
+        self.degradations.append(kind)
+        QUERY_DEGRADATIONS.labels(kind).inc()
+
+    def metrics(self) -> Dict[str, Any]:
+        remaining = self.remaining_ms()
+        return {
+            "budget_ms": self.budget_ms,
+            "stage_budgets_ms": self.stage_budgets,
+            "degradations": self.degradations,
+            "deadline_met": remaining is None or remaining >= 0,
+        }
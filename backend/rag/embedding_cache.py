@@ -0,0 +1,166 @@
+"""
+Content-addressed embedding cache.
+Bounded in-memory LRU tier with an optional persistent SQLite tier.
+The SQLite tier does blocking disk I/O; async callers should run
+get_many/put_many in a worker thread when `persistent` is set.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+
+class EmbeddingCache:
+    """
+    Caches embeddings keyed by (model, input_type, sha256(text)).
+    Vectors are stored as float32; the disk tier survives restarts.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        # _lock guards the memory tier and counters, _db_lock the SQLite
+        # connection, so memory lookups never wait on disk I/O
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+        # ---- COUNTERS ----
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self.upstream_texts = 0
+        self.upstream_ms = 0.0
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    @staticmethod
+    def key(model: str, input_type: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}:{input_type}:{digest}"
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Look up keys, returning None for misses. Disk hits are promoted."""
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        pending: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, k in enumerate(keys):
+                vec = self._memory.get(k)
+                if vec is not None:
+                    self._memory.move_to_end(k)
+                    results[i] = vec
+                    self.memory_hits += 1
+                else:
+                    pending.setdefault(k, []).append(i)
+
+        found = {}
+        if pending:
+            with self._db_lock:
+                if self._db is not None:
+                    found = self._load(list(pending))
+
+        with self._lock:
+            for k, vec in found.items():
+                self._remember(k, vec)
+                for i in pending.pop(k):
+                    results[i] = vec
+                    self.disk_hits += 1
+
+            self.misses += sum(len(v) for v in pending.values())
+
+        return results
+
+    def peek(self, key: str) -> Optional[List[float]]:
+        """Memory-tier lookup; only hits are counted, misses are left to get_many."""
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vec
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+
+        with self._lock:
+            for k, vec in items.items():
+                self._remember(k, vec)
+
+        with self._db_lock:
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(k, array("f", vec).tobytes()) for k, vec in items.items()],
+                )
+                self._db.commit()
+
+    def record_upstream(self, n_texts: int, elapsed_ms: float) -> None:
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_texts += n_texts
+            self.upstream_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        ms_per_text = (
+            self.upstream_ms / self.upstream_texts if self.upstream_texts else 0.0
+        )
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "upstream_calls": self.upstream_calls,
+            "upstream_texts": self.upstream_texts,
+            "upstream_ms": round(self.upstream_ms, 2),
+            # Estimate: every hit would have cost the average per-text latency
+            "estimated_saved_ms": round(hits * ms_per_text, 2),
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ---- INTERNALS (caller holds _lock, or _db_lock for _load) ----
+    def _remember(self, k: str, vec: List[float]) -> None:
+        self._memory[k] = vec
+        self._memory.move_to_end(k)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            )
+            for k, blob in rows:
+                vec = array("f")
+                vec.frombytes(blob)
+                found[k] = vec.tolist()
+        return found
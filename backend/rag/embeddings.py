@@ -1,43 +1,227 @@
+import asyncio
 import os
-from typing import List
+import random
+import time
+from typing import List, Optional, Any
 import cohere
+import httpx
 from dotenv import load_dotenv
+from rag.admission import ProviderLimiter
+from rag.cohere_http import CohereHTTPClient
+from rag.embedding_cache import EmbeddingCache
+from rag.telemetry import timed, record_error
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """Retry on rate limits, server errors and timeouts."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    status = getattr(exc, "http_status", None) or getattr(exc, "status_code", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
 
 
 class EmbeddingGenerator:
     """
     Generates embeddings using Cohere embed-english-v3.0 (1024-D).
+    Large inputs are split into size-capped batches sent concurrently.
     """
 
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        cache: Optional[EmbeddingCache] = None,
+        client: Any = None,
+        max_batch_size: int = 96,         # Cohere per-request text limit
+        max_batch_tokens: int = 40000,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        limiter: Optional[ProviderLimiter] = None,
+    ):
         load_dotenv("environment.env")
 
-        api_key = api_key or os.getenv("COHERE_API_KEY")
-        if not api_key:
-            raise ValueError("COHERE_API_KEY not set")
+        if client is None:
+            api_key = api_key or os.getenv("COHERE_API_KEY")
+            if not api_key:
+                raise ValueError("COHERE_API_KEY not set")
+            if transport is not None:
+                client = CohereHTTPClient(api_key, transport)
+                # The shared transport retries; don't multiply attempts
+                max_retries = 0
+            else:
+                client = cohere.AsyncClient(api_key)
 
-        self.client = cohere.Client(api_key)
+        self.client = client
         self.model = "embed-english-v3.0"
         self.dimension = 1024
+        self.cache = cache
 
-    def embed(
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.limiter = limiter
+        self._semaphore = None
+
+    @timed("embed")
+    async def embed(
         self,
         texts: List[str],
-        mode: str = "document"  # "document" or "query"
+        mode: str = "document",  # "document" or "query"
+        token_counts: Optional[List[int]] = None,
     ) -> List[List[float]]:
         if not texts:
             return []
 
-        input_type = (
+        input_type = self._input_type(mode)
+
+        if self.cache is None:
+            return await self._embed_upstream(texts, input_type, token_counts)
+
+        # ---- CACHE LOOKUP ----
+        keys = [self.cache.key(self.model, input_type, t) for t in texts]
+        results = await self._cache_call(self.cache.get_many, keys)
+
+        # Only unique misses go upstream
+        missing = {}
+        for i, vec in enumerate(results):
+            if vec is None and keys[i] not in missing:
+                missing[keys[i]] = i
+
+        if missing:
+            miss_idx = list(missing.values())
+            fresh = await self._embed_upstream(
+                [texts[i] for i in miss_idx],
+                input_type,
+                [token_counts[i] for i in miss_idx] if token_counts else None,
+            )
+
+            fresh_by_key = dict(zip(missing.keys(), fresh))
+            await self._cache_call(self.cache.put_many, fresh_by_key)
+
+            # ---- RESTORE ORIGINAL ORDER ----
+            for i, vec in enumerate(results):
+                if vec is None:
+                    results[i] = fresh_by_key[keys[i]]
+
+        return results
+
+    async def _cache_call(self, fn, arg):
+        # The SQLite tier blocks on disk: keep it off the event loop
+        if self.cache.persistent:
+            return await asyncio.to_thread(fn, arg)
+        return fn(arg)
+
+    def peek(self, text: str, mode: str = "query") -> Optional[List[float]]:
+        """Cached embedding from the in-memory tier, without going upstream."""
+        if self.cache is None:
+            return None
+        return self.cache.peek(
+            self.cache.key(self.model, self._input_type(mode), text)
+        )
+
+    @staticmethod
+    def _input_type(mode: str) -> str:
+        return (
             "search_document"
             if mode == "document"
             else "search_query"
         )
 
-        response = self.client.embed(
-            texts=texts,
-            model=self.model,
-            input_type=input_type
-        )
+    def _make_batches(
+        self,
+        texts: List[str],
+        token_counts: Optional[List[int]],
+    ) -> List[List[int]]:
+        """Group text indices into batches capped by count and total tokens."""
+        batches = []
+        current = []
+        current_tokens = 0
+
+        for i, text in enumerate(texts):
+            # Rough 4 chars/token estimate when the chunker count is unknown
+            tokens = token_counts[i] if token_counts else len(text) // 4 + 1
+
+            if current and (
+                len(current) >= self.max_batch_size
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+
+            current.append(i)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    async def _embed_upstream(
+        self,
+        texts: List[str],
+        input_type: str,
+        token_counts: Optional[List[int]] = None,
+    ) -> List[List[float]]:
+        batches = self._make_batches(texts, token_counts)
+
+        if len(batches) == 1:
+            return await self._embed_batch(texts, input_type)
+
+        # gather preserves batch order, so flattening keeps input order
+        results = await asyncio.gather(*(
+            self._embed_batch([texts[i] for i in batch], input_type)
+            for batch in batches
+        ))
+
+        return [vec for batch in results for vec in batch]
+
+    async def _embed_batch(
+        self,
+        texts: List[str],
+        input_type: str,
+    ) -> List[List[float]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                if self.limiter is not None:
+                    # Every attempt counts against the quota
+                    await self.limiter.acquire(
+                        "embed", tokens=sum(len(t) // 4 + 1 for t in texts)
+                    )
+                start = time.perf_counter()
+                try:
+                    response = await self.client.embed(
+                        texts=texts,
+                        model=self.model,
+                        input_type=input_type
+                    )
+                except Exception as e:
+                    record_error("embed", e)
+                    if attempt == self.max_retries or not _is_retryable(e):
+                        raise
+                    delay = self.backoff_base * (2 ** attempt)
+                    delay += random.uniform(0, self.backoff_base)
+                    print(f"[WARN] Cohere embed failed ({e}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                if self.cache is not None:
+                    self.cache.record_upstream(
+                        len(texts), (time.perf_counter() - start) * 1000
+                    )
+                return response.embeddings
+
+    async def warmup(self) -> None:
+        """Open the provider connection (TLS, key check) before the first request."""
+        await self.client.check_api_key()
 
-        return response.embeddings
+    async def close(self) -> None:
+        await self.client.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,187 @@
+"""
+Deterministic local stand-ins for Cohere and Groq.
+They accept the same calls the real clients get from EmbeddingGenerator,
+CohereReranker and QAGenerator, and sleep for a configurable latency, so
+the whole backend runs offline (PROVIDERS=fake) for development and benchmarks.
+"""
+
+import asyncio
+import hashlib
+import re
+from types import SimpleNamespace
+from typing import List, Dict, Any, AsyncIterator
+
+import numpy as np
+
+from rag.lexical import tokenize
+
+
+CONTEXT_BLOCK = re.compile(r"^\[(\d+)\] (.+)$", re.MULTILINE)
+
+
+async def _sleep_ms(ms: float) -> None:
+    if ms > 0:
+        await asyncio.sleep(ms / 1000)
+
+
+class HashEmbedClient:
+    """
+    Feature-hashed bag of words: each term adds +-1 to one of `dimension`
+    buckets. Texts sharing terms get similar vectors, so retrieval over
+    fake embeddings still behaves like retrieval.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 1024,
+        rtt_ms: float = 0.0,
+        per_text_ms: float = 0.0,
+    ):
+        self.dimension = dimension
+        self.rtt_ms = rtt_ms
+        self.per_text_ms = per_text_ms
+
+    def _vector(self, text: str) -> List[float]:
+        vec = np.zeros(self.dimension, dtype=np.float32)
+        for term in tokenize(text):
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            h = int.from_bytes(digest, "little")
+            vec[h % self.dimension] += 1.0 if (h >> 63) else -1.0
+
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            vec[0] = 1.0
+        else:
+            vec /= norm
+        return vec.tolist()
+
+    async def embed(self, texts: List[str], model: str, input_type: str):
+        await _sleep_ms(self.rtt_ms + self.per_text_ms * len(texts))
+        return SimpleNamespace(embeddings=[self._vector(t) for t in texts])
+
+    async def check_api_key(self) -> Dict[str, bool]:
+        await _sleep_ms(self.rtt_ms)
+        return {"valid": True}
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeRerankClient:
+    """Ranks documents by the fraction of query terms they contain."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+
+    async def rerank(
+        self,
+        query: str,
+        documents: List[str],
+        top_n: int,
+        model: str = None,
+    ):
+        await _sleep_ms(self.latency_ms)
+
+        terms = set(tokenize(query)) or {""}
+        scored = []
+        for i, doc in enumerate(documents):
+            overlap = len(terms & set(tokenize(doc))) / len(terms)
+            scored.append(SimpleNamespace(index=i, relevance_score=overlap))
+
+        scored.sort(key=lambda r: (-r.relevance_score, r.index))
+        return SimpleNamespace(results=scored[:top_n])
+
+    async def check_api_key(self) -> Dict[str, bool]:
+        await _sleep_ms(self.latency_ms)
+        return {"valid": True}
+
+    async def close(self) -> None:
+        pass
+
+
+class _FakeCompletions:
+    def __init__(self, ttft_ms: float, per_token_ms: float, max_citations: int):
+        self.ttft_ms = ttft_ms
+        self.per_token_ms = per_token_ms
+        self.max_citations = max_citations
+
+    def _answer(self, messages: List[Dict[str, str]]) -> str:
+        # Extractive answer: first sentence of the top context blocks, cited
+        prompt = messages[-1]["content"]
+        sentences = []
+        for num, text in CONTEXT_BLOCK.findall(prompt)[: self.max_citations]:
+            first = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+            sentences.append(f"{first.rstrip('.')} [{num}].")
+        return " ".join(sentences) or "No answer found in provided documents."
+
+    @staticmethod
+    def _usage(messages: List[Dict[str, str]], tokens: List[str]) -> Dict[str, int]:
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+
+    async def create(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.0,
+        stream: bool = False,
+        **kwargs: Any,
+    ):
+        answer = self._answer(messages)
+        tokens = re.findall(r"\S+\s*", answer)
+        usage = self._usage(messages, tokens)
+
+        if stream:
+            return self._stream(tokens, usage)
+
+        await _sleep_ms(self.ttft_ms + self.per_token_ms * len(tokens))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            usage=usage,
+        )
+
+    async def _stream(
+        self,
+        tokens: List[str],
+        usage: Dict[str, int],
+    ) -> AsyncIterator[SimpleNamespace]:
+        await _sleep_ms(self.ttft_ms)
+        for i, token in enumerate(tokens):
+            if i:
+                await _sleep_ms(self.per_token_ms)
+            delta = SimpleNamespace(content=token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], x_groq=None)
+
+        # Like Groq, usage arrives on a final chunk without choices
+        yield SimpleNamespace(choices=[], x_groq={"usage": usage})
+
+
+class _FakeModels:
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+
+    async def list(self):
+        await _sleep_ms(self.latency_ms)
+        return SimpleNamespace(data=[SimpleNamespace(id="llama-3.1-8b-instant")])
+
+
+class FakeChatClient:
+    """AsyncGroq-shaped client: chat.completions.create(..., stream=...)."""
+
+    def __init__(
+        self,
+        ttft_ms: float = 0.0,
+        per_token_ms: float = 0.0,
+        max_citations: int = 2,
+    ):
+        self.chat = SimpleNamespace(
+            completions=_FakeCompletions(ttft_ms, per_token_ms, max_citations)
+        )
+        self.models = _FakeModels(ttft_ms)
+
+    async def close(self) -> None:
+        pass
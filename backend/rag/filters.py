@@ -0,0 +1,37 @@
+"""
+Metadata filters shared by the vector stores, BM25 and the API.
+A filter maps a payload field to the values it may take.
+"""
+
+from typing import List, Dict, Any, Optional, Union
+
+
+# Payload fields that carry a keyword index and can be filtered on
+FILTER_FIELDS = ("source", "title", "section")
+
+Filters = Dict[str, List[str]]
+
+
+def normalize_filters(
+    filters: Optional[Dict[str, Union[str, List[str]]]],
+) -> Optional[Filters]:
+    """Validate filters and turn each value into a sorted list of allowed values."""
+    if not filters:
+        return None
+
+    normalized = {}
+    for field, values in filters.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(
+                f"Cannot filter on {field!r}; filterable fields: {', '.join(FILTER_FIELDS)}"
+            )
+        if isinstance(values, str):
+            values = [values]
+        normalized[field] = sorted(set(str(v) for v in values))
+    return normalized
+
+
+def matches_filters(payload: Dict[str, Any], filters: Optional[Filters]) -> bool:
+    if not filters:
+        return True
+    return all(payload.get(field) in values for field, values in filters.items())
@@ -0,0 +1,234 @@
+"""
+Streaming ingestion pipeline.
+Pages -> incremental chunker -> embed -> upsert, overlapped through
+bounded queues so memory stays flat as documents grow.
+Re-ingesting a source only embeds chunks whose text or metadata hash
+changed and deletes positions the new version no longer has.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Set
+
+from rag.chunking import SentenceAwareChunker
+from rag.embeddings import EmbeddingGenerator
+from rag.lexical import BM25Index
+from rag.vectorstore import QdrantVectorStore, chunk_hash, point_id
+
+
+def _new_counts() -> Dict[str, int]:
+    return {"count": 0, "added": 0, "updated": 0, "skipped": 0, "deleted": 0}
+
+
+def _changed_chunks(
+    chunks: List[Dict[str, Any]],
+    existing: Dict[int, str],
+    counts: Dict[str, int],
+) -> List[Dict[str, Any]]:
+    """Hash chunks, tally them, and keep only those that are new or changed."""
+    changed = []
+    for chunk in chunks:
+        chunk["chunk_hash"] = chunk_hash(chunk)
+        old = existing.get(chunk["position"])
+        counts["count"] += 1
+        if old == chunk["chunk_hash"]:
+            counts["skipped"] += 1
+            continue
+        counts["added" if old is None else "updated"] += 1
+        changed.append(chunk)
+    return changed
+
+
+class StreamingIngestPipeline:
+    """
+    Runs chunking in a worker thread and embedding/upserting as async
+    stages. Each queue holds at most `queue_size` micro-batches, so a slow
+    stage back-pressures the ones before it.
+    """
+
+    def __init__(
+        self,
+        chunker: SentenceAwareChunker,
+        embedding_generator: EmbeddingGenerator,
+        vectorstore: QdrantVectorStore,
+        batch_size: int = 64,
+        queue_size: int = 4,
+        embed_workers: int = 2,
+        lexical_index: Optional[BM25Index] = None,
+    ):
+        self.chunker = chunker
+        self.embedding_generator = embedding_generator
+        self.vectorstore = vectorstore
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_workers = embed_workers
+        self.lexical_index = lexical_index
+
+    async def ingest_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        source: str,
+    ) -> Dict[str, int]:
+        """Incrementally ingest an already chunked document."""
+        counts = _new_counts()
+        existing = await self.vectorstore.get_source_hashes(source)
+        changed = _changed_chunks(chunks, existing, counts)
+
+        if changed:
+            embeddings = await self.embedding_generator.embed(
+                [c["text"] for c in changed],
+                mode="document",
+                token_counts=[c["token_count"] for c in changed],
+            )
+            await self.vectorstore.upsert_chunks(changed, embeddings)
+
+        stale = set(existing) - {c["position"] for c in chunks}
+        counts["deleted"] = await self.purge(source, stale)
+
+        if self.lexical_index is not None:
+            if changed:
+                await asyncio.to_thread(self.lexical_index.add, changed)
+            await asyncio.to_thread(self.lexical_index.save)
+
+        return counts
+
+    async def purge(self, source: str, positions: Set[int]) -> int:
+        """Delete stale chunk positions of a source from every index."""
+        if not positions:
+            return 0
+        deleted = await self.vectorstore.delete_positions(source, sorted(positions))
+        if self.lexical_index is not None:
+            await asyncio.to_thread(
+                self.lexical_index.remove,
+                [point_id(source, p) for p in positions],
+            )
+        return deleted
+
+    async def run(
+        self,
+        segments: Iterable[str],
+        source: str,
+        title: str,
+        section: str,
+        separator: str = "\n",
+        progress: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, int]:
+        """
+        Ingest a stream of text segments. Returns chunk counts: count (in the
+        document), added, updated, skipped (unchanged) and deleted (stale).
+        If given, `progress` is updated in place with chunks_embedded and
+        points_upserted as batches complete.
+        """
+        if progress is None:
+            progress = {}
+        progress.setdefault("chunks_embedded", 0)
+        progress.setdefault("points_upserted", 0)
+
+        loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        counts = _new_counts()
+        existing = await self.vectorstore.get_source_hashes(source)
+        seen: Set[int] = set()
+
+        # ---- STAGE 1: segments -> chunk batches (worker thread) ----
+        def put_from_thread(item) -> bool:
+            future = asyncio.run_coroutine_threadsafe(chunk_queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def produce() -> None:
+            try:
+                batch: List[Dict[str, Any]] = []
+                chunks = self.chunker.chunk_stream(
+                    segments,
+                    source=source,
+                    title=title,
+                    section=section,
+                    separator=separator,
+                )
+                for chunk in chunks:
+                    if stop.is_set():
+                        return
+                    batch.append(chunk)
+                    if len(batch) >= self.batch_size:
+                        if not put_from_thread(batch):
+                            return
+                        batch = []
+                if batch:
+                    put_from_thread(batch)
+            finally:
+                put_from_thread(None)
+
+        # ---- STAGE 2: chunk batches -> embeddings ----
+        remaining_embedders = self.embed_workers
+
+        async def embed_stage() -> None:
+            nonlocal remaining_embedders
+            while True:
+                batch = await chunk_queue.get()
+                if batch is None:
+                    # Let sibling embedders see the end marker too
+                    await chunk_queue.put(None)
+                    break
+
+                seen.update(c["position"] for c in batch)
+                batch = _changed_chunks(batch, existing, counts)
+                if not batch:
+                    continue
+
+                embeddings = await self.embedding_generator.embed(
+                    [c["text"] for c in batch],
+                    mode="document",
+                    token_counts=[c["token_count"] for c in batch],
+                )
+                progress["chunks_embedded"] += len(batch)
+                await upsert_queue.put((batch, embeddings))
+
+            remaining_embedders -= 1
+            if remaining_embedders == 0:
+                await upsert_queue.put(None)
+
+        # ---- STAGE 3: embeddings -> vector store ----
+        async def upsert_stage() -> None:
+            while True:
+                item = await upsert_queue.get()
+                if item is None:
+                    break
+                batch, embeddings = item
+                progress["points_upserted"] += await self.vectorstore.upsert_chunks(
+                    batch, embeddings
+                )
+                if self.lexical_index is not None:
+                    await asyncio.to_thread(self.lexical_index.add, batch)
+
+        tasks = [
+            asyncio.ensure_future(asyncio.to_thread(produce)),
+            *(asyncio.ensure_future(embed_stage()) for _ in range(self.embed_workers)),
+            asyncio.ensure_future(upsert_stage()),
+        ]
+
+        try:
+            await asyncio.gather(*tasks)
+            # Only a complete pass knows which positions are gone
+            counts["deleted"] = await self.purge(source, set(existing) - seen)
+        except BaseException:
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if self.lexical_index is not None:
+                await asyncio.to_thread(self.lexical_index.save)
+
+        return counts
@@ -0,0 +1,190 @@
+"""
+Background ingestion jobs.
+Uploads are queued on a bounded in-process queue and processed by a
+worker pool running the streaming ingest pipeline, so /ingest/jobs can
+return immediately and clients poll for progress.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    # Only for annotations; the ingest stack is imported by whoever builds the queue
+    from rag.ingest import StreamingIngestPipeline
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when max_queued jobs are already waiting."""
+
+
+class IngestJob:
+    def __init__(
+        self,
+        segments: Iterable[str],
+        separator: str,
+        source: str,
+        title: str,
+        section: str,
+        filename: Optional[str] = None,
+        cleanup: Optional[Callable[[], None]] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.segments = segments
+        self.separator = separator
+        self.source = source
+        self.title = title
+        self.section = section
+        self.filename = filename
+        self.cleanup = cleanup
+
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress = {"pages_parsed": 0, "chunks_embedded": 0, "points_upserted": 0}
+        self.result: Optional[Dict[str, int]] = None
+        self.error: Optional[str] = None
+
+    def iter_segments(self) -> Iterator[str]:
+        # Runs in the pipeline's chunking thread; one segment is one PDF page
+        for segment in self.segments:
+            self.progress["pages_parsed"] += 1
+            yield segment
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "source": self.source,
+            "filename": self.filename,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class IngestJobQueue:
+    """
+    Bounded FIFO of ingest jobs served by `workers` coroutines.
+    Finished jobs are kept for polling, up to `max_finished` of them.
+    """
+
+    def __init__(
+        self,
+        pipeline: "StreamingIngestPipeline",
+        workers: int = 2,
+        max_queued: int = 16,
+        max_finished: int = 256,
+        on_complete: Optional[Callable[[IngestJob], None]] = None,
+    ):
+        self.pipeline = pipeline
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.on_complete = on_complete
+
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        # Queue and workers need the event loop, so they start on first submit
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, job: IngestJob) -> IngestJob:
+        if self._queue is None:
+            self._start()
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(
+                f"Ingest queue is full ({self.max_queued} jobs waiting)"
+            ) from None
+
+        self._jobs[job.id] = job
+        return job
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "workers": self.workers,
+            "jobs": by_status,
+        }
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Release spooled uploads of jobs that never ran
+        for job in self._jobs.values():
+            if job.status == "queued" and job.cleanup:
+                job.cleanup()
+
+    # ---- WORKERS ----
+    def _start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        try:
+            job.result = await self.pipeline.run(
+                job.iter_segments(),
+                source=job.source,
+                title=job.title,
+                section=job.section,
+                separator=job.separator,
+                progress=job.progress,
+            )
+            job.status = "succeeded"
+            if job.result["count"] == 0:
+                job.status = "failed"
+                job.error = "Empty content"
+        except Exception as e:
+            print(f"[WARN] Ingest job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.segments = None
+            if job.cleanup:
+                job.cleanup()
+            if self.on_complete:
+                self.on_complete(job)
+            self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in ("succeeded", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
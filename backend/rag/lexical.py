@@ -0,0 +1,363 @@
+"""
+In-process BM25 inverted index.
+Catches exact identifiers (dataset names, model names, codes) that dense
+embeddings tend to blur. Postings are compact typed arrays; updates are
+incremental with tombstones and periodic compaction. On disk, changes go
+to an append-only journal that is folded into a full snapshot once it
+grows past a fraction of the index.
+"""
+
+import json
+import os
+import re
+import threading
+from array import array
+from typing import List, Dict, Any, Optional, Iterator
+
+import numpy as np
+
+from rag.filters import Filters, matches_filters
+from rag.vectorstore import point_id
+
+
+# Alphanumeric runs, keeping internal - _ . joins ("cost-focal", "ip102", "v3.0")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+JOINERS = re.compile(r"[-_.]")
+
+# Payload fields kept for lexical-only hits
+PAYLOAD_FIELDS = ("text", "source", "position", "title", "section")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Lowercased terms; joined terms also yield their parts."""
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        yield token
+        if JOINERS.search(token):
+            yield from (p for p in JOINERS.split(token) if p)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, keyed by the same point IDs as the
+    vector store so results can be fused with dense hits.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_ratio: float = 0.25,
+    ):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._reset()
+
+        # ---- JOURNAL: (pid, payload or None for a removal) not yet on disk ----
+        self._pending: List[tuple] = []
+        self._journaled = 0
+        self._generation = 0
+
+        if path and os.path.exists(os.path.join(path, "docs.json")):
+            self._load()
+
+    def _reset(self) -> None:
+        # ---- PER-DOCUMENT SLOTS ----
+        self._pids: List[int] = []
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._slot_of: Dict[int, int] = {}
+        self._live_docs = 0
+        self._live_length = 0
+
+        # ---- POSTINGS: term -> (slots, term frequencies) ----
+        self._postings: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    # ---- WRITES ----
+    def add(self, chunks: List[Dict[str, Any]]) -> None:
+        """Index chunks, replacing earlier versions of the same point."""
+        with self._lock:
+            for chunk in chunks:
+                pid = point_id(chunk["source"], chunk["position"])
+                self._remove_slot(self._slot_of.get(pid))
+                self._append(pid, chunk)
+                if self.path:
+                    self._pending.append((pid, self._payloads[-1]))
+
+            if len(self._pids) - self._live_docs > self.compact_ratio * len(self._pids):
+                self._compact()
+
+    def remove(self, pids: List[int]) -> None:
+        """Drop points, e.g. chunks that no longer exist in their source."""
+        with self._lock:
+            for pid in pids:
+                slot = self._slot_of.pop(pid, None)
+                if slot is not None and self.path:
+                    self._pending.append((pid, None))
+                self._remove_slot(slot)
+
+            if len(self._pids) - self._live_docs > self.compact_ratio * len(self._pids):
+                self._compact()
+
+    def _append(self, pid: int, chunk: Dict[str, Any]) -> None:
+        slot = len(self._pids)
+        terms: Dict[str, int] = {}
+        for term in tokenize(chunk["text"]):
+            terms[term] = terms.get(term, 0) + 1
+        length = sum(terms.values())
+
+        self._pids.append(pid)
+        self._payloads.append({f: chunk.get(f) for f in PAYLOAD_FIELDS if f in chunk})
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._slot_of[pid] = slot
+        self._live_docs += 1
+        self._live_length += length
+
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+            postings[0].append(slot)
+            postings[1].append(min(tf, 0xFFFF))
+
+    def _remove_slot(self, slot: Optional[int]) -> None:
+        if slot is None or not self._alive[slot]:
+            return
+        self._alive[slot] = 0
+        self._payloads[slot] = None
+        self._live_docs -= 1
+        self._live_length -= self._lengths[slot]
+
+    def _compact(self) -> None:
+        """Rebuild postings without tombstoned slots."""
+        live = [
+            (pid, payload)
+            for pid, payload, alive in zip(self._pids, self._payloads, self._alive)
+            if alive
+        ]
+        self._reset()
+        for pid, payload in live:
+            self._append(pid, payload)
+
+    # ---- READS ----
+    def search(
+        self,
+        query: str,
+        limit: int = 8,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+
+        with self._lock:
+            n_slots = len(self._pids)
+            if not terms or self._live_docs == 0:
+                return []
+
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            avgdl = self._live_length / self._live_docs
+            norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+
+            scores = np.zeros(n_slots, dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                slots = np.frombuffer(postings[0], dtype=np.uint32)
+                tf = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+
+                df = int(alive[slots].sum())
+                if df == 0:
+                    continue
+                idf = np.log(1 + (self._live_docs - df + 0.5) / (df + 0.5))
+                scores[slots] += idf * tf * (self.k1 + 1) / (tf + norm[slots])
+
+            scores[~alive] = 0.0
+            matched = np.flatnonzero(scores > 0)
+            if filters:
+                # Only slots sharing a query term are checked, before top-k
+                matched = np.array(
+                    [s for s in matched if matches_filters(self._payloads[s], filters)],
+                    dtype=np.int64,
+                )
+            if len(matched) > limit:
+                matched = matched[np.argpartition(scores[matched], -limit)[-limit:]]
+            matched = matched[np.argsort(-scores[matched])]
+
+            return [
+                {
+                    "id": self._pids[slot],
+                    "lexical_score": float(scores[slot]),
+                    **self._payloads[slot],
+                }
+                for slot in matched
+            ]
+
+    # ---- PERSISTENCE ----
+    def save(self) -> None:
+        """
+        Persist changes since the last save to `path`. They are appended to
+        the journal; a full snapshot is written only when the journal holds
+        more than compact_ratio of the indexed documents.
+        """
+        if not self.path:
+            return
+
+        with self._save_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                journaled = self._journaled + len(pending)
+                snapshot = (
+                    not os.path.exists(os.path.join(self.path, "docs.json"))
+                    or journaled > self.compact_ratio * max(1, len(self._pids))
+                )
+                if snapshot:
+                    state = self._capture()
+
+            if snapshot:
+                self._write_snapshot(state)
+            elif pending:
+                self._append_journal(pending)
+                self._journaled = journaled
+
+    def _journal_path(self, generation: int) -> str:
+        return os.path.join(self.path, f"journal-{generation}.jsonl")
+
+    def _append_journal(self, records: List[tuple]) -> None:
+        with open(self._journal_path(self._generation), "a", encoding="utf-8") as f:
+            for pid, payload in records:
+                f.write(json.dumps({"pid": pid, "doc": payload}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _capture(self) -> Dict[str, Any]:
+        """
+        Copy what a snapshot needs; called under _lock. Postings arrays
+        only grow until _compact replaces them, so their current lengths
+        are enough to read a consistent prefix after the lock is released.
+        """
+        return {
+            "pids": list(self._pids),
+            "payloads": list(self._payloads),
+            "lengths": array("I", self._lengths),
+            "alive": bytes(self._alive),
+            "postings": [
+                (term, slots, tfs, len(slots))
+                for term, (slots, tfs) in self._postings.items()
+            ],
+        }
+
+    def _write_snapshot(self, state: Dict[str, Any]) -> None:
+        """Write a snapshot and start a new journal; called under _save_lock."""
+        postings = state["postings"]
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        for i, (_, _, _, n) in enumerate(postings):
+            offsets[i + 1] = offsets[i] + n
+
+        slots = np.empty(offsets[-1], dtype=np.uint32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, (_, term_slots, term_tfs, n) in enumerate(postings):
+            # Slicing copies the prefix without holding a buffer export
+            slots[offsets[i]:offsets[i + 1]] = term_slots[:n]
+            tfs[offsets[i]:offsets[i + 1]] = term_tfs[:n]
+
+        generation = self._generation + 1
+        docs = {
+            "pids": state["pids"],
+            "lengths": state["lengths"].tolist(),
+            "alive": list(state["alive"]),
+            "payloads": state["payloads"],
+            "terms": [term for term, _, _, _ in postings],
+            "generation": generation,
+        }
+
+        os.makedirs(self.path, exist_ok=True)
+        np.savez(
+            os.path.join(self.path, "postings.tmp.npz"),
+            offsets=offsets,
+            slots=slots,
+            tfs=tfs,
+        )
+        with open(os.path.join(self.path, "docs.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(docs, f)
+
+        # docs.json is swapped last; it is the file that marks a valid snapshot
+        # and names the journal that applies on top of it
+        os.replace(
+            os.path.join(self.path, "postings.tmp.npz"),
+            os.path.join(self.path, "postings.npz"),
+        )
+        os.replace(
+            os.path.join(self.path, "docs.json.tmp"),
+            os.path.join(self.path, "docs.json"),
+        )
+
+        stale = self._journal_path(self._generation)
+        if os.path.exists(stale):
+            os.remove(stale)
+        self._generation = generation
+        self._journaled = 0
+
+    def _load(self) -> None:
+        with open(os.path.join(self.path, "docs.json"), "r", encoding="utf-8") as f:
+            docs = json.load(f)
+        data = np.load(os.path.join(self.path, "postings.npz"))
+        offsets, slots, tfs = data["offsets"], data["slots"], data["tfs"]
+
+        self._pids = docs["pids"]
+        self._payloads = docs["payloads"]
+        self._lengths = array("I", docs["lengths"])
+        # Snapshots before the journal held live documents only
+        self._alive = bytearray(docs.get("alive") or [1] * len(self._pids))
+        self._slot_of = {
+            pid: slot for slot, pid in enumerate(self._pids) if self._alive[slot]
+        }
+        self._live_docs = len(self._slot_of)
+        self._live_length = sum(
+            length for length, alive in zip(self._lengths, self._alive) if alive
+        )
+
+        for i, term in enumerate(docs["terms"]):
+            lo, hi = offsets[i], offsets[i + 1]
+            self._postings[term] = (
+                array("I", slots[lo:hi].tobytes()),
+                array("H", tfs[lo:hi].tobytes()),
+            )
+
+        self._generation = docs.get("generation", 0)
+        self._replay()
+
+    def _replay(self) -> None:
+        """Apply the journal written since the snapshot."""
+        journal = self._journal_path(self._generation)
+        if not os.path.exists(journal):
+            return
+
+        with open(journal, "r+b") as f:
+            end = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A record torn by a crash mid-append; drop it so later
+                    # appends are not stranded behind it
+                    f.truncate(end)
+                    break
+                end += len(line)
+                pid, payload = record["pid"], record["doc"]
+                self._remove_slot(self._slot_of.pop(pid, None))
+                if payload is not None:
+                    self._append(pid, payload)
+                self._journaled += 1
+
+        if len(self._pids) - self._live_docs > self.compact_ratio * len(self._pids):
+            self._compact()
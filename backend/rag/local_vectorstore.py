@@ -0,0 +1,478 @@
+"""
+In-process vector index with the same interface as QdrantVectorStore.
+L2-normalized vectors live in one contiguous matrix (float32 or float16);
+payloads are stored as columns. When a path is given every column is a
+memory-mapped, append-only file, so restarts only map files back in.
+Deleted rows are tombstoned and masked out of searches. Filtered searches
+score only the rows whose dictionary codes match, so they cost less than
+unfiltered ones rather than needing a larger k.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+from rag.telemetry import timed
+from rag.filters import Filters
+from rag.vectorstore import chunk_hash, point_id
+
+
+# Payload fields stored dictionary-encoded (int32 code per row)
+CATEGORICAL_FIELDS = ("source", "title", "section")
+
+# Rows scored per block; bounds the float32 upcast of float16 matrices
+SEARCH_BLOCK = 65536
+
+
+class _Column:
+    """Fixed-width column, memory-mapped when persisted, grown by doubling."""
+
+    def __init__(
+        self,
+        path: Optional[str],
+        dtype: np.dtype,
+        width: Tuple[int, ...],
+        capacity: int,
+    ):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.capacity = 0
+        self.data: Optional[np.ndarray] = None
+        self._remap(capacity)
+
+    def ensure(self, size: int) -> None:
+        if size > self.capacity:
+            self._remap(max(size, self.capacity * 2))
+
+    def flush(self) -> None:
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+    def _remap(self, capacity: int) -> None:
+        shape = (capacity, *self.width)
+
+        if self.path is None:
+            data = np.zeros(shape, dtype=self.dtype)
+            if self.data is not None:
+                data[: self.capacity] = self.data[: self.capacity]
+        else:
+            nbytes = int(np.prod(shape)) * self.dtype.itemsize
+            self.flush()
+            mode = "r+b" if os.path.exists(self.path) else "w+b"
+            with open(self.path, mode) as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            data = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=shape)
+
+        # Searches keep using the old array object until they finish
+        self.data = data
+        self.capacity = capacity
+
+
+class _TextHeap:
+    """Append-only UTF-8 text store addressed by (start, end) byte spans."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        if path is None:
+            self._buffer = bytearray()
+            self.size = 0
+        else:
+            self._file = open(path, "a+b")
+            self._file.seek(0, os.SEEK_END)
+            self.size = self._file.tell()
+
+    def append(self, texts: List[str]) -> List[Tuple[int, int]]:
+        blobs = [t.encode("utf-8") for t in texts]
+        spans = []
+        offset = self.size
+        for blob in blobs:
+            spans.append((offset, offset + len(blob)))
+            offset += len(blob)
+
+        if self.path is None:
+            self._buffer.extend(b"".join(blobs))
+        else:
+            self._file.write(b"".join(blobs))
+        self.size = offset
+        return spans
+
+    def read(self, start: int, end: int) -> str:
+        if self.path is None:
+            blob = bytes(self._buffer[start:end])
+        else:
+            blob = os.pread(self._file.fileno(), end - start, start)
+        return blob.decode("utf-8")
+
+    def flush(self) -> None:
+        if self.path is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self.path is not None:
+            self._file.close()
+
+
+class LocalVectorStore:
+    """
+    Cosine top-k over an in-RAM matrix via argpartition.
+    Writes are serialized by a lock; searches read a consistent snapshot.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        collection_name: str = None,
+        dimension: int = 1024,
+        dtype: str = "float32",
+        initial_capacity: int = 1024,
+    ):
+        self.collection_name = collection_name or "mini_rag_docs"
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+
+        self._dir = None
+        if path:
+            self._dir = os.path.join(path, self.collection_name)
+            os.makedirs(self._dir, exist_ok=True)
+
+        meta = self._load_meta()
+        if meta:
+            if meta["dimension"] != dimension or meta["dtype"] != self.dtype.name:
+                raise ValueError(
+                    f"Local index at {self._dir} has dimension={meta['dimension']} "
+                    f"dtype={meta['dtype']}, expected {dimension}/{self.dtype.name}"
+                )
+            self._count = meta["count"]
+            capacity = meta["capacity"]
+            # A field added after the index was written has all-zero codes
+            self._vocab = {f: meta["vocab"].get(f, [""]) for f in CATEGORICAL_FIELDS}
+        else:
+            self._count = 0
+            capacity = initial_capacity
+            self._vocab = {f: [] for f in CATEGORICAL_FIELDS}
+
+        self._vocab_index = {
+            f: {value: code for code, value in enumerate(values)}
+            for f, values in self._vocab.items()
+        }
+
+        # ---- COLUMNS ----
+        self._vectors = _Column(self._file("vectors.bin"), self.dtype, (dimension,), capacity)
+        self._ids = _Column(self._file("ids.bin"), np.uint64, (), capacity)
+        self._positions = _Column(self._file("positions.bin"), np.int64, (), capacity)
+        self._spans = _Column(self._file("spans.bin"), np.int64, (2,), capacity)
+        self._hashes = _Column(self._file("hashes.bin"), np.uint64, (), capacity)
+        # Zero means live, so indexes written before deletes existed load as-is
+        self._deleted = _Column(self._file("deleted.bin"), np.uint8, (), capacity)
+        self._codes = {
+            f: _Column(self._file(f"{f}.codes"), np.int32, (), capacity)
+            for f in CATEGORICAL_FIELDS
+        }
+        self._text = _TextHeap(self._file("text.bin"))
+
+        deleted = self._deleted.data[: self._count]
+        self._row_of = {
+            int(pid): row
+            for row, pid in enumerate(self._ids.data[: self._count])
+            if not deleted[row]
+        }
+
+    # ---- PUBLIC INTERFACE (matches QdrantVectorStore) ----
+    @timed("upsert")
+    async def upsert_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        embeddings: List[List[float]],
+    ) -> int:
+        if not chunks:
+            return 0
+        return await asyncio.to_thread(self._upsert, chunks, embeddings)
+
+    @timed("search")
+    async def search(
+        self,
+        query_embedding: List[float],
+        limit: int = 8,
+        with_vectors: bool = False,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self._search, query_embedding, limit, with_vectors, filters
+        )
+
+    @timed("search")
+    async def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        limit: int = 8,
+        with_vectors: bool = False,
+        filters: Optional[Filters] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        if not query_embeddings:
+            return []
+        return await asyncio.to_thread(
+            self._search_many, query_embeddings, limit, with_vectors, filters
+        )
+
+    async def hydrate(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Texts are always returned with hits
+        return hits
+
+    async def get_source_hashes(self, source: str) -> Dict[int, str]:
+        """position -> chunk_hash for every live chunk of a source."""
+        return await asyncio.to_thread(self._source_hashes, source)
+
+    async def delete_positions(self, source: str, positions: Iterable[int]) -> int:
+        """Tombstone the given chunk positions of a source."""
+        positions = list(positions)
+        if not positions:
+            return 0
+        return await asyncio.to_thread(self._delete, source, positions)
+
+    async def warmup(self) -> None:
+        # Columns are already mapped in __init__
+        pass
+
+    async def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._text.close()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    # ---- WRITES ----
+    def _upsert(
+        self,
+        chunks: List[Dict[str, Any]],
+        embeddings: List[List[float]],
+    ) -> int:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+
+        with self._lock:
+            count = self._count
+            rows = np.empty(len(chunks), dtype=np.int64)
+            pids = np.empty(len(chunks), dtype=np.uint64)
+
+            for i, chunk in enumerate(chunks):
+                pid = point_id(chunk["source"], chunk["position"])
+                row = self._row_of.get(pid)
+                if row is None:
+                    row = count
+                    count += 1
+                    self._row_of[pid] = row
+                rows[i] = row
+                pids[i] = pid
+
+            for column in self._columns():
+                column.ensure(count)
+
+            self._vectors.data[rows] = vectors.astype(self.dtype, copy=False)
+            self._ids.data[rows] = pids
+            self._positions.data[rows] = [c["position"] for c in chunks]
+            self._spans.data[rows] = self._text.append([c["text"] for c in chunks])
+            self._hashes.data[rows] = [
+                int(c.get("chunk_hash") or chunk_hash(c), 16) for c in chunks
+            ]
+            self._deleted.data[rows] = 0
+            for f in CATEGORICAL_FIELDS:
+                self._codes[f].data[rows] = [self._encode(f, c.get(f)) for c in chunks]
+
+            # Publish new rows only once they are fully written
+            self._count = count
+            self._flush()
+
+        return len(chunks)
+
+    def _delete(self, source: str, positions: List[int]) -> int:
+        with self._lock:
+            rows = [
+                row
+                for row in (self._row_of.pop(point_id(source, p), None) for p in positions)
+                if row is not None
+            ]
+            if rows:
+                self._deleted.data[rows] = 1
+                self._flush()
+        return len(rows)
+
+    def _encode(self, field: str, value: Any) -> int:
+        value = "" if value is None else str(value)
+        code = self._vocab_index[field].get(value)
+        if code is None:
+            code = len(self._vocab[field])
+            self._vocab[field].append(value)
+            self._vocab_index[field][value] = code
+        return code
+
+    # ---- READS ----
+    def _source_hashes(self, source: str) -> Dict[int, str]:
+        code = self._vocab_index["source"].get(source)
+        if code is None:
+            return {}
+
+        with self._lock:
+            n = self._count
+            rows = np.flatnonzero(
+                (self._codes["source"].data[:n] == code)
+                & (self._deleted.data[:n] == 0)
+            )
+            positions = self._positions.data[rows]
+            hashes = self._hashes.data[rows]
+
+        return {int(p): f"{int(h):016x}" for p, h in zip(positions, hashes)}
+
+    def _filter_rows(self, n: int, filters: Filters) -> np.ndarray:
+        """Live rows among the first n whose payload matches every filter."""
+        mask = self._deleted.data[:n] == 0
+        for field, values in filters.items():
+            codes = [
+                self._vocab_index[field][v]
+                for v in values
+                if v in self._vocab_index[field]
+            ]
+            if not codes:
+                return np.empty(0, dtype=np.int64)
+            mask &= np.isin(self._codes[field].data[:n], codes)
+        return np.flatnonzero(mask)
+
+    def _search(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        with_vectors: bool,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._search_many([query_embedding], limit, with_vectors, filters)[0]
+
+    def _search_many(
+        self,
+        query_embeddings: List[List[float]],
+        limit: int,
+        with_vectors: bool,
+        filters: Optional[Filters] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Scores every query in one pass over the rows: each block of the
+        matrix is read once and multiplied by all queries, and only each
+        block's top `limit` per query is kept.
+        """
+        n = self._count
+        matrix = self._vectors.data
+        if n == 0 or limit <= 0:
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+
+        rows = self._filter_rows(n, filters) if filters else np.arange(n)
+        deleted = self._deleted.data[:n] != 0
+
+        best_scores, best_rows = [], []
+        for start in range(0, len(rows), SEARCH_BLOCK):
+            block_rows = rows[start:start + SEARCH_BLOCK]
+            if filters:
+                block = queries @ matrix[block_rows].astype(np.float32, copy=False).T
+            else:
+                end = start + len(block_rows)
+                block = queries @ matrix[start:end].astype(np.float32, copy=False).T
+                block[:, deleted[start:end]] = -np.inf
+
+            k = min(limit, len(block_rows))
+            if k < len(block_rows):
+                top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                block = np.take_along_axis(block, top, axis=1)
+                block_rows = block_rows[top]
+            else:
+                block_rows = np.broadcast_to(block_rows, block.shape)
+            best_scores.append(block)
+            best_rows.append(block_rows)
+
+        if not best_scores:
+            return [[] for _ in query_embeddings]
+        scores = np.concatenate(best_scores, axis=1)
+        candidates = np.concatenate(best_rows, axis=1)
+
+        return [
+            self._top_hits(scores[q], candidates[q], limit, with_vectors)
+            for q in range(len(queries))
+        ]
+
+    def _top_hits(
+        self,
+        scores: np.ndarray,
+        rows: np.ndarray,
+        limit: int,
+        with_vectors: bool,
+    ) -> List[Dict[str, Any]]:
+        order = np.argsort(-scores, kind="stable")[:limit]
+
+        hits = []
+        for i in order:
+            if scores[i] == -np.inf:
+                # Fewer live rows than limit
+                break
+            row = rows[i]
+            start, end = self._spans.data[row]
+            hit = {
+                "id": int(self._ids.data[row]),
+                "score": float(scores[i]),
+                "text": self._text.read(int(start), int(end)),
+                "position": int(self._positions.data[row]),
+            }
+            for f in CATEGORICAL_FIELDS:
+                hit[f] = self._vocab[f][self._codes[f].data[row]]
+            if with_vectors:
+                hit["vector"] = self._vectors.data[row].astype(np.float32)
+            hits.append(hit)
+
+        return hits
+
+    # ---- PERSISTENCE ----
+    def _columns(self) -> List[_Column]:
+        return [
+            self._vectors, self._ids, self._positions, self._spans,
+            self._hashes, self._deleted, *self._codes.values(),
+        ]
+
+    def _file(self, name: str) -> Optional[str]:
+        return os.path.join(self._dir, name) if self._dir else None
+
+    def _load_meta(self) -> Optional[Dict[str, Any]]:
+        path = self._file("meta.json")
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _flush(self) -> None:
+        if self._dir is None:
+            return
+
+        self._text.flush()
+        for column in self._columns():
+            column.flush()
+
+        # meta.json is written last and atomically: it defines the valid rows
+        meta = {
+            "dimension": self.dimension,
+            "dtype": self.dtype.name,
+            "count": self._count,
+            "capacity": self._vectors.capacity,
+            "vocab": self._vocab,
+        }
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file("meta.json"))
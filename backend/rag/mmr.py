@@ -0,0 +1,53 @@
+"""
+Maximal Marginal Relevance selection over candidate vectors.
+Vectorized with NumPy; similarity rows are only computed for the
+k selected candidates rather than the full fetch_k x fetch_k matrix.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Pick k candidate indices balancing relevance and diversity.
+
+    lambda_mult=1.0 is pure relevance, 0.0 is pure diversity.
+    """
+    if k <= 0 or len(candidate_embeddings) == 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+
+    # ---- COSINE SIMILARITIES ----
+    query = query / (np.linalg.norm(query) or 1.0)
+    norms = np.linalg.norm(candidates, axis=1, keepdims=True)
+    candidates = candidates / np.where(norms == 0, 1.0, norms)
+
+    relevance = candidates @ query
+
+    k = min(k, len(candidates))
+    first = int(np.argmax(relevance))
+    selected = [first]
+
+    # Highest similarity of every candidate to anything already selected
+    max_sim = candidates @ candidates[first]
+    taken = np.zeros(len(candidates), dtype=bool)
+    taken[first] = True
+
+    for _ in range(1, k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        scores[taken] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        taken[idx] = True
+        np.maximum(max_sim, candidates @ candidates[idx], out=max_sim)
+
+    return selected
@@ -4,52 +4,306 @@ LLM: Groq (LLaMA 3.1)
 Strictly grounded answers with explicit citations.
 """
 
+import math
 import os
 import re
-from typing import List, Dict, Any
-from groq import Groq
+import time
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import httpx
+from groq import AsyncGroq
+from rag.admission import ProviderLimiter
+from rag.chunking import split_sentences
+from rag.context import ContextPacker
+from rag.lexical import tokenize
+from rag.telemetry import timed, record_llm_usage
+
+
+NO_ANSWER = "No answer found in provided documents."
+
+CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+
+SYSTEM_PROMPT = ("""
+          You are a retrieval-grounded assistant.
+
+            STRICT RULES:
+            1. Use ONLY the provided chunks as evidence.
+            2. Do NOT copy references, citations, or bracketed numbers that appear inside the source text. The ONLY allowed citations are chunk numbers you add yourself: [1], [2], [3], etc.
+            3. When you use information from chunk i, cite it ONLY as [i].
+            4. If multiple chunks support a sentence, use multiple citations like [1][2].
+            5. Paraphrase where possible; do not quote long passages verbatim.
+            6. If the answer is not at all contained /related to text in the chunks, say:
+            "No answer found in provided documents.
+            """
+)
 
 
 class QAGenerator:
     """
     Generates answers from retrieved chunks using Groq.
-    Enforces grounding and structured citations.
+    Enforces grounding and structured citations. Chunks are packed into
+    token-budgeted context blocks first; citations refer to blocks.
     """
 
-    def __init__(self, api_key: str = None):
-        api_key = api_key or os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY not set")
+    def __init__(
+        self,
+        api_key: str = None,
+        client: Any = None,
+        packer: Optional[ContextPacker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        limiter: Optional[ProviderLimiter] = None,
+        completion_tokens_estimate: int = 256,
+    ):
+        if client is None:
+            api_key = api_key or os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("GROQ_API_KEY not set")
+            if transport is not None:
+                # Retries and timeouts come from the shared transport
+                client = AsyncGroq(
+                    api_key=api_key,
+                    http_client=httpx.AsyncClient(transport=transport),
+                    max_retries=0,
+                )
+            else:
+                client = AsyncGroq(api_key=api_key)
 
-        self.client = Groq(api_key=api_key)
+        self.client = client
         self.model = "llama-3.1-8b-instant"
+        self.packer = packer or ContextPacker()
+        # Token quotas count the completion too, which is unknown up front
+        self.limiter = limiter
+        self.completion_tokens_estimate = completion_tokens_estimate
 
-    def generate_answer(
+    @timed("generate")
+    async def generate_answer(
         self,
         query: str,
-        chunks: List[Dict[str, Any]]
+        chunks: List[Dict[str, Any]],
+        max_context_tokens: Optional[int] = None,
     ) -> Dict[str, Any]:
 
         # ---- SAFETY ----
         if not chunks:
             return {
-                "answer": "No answer found in provided documents.",
+                "answer": NO_ANSWER,
+                "citations": [],
+                "sources": [],
+                "usage": {},
+                "packing": {},
+            }
+
+        indexed_chunks, packing = self._pack(query, chunks, max_context_tokens)
+
+        # ---- LLM CALL ----
+        await self._acquire(packing)
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(query, indexed_chunks),
+            temperature=0.0,
+        )
+
+        answer = response.choices[0].message.content.strip()
+        citations, sources = self._build_citations(answer, indexed_chunks)
+
+        usage = self._usage(response.usage)
+        record_llm_usage(usage)
+
+        # ---- GUARANTEED SCHEMA ----
+        return {
+            "answer": answer,
+            "citations": citations,
+            "sources": sources,
+            "usage": usage,
+            "packing": packing,
+        }
+
+    @timed("generate")
+    async def stream_answer(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        max_context_tokens: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the answer as events:
+          {"type": "token", "text": ...} as Groq produces tokens,
+          {"type": "citation", "citation": {...}} when a new [n] marker appears,
+          {"type": "done", "answer", "citations", "sources", "usage", "packing",
+           "ttft_ms"} last.
+        """
+        if not chunks:
+            yield {"type": "token", "text": NO_ANSWER}
+            yield {
+                "type": "done",
+                "answer": NO_ANSWER,
+                "citations": [],
+                "sources": [],
+                "usage": {},
+                "packing": {},
+                "ttft_ms": 0.0,
+            }
+            return
+
+        indexed_chunks, packing = self._pack(query, chunks, max_context_tokens)
+        by_index = {c["chunk_index"]: c for c in indexed_chunks}
+
+        start = time.perf_counter()
+        ttft_ms = None
+        parts: List[str] = []
+        emitted = set()
+        usage = {}
+
+        await self._acquire(packing)
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(query, indexed_chunks),
+            temperature=0.0,
+            stream=True,
+        )
+
+        async for event in stream:
+            # Groq reports usage on the final chunk under x_groq
+            x_groq = getattr(event, "x_groq", None)
+            if isinstance(x_groq, dict):
+                x_groq_usage = x_groq.get("usage")
+            else:
+                x_groq_usage = getattr(x_groq, "usage", None)
+            if x_groq_usage:
+                usage = self._usage(x_groq_usage)
+
+            if not event.choices:
+                continue
+            text = event.choices[0].delta.content
+            if not text:
+                continue
+
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            parts.append(text)
+            yield {"type": "token", "text": text}
+
+            # Markers can straddle tokens, so scan the tail of the answer
+            tail = "".join(parts[-4:])
+            for match in CITATION_PATTERN.finditer(tail):
+                num = int(match.group(1))
+                if num in by_index and num not in emitted:
+                    emitted.add(num)
+                    yield {
+                        "type": "citation",
+                        "citation": self._citation(num, by_index[num]),
+                    }
+
+        answer = "".join(parts).strip()
+        citations, sources = self._build_citations(answer, indexed_chunks)
+        if not usage:
+            # One streamed delta is roughly one token
+            usage = {"completion_tokens": len(parts), "estimated": True}
+        record_llm_usage(usage)
+
+        yield {
+            "type": "done",
+            "answer": answer,
+            "citations": citations,
+            "sources": sources,
+            "usage": usage,
+            "packing": packing,
+            "ttft_ms": round(ttft_ms or 0.0, 2),
+        }
+
+    def extractive_answer(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        max_sentences: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Answer without the LLM, for when it cannot answer in time: the context
+        sentences sharing the most terms with the question, in context order,
+        each cited with its block number. Same schema as generate_answer.
+        """
+        if not chunks:
+            return {
+                "answer": NO_ANSWER,
                 "citations": [],
-                "sources": []
+                "sources": [],
+                "usage": {},
+                "packing": {},
             }
 
-        # ---- INDEX CHUNKS EXPLICITLY ----
-        indexed_chunks = []
-        for i, chunk in enumerate(chunks, start=1):
-            indexed_chunks.append({
-                "chunk_index": i,
-                "text": chunk["text"],
-                "source": chunk["source"],        
-                "section": chunk.get("section", "unknown"),
-                "position": chunk.get("position", -1),
-            })
+        indexed_chunks, packing = self._pack(query, chunks)
+        terms = set(tokenize(query))
+
+        sentences = [
+            (rank, i, sentence, block["chunk_index"], terms & set(tokenize(sentence)))
+            for rank, block in enumerate(indexed_chunks)
+            for i, sentence in enumerate(split_sentences(block["text"]))
+        ]
+        # Terms in every sentence ("what", "the") carry no weight
+        df = {t: sum(t in s[4] for s in sentences) for t in terms}
+        idf = {t: math.log(len(sentences) / df[t]) for t in terms if df[t]}
 
+        scored = []
+        for rank, i, sentence, num, overlap in sentences:
+            weight = sum(idf[t] for t in overlap)
+            # Ties go to better-ranked blocks, then earlier sentences
+            scored.append((-weight, rank, i, sentence, num))
 
+        picked = sorted(sorted(scored)[:max_sentences], key=lambda s: (s[1], s[2]))
+        answer = " ".join(_cite(sentence, num) for _, _, _, sentence, num in picked)
+        citations, sources = self._build_citations(answer, indexed_chunks)
+
+        return {
+            "answer": answer or NO_ANSWER,
+            "citations": citations,
+            "sources": sources,
+            "usage": {},
+            "packing": packing,
+        }
+
+    async def _acquire(self, packing: Dict[str, Any]) -> None:
+        if self.limiter is not None:
+            await self.limiter.acquire(
+                "llm",
+                tokens=packing["prompt_tokens_after_packing"] + self.completion_tokens_estimate,
+            )
+
+    @staticmethod
+    def _usage(usage: Any) -> Dict[str, int]:
+        """Token counts from a Groq usage object or dict."""
+        if usage is None:
+            return {}
+        if not isinstance(usage, dict):
+            usage = usage.model_dump()
+        return {
+            k: usage[k]
+            for k in ("prompt_tokens", "completion_tokens", "total_tokens")
+            if usage.get(k) is not None
+        }
+
+    # ---- PROMPT ----
+    def _pack(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        max_tokens: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Indexed context blocks plus prompt token counts before/after packing."""
+        indexed_chunks, packing = self.packer.pack(chunks, max_tokens)
+
+        # System prompt, question and instructions are the same either way
+        fixed = sum(
+            self.packer.count_tokens(m["content"])
+            for m in self._build_messages(query, [])
+        )
+        packing["prompt_tokens_before_packing"] = fixed + packing["context_tokens_before"]
+        packing["prompt_tokens_after_packing"] = fixed + packing["context_tokens_after"]
+        return indexed_chunks, packing
+
+    @staticmethod
+    def _build_messages(
+        query: str,
+        indexed_chunks: List[Dict[str, Any]]
+    ) -> List[Dict[str, str]]:
         # ---- BUILD CONTEXT ----
         context_blocks = []
         for c in indexed_chunks:
@@ -59,44 +313,37 @@ class QAGenerator:
 
         context = "\n\n".join(context_blocks)
 
-        # ---- PROMPTS ----
-        system_prompt = ("""
-          You are a retrieval-grounded assistant.
-
-            STRICT RULES:
-            1. Use ONLY the provided chunks as evidence.
-            2. Do NOT copy references, citations, or bracketed numbers that appear inside the source text. The ONLY allowed citations are chunk numbers you add yourself: [1], [2], [3], etc.
-            3. When you use information from chunk i, cite it ONLY as [i].
-            4. If multiple chunks support a sentence, use multiple citations like [1][2].
-            5. Paraphrase where possible; do not quote long passages verbatim.
-            6. If the answer is not at all contained /related to text in the chunks, say:
-            "No answer found in provided documents.
-            """
-
-
-        )
-
         user_prompt = (
             f"Context:\n{context}\n\n"
             f"Question: {query}\n\n"
             "Answer concisely with inline citations."
         )
 
-        # ---- LLM CALL ----
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.0,
-        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ]
 
-        answer = response.choices[0].message.content.strip()
+    # ---- CITATIONS ----
+    @staticmethod
+    def _citation(num: int, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "number": num,
+            "chunk_index": chunk["chunk_index"],
+            "source": chunk["source"],
+            "section": chunk["section"],
+            "position": chunk["position"],
+            "excerpt": chunk["text"][:300].strip() + "..."
+        }
 
+    def _build_citations(
+        self,
+        answer: str,
+        indexed_chunks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         # ---- EXTRACT CITATION NUMBERS ----
         citation_numbers = sorted(
-            set(int(n) for n in re.findall(r"\[(\d+)\]", answer))
+            set(int(n) for n in CITATION_PATTERN.findall(answer))
         )
 
         citations = []
@@ -112,27 +359,35 @@ class QAGenerator:
             if not chunk:
                 continue
 
-            citations.append({
-                "number": num,
-                "chunk_index": chunk["chunk_index"],
-                "source": chunk["source"],
-                "section": chunk["section"],
-                "position": chunk["position"],
-                "excerpt": chunk["text"][:300].strip() + "..."
-            })
-
-            src_key = (chunk["source"], chunk["section"], chunk["position"])
-            if src_key not in seen_sources:
-                seen_sources.add(src_key)
-                sources.append({
-                    "source": chunk["source"],
-                    "section": chunk["section"],
-                    "position": chunk["position"]
-                })
+            citations.append(self._citation(num, chunk))
 
-        # ---- GUARANTEED SCHEMA ----
-        return {
-            "answer": answer,
-            "citations": citations,   
-            "sources": sources        
-        }
+            # A merged block cites every chunk it was built from
+            for position in chunk.get("positions", [chunk["position"]]):
+                src_key = (chunk["source"], chunk["section"], position)
+                if src_key not in seen_sources:
+                    seen_sources.add(src_key)
+                    sources.append({
+                        "source": chunk["source"],
+                        "section": chunk["section"],
+                        "position": position
+                    })
+
+        return citations, sources
+
+    async def warmup(self) -> None:
+        """
+        List the provider's models once. The GET opens a pooled connection
+        that the first request reuses, and a rejected API key fails here.
+        """
+        await self.client.models.list()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def _cite(sentence: str, num: int) -> str:
+    """Append [num] inside the sentence's closing punctuation."""
+    sentence = sentence.strip()
+    if sentence[-1:] in ".!?":
+        return f"{sentence[:-1]} [{num}]{sentence[-1]}"
+    return f"{sentence} [{num}]"
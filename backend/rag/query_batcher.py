@@ -0,0 +1,133 @@
+"""
+Cross-request micro-batching of query embeddings.
+Concurrent queries are collected for up to max_wait_ms (or until
+max_batch_size are waiting) and embedded with one upstream call.
+"""
+
+import asyncio
+import contextvars
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from rag.embeddings import EmbeddingGenerator
+from rag.telemetry import QUERY_BATCH_SIZE, record_stage, stage
+
+
+class QueryEmbeddingBatcher:
+    """
+    Sits in front of EmbeddingGenerator.embed(mode="query").
+    Queries already in the in-memory embedding cache skip the window.
+    """
+
+    def __init__(
+        self,
+        embedding_generator: EmbeddingGenerator,
+        max_wait_ms: float = 3.0,
+        max_batch_size: int = 32,
+        timeout_s: float = 10.0,
+    ):
+        self.embedding_generator = embedding_generator
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.timeout_s = timeout_s
+
+        # (query, future, enqueued_at) waiting for the next flush
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # ---- COUNTERS ----
+        self.batches = 0
+        self.batched_queries = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.wait_ms = 0.0
+
+    async def embed(self, query: str) -> List[float]:
+        cached = self.embedding_generator.peek(query, mode="query")
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_detached()
+        elif self._timer is None:
+            # Flushes run outside any request's context so one caller's
+            # stage breakdown is not charged for the shared upstream call
+            self._timer = loop.call_later(
+                self.max_wait_ms / 1000,
+                self._flush,
+                context=contextvars.Context(),
+            )
+
+        with stage("query_embed"):
+            try:
+                vector, waited = await asyncio.wait_for(
+                    asyncio.shield(future), self.timeout_s
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                future.cancel()
+                raise
+
+        record_stage("query_batch_wait", waited)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "batched_queries": self.batched_queries,
+            "mean_batch_size": (
+                round(self.batched_queries / self.batches, 2) if self.batches else 0.0
+            ),
+            "mean_wait_ms": (
+                round(self.wait_ms / self.batched_queries, 3)
+                if self.batched_queries else 0.0
+            ),
+            "cache_hits": self.cache_hits,
+            "timeouts": self.timeouts,
+        }
+
+    # ---- FLUSHING ----
+    def _flush_detached(self) -> None:
+        contextvars.Context().run(self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        # Callers that already timed out are dropped
+        batch = [item for item in batch if not item[1].done()]
+        if batch:
+            # The loop only keeps weak references to tasks
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        flushed_at = time.perf_counter()
+        texts = list(dict.fromkeys(query for query, _, _ in batch))
+
+        self.batches += 1
+        self.batched_queries += len(batch)
+        QUERY_BATCH_SIZE.observe(len(texts))
+        self.wait_ms += sum(flushed_at - t for _, _, t in batch) * 1000
+
+        try:
+            vectors = await self.embedding_generator.embed(texts, mode="query")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, vectors))
+        for query, future, enqueued_at in batch:
+            if not future.done():
+                future.set_result((by_text[query], flushed_at - enqueued_at))
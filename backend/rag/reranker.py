@@ -1,58 +1,232 @@
 """
 Cohere Rerank v3 for reranking retrieved chunks.
+Adaptive: a clear vector-score winner skips the remote call, an
+in-process overlap scorer orders the candidates first, and only the
+uncertain middle around the top_n cut-off is sent to Cohere, within a
+latency budget.
 """
 
+import asyncio
+import math
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import cohere
+import httpx
+from rag.admission import ProviderLimiter
+from rag.cohere_http import CohereHTTPClient
+from rag.lexical import tokenize
+from rag.telemetry import RERANK_PATH, timed, record_error, stage
+
+
+# Final-order paths, counted per request
+RERANK_PATHS = ("skipped", "local", "remote", "throttled", "timeout", "error")
+
+
+def local_scores(
+    query: str,
+    chunks: List[Dict[str, Any]],
+    lexical_weight: float = 0.5,
+) -> List[float]:
+    """
+    Cheap relevance in [0, 1]: the IDF-weighted share of query terms a chunk
+    contains (IDF over the candidates), blended with the min-max normalized
+    vector score. Chunks without a vector score (lexical-only hits) get 0
+    for that part.
+    """
+    terms = set(tokenize(query))
+    doc_terms = [set(tokenize(c.get("text", ""))) for c in chunks]
+
+    n = len(chunks)
+    idf = {}
+    for term in terms:
+        df = sum(term in d for d in doc_terms)
+        idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    total_idf = sum(idf.values()) or 1.0
+    overlap = [sum(idf[t] for t in terms & d) / total_idf for d in doc_terms]
+
+    dense = [c.get("score") for c in chunks]
+    known = [s for s in dense if s is not None]
+    lo, hi = (min(known), max(known)) if known else (0.0, 0.0)
+    span = (hi - lo) or 1.0
+    dense = [0.0 if s is None else (s - lo) / span for s in dense]
+
+    return [
+        lexical_weight * o + (1 - lexical_weight) * d
+        for o, d in zip(overlap, dense)
+    ]
 
 
 class CohereReranker:
     """
     Reranks chunks using Cohere rerank-english-v3.0.
+
+    Paths, in order:
+    - skipped: the top vector score leads the runner-up by `skip_margin`.
+      The winner is kept first and the rest are ordered locally.
+    - local: after the local pass no candidate is close to the top_n
+      cut-off, so there is nothing for Cohere to decide.
+    - remote: candidates within `uncertain_margin` of the cut-off score go
+      to Cohere. Clear winners stay ahead of them and clear losers are dropped.
+    - throttled: the rerank quota is used up for now, so the request is not
+      sent (it would only draw a 429). The local order is used.
+    - timeout / error: Cohere did not answer within the budget or failed.
+      The local order is used.
     """
 
     def __init__(
         self,
         api_key: str = None,
         model: str = "rerank-english-v3.0",
-        top_n: int = 4
+        top_n: int = 4,
+        client: Any = None,
+        adaptive: bool = True,
+        skip_margin: float = 0.1,
+        uncertain_margin: float = 0.15,
+        lexical_weight: float = 0.5,
+        budget_ms: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        limiter: Optional[ProviderLimiter] = None,
     ):
-        api_key = api_key or os.getenv("COHERE_API_KEY")
-        if not api_key:
-            raise ValueError("COHERE_API_KEY not set")
+        if client is None:
+            api_key = api_key or os.getenv("COHERE_API_KEY")
+            if not api_key:
+                raise ValueError("COHERE_API_KEY not set")
+            if transport is not None:
+                client = CohereHTTPClient(api_key, transport)
+            else:
+                client = cohere.AsyncClient(api_key)
 
-        self.client = cohere.Client(api_key)
+        self.client = client
         self.model = model
         self.top_n = top_n
+        self.adaptive = adaptive
+        self.skip_margin = skip_margin
+        self.uncertain_margin = uncertain_margin
+        self.lexical_weight = lexical_weight
+        self.budget_ms = budget_ms
+        self.limiter = limiter
+
+        self.paths = {path: 0 for path in RERANK_PATHS}
+        self.remote_documents = 0
 
-    def rerank(
+    @timed("rerank")
+    async def rerank(
         self,
         query: str,
-        chunks: List[Dict[str, Any]]
+        chunks: List[Dict[str, Any]],
+        metrics: Optional[Dict[str, Any]] = None,
+        budget_ms: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
-
+        """
+        Top `top_n` chunks. `budget_ms` overrides the default latency budget
+        for this request; None waits for Cohere indefinitely.
+        """
         if not chunks:
             return []
 
-        texts = [c["text"] for c in chunks]
+        scores = local_scores(query, chunks, self.lexical_weight)
+        # Stable sort: ties keep retrieval order
+        order = sorted(range(len(chunks)), key=lambda i: -scores[i])
+        ranked = [{**chunks[i], "local_score": round(scores[i], 4)} for i in order]
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+
+        if not self.adaptive:
+            head, middle = [], ranked
+        else:
+            winner = self._clear_winner(chunks)
+            if winner is not None:
+                first = ranked.pop(order.index(winner))
+                result = [first] + ranked[: self.top_n - 1]
+                return self._done("skipped", result, metrics, sent=0)
+
+            head, middle = self._split(ranked)
+            if not middle or len(head) >= self.top_n:
+                return self._done("local", ranked[: self.top_n], metrics, sent=0)
+
+        fallback = ranked[: self.top_n]
+        if self.limiter is not None and not self.limiter.try_acquire("rerank"):
+            return self._done("throttled", fallback, metrics, sent=0)
 
         try:
-            response = self.client.rerank(
-                model=self.model,
-                query=query,
-                documents=texts,
-                top_n=min(self.top_n, len(texts)),
-            )
+            with stage("rerank_remote"):
+                response = await asyncio.wait_for(
+                    self.client.rerank(
+                        model=self.model,
+                        query=query,
+                        documents=[c["text"] for c in middle],
+                        top_n=min(self.top_n - len(head), len(middle)),
+                    ),
+                    timeout=budget_ms / 1000 if budget_ms is not None else None,
+                )
+        except asyncio.TimeoutError as e:
+            record_error("rerank", e)
+            return self._done("timeout", fallback, metrics, sent=len(middle))
         except Exception as e:
-            # Fail gracefully: return original ranking
+            # Fail gracefully: fall back to the local order
+            record_error("rerank", e)
             print(f"[WARN] Cohere rerank failed: {e}")
-            return chunks[: self.top_n]
+            return self._done("error", fallback, metrics, sent=len(middle))
 
-        reranked = []
+        reranked = list(head)
         for r in response.results:
-            c = chunks[r.index].copy()
+            c = middle[r.index].copy()
             c["rerank_score"] = r.relevance_score
             reranked.append(c)
 
-        return reranked
+        return self._done("remote", reranked, metrics, sent=len(middle))
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.paths.values())
+        return {
+            "paths": dict(self.paths),
+            "remote_share": round(self.paths["remote"] / total, 4) if total else 0.0,
+            "remote_documents": self.remote_documents,
+        }
+
+    async def warmup(self) -> None:
+        """Open the provider connection (TLS, key check) before the first request."""
+        await self.client.check_api_key()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    # ---- DECISIONS ----
+    def _clear_winner(self, chunks: List[Dict[str, Any]]) -> Optional[int]:
+        """Index of the chunk whose vector score leads by skip_margin, if any."""
+        if len(chunks) == 1:
+            return 0
+        dense = sorted(
+            (i for i, c in enumerate(chunks) if c.get("score") is not None),
+            key=lambda i: chunks[i]["score"],
+            reverse=True,
+        )
+        if len(dense) < 2:
+            return None
+        if chunks[dense[0]]["score"] - chunks[dense[1]]["score"] < self.skip_margin:
+            return None
+        return dense[0]
+
+    def _split(self, ranked: List[Dict[str, Any]]):
+        """Clear winners, then candidates within uncertain_margin of the cut-off."""
+        cutoff = ranked[min(self.top_n, len(ranked)) - 1]["local_score"]
+        head = [c for c in ranked if c["local_score"] >= cutoff + self.uncertain_margin]
+        middle = [
+            c for c in ranked
+            if abs(c["local_score"] - cutoff) < self.uncertain_margin
+        ]
+        return head, middle
+
+    def _done(
+        self,
+        path: str,
+        result: List[Dict[str, Any]],
+        metrics: Optional[Dict[str, Any]],
+        sent: int,
+    ) -> List[Dict[str, Any]]:
+        self.paths[path] += 1
+        self.remote_documents += sent
+        RERANK_PATH.labels(path).inc()
+        if metrics is not None:
+            metrics["rerank_path"] = path
+            metrics["rerank_sent"] = sent
+        return result
@@ -1,26 +1,223 @@
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from rag.filters import Filters
 from rag.vectorstore import QdrantVectorStore
 from rag.embeddings import EmbeddingGenerator
+from rag.lexical import BM25Index
+from rag.mmr import mmr_select
+from rag.query_batcher import QueryEmbeddingBatcher
+from rag.telemetry import stage
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Dict[str, Any]]],
+    limit: int,
+    rrf_k: int = 60,
+) -> List[Dict[str, Any]]:
+    """Merge ranked hit lists by sum of 1 / (rrf_k + rank), keyed on point id."""
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            entry = fused.get(hit["id"])
+            if entry is None:
+                entry = fused[hit["id"]] = {**hit, "rrf_score": 0.0}
+            else:
+                # Keep the first list's payload, add the other list's scores
+                for key, value in hit.items():
+                    entry.setdefault(key, value)
+            entry["rrf_score"] += 1.0 / (rrf_k + rank)
+
+    ranked = sorted(fused.values(), key=lambda h: h["rrf_score"], reverse=True)
+    return ranked[:limit]
 
 
 class MMRRetriever:
+    """
+    Dense retrieval with optional Maximal Marginal Relevance.
+    With MMR on, fetch_k candidates are over-fetched with their vectors
+    and k diverse ones are kept. In hybrid mode a BM25 lookup runs
+    concurrently with the dense branch and both are fused with RRF.
+    An optional QueryEmbeddingBatcher coalesces concurrent query embeddings.
+    """
+
     def __init__(
         self,
         vectorstore: QdrantVectorStore,
         embedding_generator: EmbeddingGenerator,
         k: int = 8,
+        use_mmr: bool = False,
+        fetch_k: int = 32,
+        lambda_mult: float = 0.5,
+        lexical_index: Optional[BM25Index] = None,
+        hybrid: bool = False,
+        rrf_k: int = 60,
+        query_batcher: Optional[QueryEmbeddingBatcher] = None,
     ):
         self.vectorstore = vectorstore
         self.embedding_generator = embedding_generator
         self.k = k
+        self.use_mmr = use_mmr
+        self.fetch_k = max(fetch_k, k)
+        self.lambda_mult = lambda_mult
+        self.lexical_index = lexical_index
+        self.hybrid = hybrid and lexical_index is not None
+        self.rrf_k = rrf_k
+        self.query_batcher = query_batcher
 
-    def retrieve(self, query: str) -> List[Dict[str, Any]]:
-        query_embedding = self.embedding_generator.embed(
+    async def embed_query(self, query: str) -> List[float]:
+        if self.query_batcher is not None:
+            return await self.query_batcher.embed(query)
+
+        embeddings = await self.embedding_generator.embed(
             [query],
             mode="query"
-        )[0]
+        )
+        return embeddings[0]
+
+    async def retrieve(
+        self,
+        query: str,
+        metrics: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k chunks for a query. `filters` (see normalize_filters) restrict
+        both branches to matching payloads before top-k, not after.
+        """
+        if not self.hybrid:
+            hits = await self._dense(query, query_embedding, metrics, filters)
+        else:
+            # Both branches run concurrently; latency is the slower of the two
+            dense, lexical = await asyncio.gather(
+                self._dense(query, query_embedding, metrics, filters),
+                self._lexical(query, metrics, filters),
+            )
+
+            hits = reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
+            if metrics is not None:
+                metrics["lexical_hits"] = len(lexical)
+
+        # With a text side store only the final k hits fetch their text
+        return await self.vectorstore.hydrate(hits)
+
+    async def retrieve_lexical(
+        self,
+        query: str,
+        metrics: Optional[Dict[str, Any]] = None,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        """BM25 hits only, without an embedding; [] when there is no lexical index."""
+        if self.lexical_index is None:
+            return []
+        hits = await self._lexical(query, metrics, filters)
+        if metrics is not None:
+            metrics["lexical_hits"] = len(hits)
+        return await self.vectorstore.hydrate(hits)
+
+    async def retrieve_batch(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        metrics: Optional[List[Dict[str, Any]]] = None,
+        filters: Optional[Filters] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        retrieve() for many queries at once: one batched vector search for
+        all of them, then MMR, BM25 and fusion per query.
+        """
+        if not queries:
+            return []
+        metrics = metrics or [None] * len(queries)
 
-        return self.vectorstore.search(
+        batches = await self.vectorstore.search_batch(
+            query_embeddings,
+            limit=self.fetch_k if self.use_mmr else self.k,
+            with_vectors=self.use_mmr,
+            filters=filters,
+        )
+        dense = [
+            self._select(embedding, candidates, m) if self.use_mmr else candidates
+            for embedding, candidates, m in zip(query_embeddings, batches, metrics)
+        ]
+
+        if not self.hybrid:
+            results = dense
+        else:
+            lexical = await asyncio.gather(*(
+                self._lexical(q, m, filters) for q, m in zip(queries, metrics)
+            ))
+            results = []
+            for d, lex, m in zip(dense, lexical, metrics):
+                results.append(reciprocal_rank_fusion([d, lex], self.k, self.rrf_k))
+                if m is not None:
+                    m["lexical_hits"] = len(lex)
+
+        # One side-store read for every query's hits
+        await self.vectorstore.hydrate([hit for hits in results for hit in hits])
+        return results
+
+    async def _lexical(
+        self,
+        query: str,
+        metrics: Optional[Dict[str, Any]],
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        with stage("lexical"):
+            return await asyncio.to_thread(
+                self.lexical_index.search, query, self.k, filters
+            )
+
+    async def _dense(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]],
+        metrics: Optional[Dict[str, Any]],
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        if query_embedding is None:
+            query_embedding = await self.embed_query(query)
+
+        if not self.use_mmr:
+            return await self.vectorstore.search(
+                query_embedding=query_embedding,
+                limit=self.k,
+                filters=filters,
+            )
+
+        candidates = await self.vectorstore.search(
             query_embedding=query_embedding,
-            limit=self.k,
+            limit=self.fetch_k,
+            with_vectors=True,
+            filters=filters,
         )
+
+        return self._select(query_embedding, candidates, metrics)
+
+    def _select(
+        self,
+        query_embedding: List[float],
+        candidates: List[Dict[str, Any]],
+        metrics: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """MMR over candidates fetched with their vectors."""
+        # Decoding JSON vectors into a matrix is part of search cost, not MMR
+        vectors = np.asarray(
+            [c.pop("vector") for c in candidates],
+            dtype=np.float32,
+        )
+
+        with stage("mmr"):
+            selected = mmr_select(
+                query_embedding,
+                vectors,
+                k=self.k,
+                lambda_mult=self.lambda_mult,
+            )
+        if metrics is not None:
+            metrics["mmr_candidates"] = len(candidates)
+
+        return [candidates[i] for i in selected]
@@ -0,0 +1,212 @@
+"""
+Per-stage latency instrumentation.
+Prometheus histograms, in-flight gauges and error counters per pipeline
+stage, plus a per-request breakdown collected through a context variable.
+"""
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Callable, Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+
+# Upstream calls range from sub-millisecond (local index) to tens of seconds
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+STAGE_LATENCY = Histogram(
+    "rag_stage_latency_seconds",
+    "Latency of each pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_IN_FLIGHT = Gauge(
+    "rag_stage_in_flight",
+    "Calls currently inside each pipeline stage",
+    ["stage"],
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors_total",
+    "Errors raised or recovered from in each stage",
+    ["stage", "error"],
+)
+REQUEST_LATENCY = Histogram(
+    "rag_request_latency_seconds",
+    "End-to-end latency per route",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ["kind"],
+)
+QUERY_BATCH_SIZE = Histogram(
+    "rag_query_embed_batch_size",
+    "Queries per micro-batched embedding call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+RERANK_PATH = Counter(
+    "rag_rerank_path_total",
+    "Rerank requests by the path that produced the final order",
+    ["path"],
+)
+PROVIDER_RETRIES = Counter(
+    "rag_provider_retries_total",
+    "Provider HTTP attempts that were retried, by stage and reason",
+    ["stage", "reason"],
+)
+PROVIDER_HEDGES = Counter(
+    "rag_provider_hedges_total",
+    "Hedged provider requests by stage and which copy answered first",
+    ["stage", "winner"],
+)
+QUERY_DEGRADATIONS = Counter(
+    "rag_query_degradations_total",
+    "Queries that degraded to stay within their latency budget, by kind",
+    ["kind"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "rag_admission_queue_depth",
+    "Requests waiting for admission, by priority",
+    ["priority"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "rag_admission_in_flight",
+    "Admitted requests currently running",
+)
+ADMISSION_WAIT = Histogram(
+    "rag_admission_wait_seconds",
+    "Time from arrival to admission, by priority",
+    ["priority"],
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_SHED = Counter(
+    "rag_admission_shed_total",
+    "Requests rejected with 429 by admission control, by priority and reason",
+    ["priority", "reason"],
+)
+
+# Stage name -> accumulated ms for the current request
+_breakdown: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "rag_stage_breakdown", default=None
+)
+
+
+def start_request() -> Dict[str, float]:
+    """Begin collecting a stage breakdown for the current request/task."""
+    breakdown: Dict[str, float] = {}
+    _breakdown.set(breakdown)
+    return breakdown
+
+
+def _record(name: str, seconds: float) -> None:
+    STAGE_LATENCY.labels(name).observe(seconds)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        key = f"{name}_ms"
+        breakdown[key] = round(breakdown.get(key, 0.0) + seconds * 1000, 3)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a duration measured outside stage()/timed(), e.g. queueing time."""
+    _record(name, seconds)
+
+
+def record_error(name: str, exc: BaseException) -> None:
+    """Count an upstream error, including ones that were retried or swallowed."""
+    STAGE_ERRORS.labels(name, type(exc).__name__).inc()
+
+
+def record_llm_usage(usage: Dict[str, Any]) -> None:
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(kind.split("_")[0]).inc(usage[kind])
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one observation of `name`."""
+    STAGE_IN_FLIGHT.labels(name).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(name, e)
+        raise
+    finally:
+        _record(name, time.perf_counter() - start)
+        STAGE_IN_FLIGHT.labels(name).dec()
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorate a coroutine, function, generator or async generator as a stage.
+    Sync generators are timed only while producing items, so time spent
+    by the consumer is not attributed to the stage.
+    """
+    def decorator(fn: Callable) -> Callable:
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def async_gen_wrapper(*args, **kwargs):
+                with stage(name):
+                    async for item in fn(*args, **kwargs):
+                        yield item
+            return async_gen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                iterator = fn(*args, **kwargs)
+                busy = 0.0
+                STAGE_IN_FLIGHT.labels(name).inc()
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            busy += time.perf_counter() - start
+                        yield item
+                except Exception as e:
+                    record_error(name, e)
+                    raise
+                finally:
+                    iterator.close()
+                    _record(name, busy)
+                    STAGE_IN_FLIGHT.labels(name).dec()
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> tuple:
+    """Prometheus exposition payload and content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
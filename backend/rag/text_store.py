@@ -0,0 +1,72 @@
+"""
+Compressed chunk-text side store.
+Keeps chunk text out of the vector collection payload: texts live in a
+local SQLite file, zlib-compressed and keyed by point ID, and are read
+only for the hits that survive retrieval.
+"""
+
+import sqlite3
+import threading
+import zlib
+from typing import List, Dict, Iterable
+
+
+class CompressedTextStore:
+    """point ID -> chunk text. Safe to call from worker threads."""
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS texts "
+            "(id INTEGER PRIMARY KEY, body BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def put_many(self, texts: Dict[int, str]) -> None:
+        rows = [
+            # SQLite integers are signed 64-bit; point IDs are unsigned
+            (self._key(pid), zlib.compress(text.encode("utf-8"), self.level))
+            for pid, text in texts.items()
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO texts (id, body) VALUES (?, ?)", rows
+            )
+            self._db.commit()
+
+    def get_many(self, pids: Iterable[int]) -> Dict[int, str]:
+        pids = list(pids)
+        if not pids:
+            return {}
+        keys = {self._key(pid): pid for pid in pids}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, body FROM texts WHERE id IN ({placeholders})",
+                list(keys),
+            ).fetchall()
+        return {keys[k]: zlib.decompress(body).decode("utf-8") for k, body in rows}
+
+    def delete_many(self, pids: Iterable[int]) -> None:
+        rows = [(self._key(pid),) for pid in pids]
+        with self._lock:
+            self._db.executemany("DELETE FROM texts WHERE id = ?", rows)
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM texts"
+            ).fetchone()
+        return {"texts": count, "compressed_bytes": stored}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _key(pid: int) -> int:
+        return pid - (1 << 64) if pid >= (1 << 63) else pid
@@ -0,0 +1,247 @@
+"""
+Shared HTTP transport for every provider call.
+One keep-alive connection pool serves Cohere, Groq and Qdrant. Each
+component sends through a stage transport that applies the stage's
+connect/read timeouts and retries failed attempts with jittered
+exponential backoff. Idempotent stages can opt in to hedging: once a
+request has been outstanding for the stage's p95 latency, a second copy
+is sent and whichever answers first is used.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+import httpx
+
+from rag.telemetry import PROVIDER_HEDGES, PROVIDER_RETRIES, record_error
+
+
+# Statuses that mean "try again", not "your request is wrong"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# The request never reached the server, so resending is always safe
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Latency samples kept per stage for the hedge delay
+LATENCY_WINDOW = 256
+
+
+class StageTransport(httpx.AsyncBaseTransport):
+    """
+    A stage's view of the shared pool; pass it as an httpx client's
+    transport. Closing it leaves the pool open (see ProviderTransport.aclose).
+    """
+
+    def __init__(
+        self,
+        owner: "ProviderTransport",
+        name: str,
+        connect_s: float,
+        read_s: float,
+        idempotent: bool,
+        hedge: bool,
+        hedge_paths: Tuple[str, ...],
+    ):
+        self.owner = owner
+        self.name = name
+        self.timeout = httpx.Timeout(read_s, connect=connect_s, pool=connect_s).as_dict()
+        self.idempotent = idempotent
+        self.hedge = hedge and idempotent
+        # Empty: every request may be hedged
+        self.hedge_paths = hedge_paths
+
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = {"primary": 0, "hedge": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # Stage timeouts win over whatever the SDK asked for
+        request.extensions["timeout"] = self.timeout
+        # Buffer the body so it can be resent
+        await request.aread()
+        self.requests += 1
+
+        delay = self.hedge_delay() if self._hedgeable(request) else None
+        if delay is None:
+            return await self._send(request)
+        return await self._hedged(request, delay)
+
+    async def aclose(self) -> None:
+        # SDK clients close their transport; the pool outlives them
+        pass
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 of recent latencies in seconds, once there are enough samples."""
+        if len(self._latencies) < self.owner.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedging": self.hedge,
+            "hedges": self.hedges,
+            "hedge_wins": dict(self.hedge_wins),
+            "p95_ms": round(delay * 1000, 1) if delay is not None else None,
+        }
+
+    def _hedgeable(self, request: httpx.Request) -> bool:
+        if not self.hedge:
+            return False
+        return not self.hedge_paths or any(p in request.url.path for p in self.hedge_paths)
+
+    # ---- RETRIES ----
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        retries = self.owner.retries
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = await self.owner.pool.handle_async_request(request)
+            except httpx.TransportError as e:
+                record_error(self.name, e)
+                if attempt == retries or not self._retryable(e):
+                    raise
+                reason = type(e).__name__
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    if response.status_code < 400:
+                        self._latencies.append(time.perf_counter() - start)
+                    return response
+                reason = str(response.status_code)
+                delay = self._backoff(attempt, response.headers.get("retry-after"))
+                await response.aclose()
+
+            self.retries += 1
+            PROVIDER_RETRIES.labels(self.name, reason).inc()
+            await asyncio.sleep(delay)
+
+    def _retryable(self, exc: httpx.TransportError) -> bool:
+        # A read timeout may mean the server acted; only idempotent stages resend
+        return isinstance(exc, UNSENT_ERRORS) or self.idempotent
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        cap = self.owner.backoff_max
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), cap)
+            except ValueError:
+                pass  # HTTP-date form: fall back to backoff
+        delay = min(cap, self.owner.backoff_base * (2 ** attempt))
+        # Equal jitter: at least half the delay, spread over the other half
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    # ---- HEDGING ----
+    async def _hedged(self, request: httpx.Request, delay: float) -> httpx.Response:
+        primary = asyncio.ensure_future(self._send(request))
+        copies = {primary: "primary"}
+        pending = {primary}
+        winner = None
+        error: Optional[BaseException] = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._send(request))
+            copies[hedge] = "hedge"
+            pending.add(hedge)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        # Both answered in the same tick
+                        await task.result().aclose()
+        finally:
+            # Also runs when the caller gives up (e.g. a rerank budget)
+            for task in pending:
+                task.cancel()
+
+        if winner is None:
+            raise error
+        self.hedge_wins[copies[winner]] += 1
+        PROVIDER_HEDGES.labels(self.name, copies[winner]).inc()
+        return winner.result()
+
+
+class ProviderTransport:
+    """
+    Owns the connection pool. stage() hands out per-stage transports;
+    client() wraps one in an httpx.AsyncClient.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 64,
+        max_keepalive: int = 32,
+        keepalive_s: float = 30.0,
+        retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        hedge_min_samples: int = 20,
+        pool: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.pool = pool or httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_s,
+            ),
+        )
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_min_samples = hedge_min_samples
+        self.stages: Dict[str, StageTransport] = {}
+
+    def stage(
+        self,
+        name: str,
+        connect_s: float = 3.0,
+        read_s: float = 10.0,
+        idempotent: bool = True,
+        hedge: bool = False,
+        hedge_paths: Tuple[str, ...] = (),
+    ) -> StageTransport:
+        if name not in self.stages:
+            self.stages[name] = StageTransport(
+                self, name, connect_s, read_s, idempotent, hedge, hedge_paths
+            )
+        return self.stages[name]
+
+    def client(
+        self,
+        name: str,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        **policy: Any,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            transport=self.stage(name, **policy),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+
+
+def parse_stages(value: str) -> List[str]:
+    """"embed, search" -> ["embed", "search"]"""
+    return [s.strip() for s in value.split(",") if s.strip()]
@@ -1,91 +1,394 @@
+import asyncio
+import hashlib
 import os
 import uuid
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from typing import List, Dict, Any, Iterable, Optional
+import httpx
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    MatchAny,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SearchRequest,
+    PointStruct,
+    VectorParams,
+)
+from rag.admission import ProviderLimiter
+from rag.filters import FILTER_FIELDS, Filters
+from rag.telemetry import timed
+from rag.text_store import CompressedTextStore
+
+
+def point_id(source: str, position: int) -> int:
+    """Stable 64-bit point ID so re-ingesting a source overwrites its chunks."""
+    return uuid.uuid5(
+        uuid.NAMESPACE_DNS,
+        f"{source}::{position}",
+    ).int >> 64
+
+
+# Payload fields besides the text that a re-ingest must rewrite when they change
+HASHED_FIELDS = ("title", "section", "token_count")
+
+
+def chunk_hash(chunk: Dict[str, Any]) -> str:
+    """
+    64-bit hash (16 hex chars) of a chunk's text and filterable metadata,
+    used to skip unchanged chunks.
+    """
+    digest = hashlib.blake2b(chunk["text"].encode("utf-8"), digest_size=8)
+    for field in HASHED_FIELDS:
+        digest.update(b"\x00" + str(chunk.get(field)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+QUANTIZATION_MODES = ("scalar", "binary")
 
 
 class QdrantVectorStore:
+    """
+    Compact mode, all optional:
+    - quantization: "scalar" (int8) or "binary" vectors kept in RAM for the
+      HNSW walk; the top limit * oversampling candidates are rescored with
+      the original vectors.
+    - on_disk: original vectors (and the HNSW graph) are memory-mapped from
+      disk instead of held in RAM.
+    - hnsw_m / hnsw_ef_construct / search_ef: graph degree, build-time and
+      query-time beam width.
+    - text_store: chunk text goes to a local compressed side store instead of
+      the payload and is fetched by hydrate() for the final hits only.
+    - transport: REST calls go through this (shared pool, timeouts,
+      retries). Ignored for embedded Qdrant.
+    - limiter: searches wait for the "search" request quota.
+    """
+
     def __init__(
         self,
         url: str = None,
         api_key: str = None,
         collection_name: str = None,
         recreate: bool = False,
+        location: str = None,
+        quantization: Optional[str] = None,
+        oversampling: float = 2.0,
+        on_disk: bool = False,
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construct: Optional[int] = None,
+        search_ef: Optional[int] = None,
+        text_store: Optional[CompressedTextStore] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        limiter: Optional[ProviderLimiter] = None,
     ):
+        if quantization and quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization {quantization!r}; use one of {QUANTIZATION_MODES}"
+            )
+
         url = url or os.getenv("QDRANT_URL")
         api_key = api_key or os.getenv("QDRANT_API_KEY")
+        location = location or os.getenv("QDRANT_LOCATION")
         self.collection_name = collection_name or "mini_rag_docs"
 
         self.dimension = 1024  # Cohere embeddings
-        self.client = QdrantClient(url=url, api_key=api_key)
+        if location == ":memory:":
+            # Embedded Qdrant, no server needed
+            self.client = AsyncQdrantClient(location=location)
+        elif location:
+            self.client = AsyncQdrantClient(path=location)
+        else:
+            # Extra keyword arguments go to the client's httpx.AsyncClient
+            extra = {"transport": transport} if transport is not None else {}
+            self.client = AsyncQdrantClient(url=url, api_key=api_key, **extra)
 
-        if recreate:
-            self.client.recreate_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=self.dimension,
-                    distance=Distance.COSINE,
-                ),
+        self.quantization = quantization or None
+        self.oversampling = oversampling
+        self.on_disk = on_disk
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.search_ef = search_ef
+        self.text_store = text_store
+        self.limiter = limiter
+
+        # Collection setup needs the event loop, so it runs on first use
+        self.recreate = recreate
+        self._collection_ready = False
+        self._collection_lock = None
+
+    async def _ensure_collection(self) -> None:
+        if self._collection_ready:
+            return
+
+        if self._collection_lock is None:
+            self._collection_lock = asyncio.Lock()
+
+        async with self._collection_lock:
+            if self._collection_ready:
+                return
+
+            vectors_config = VectorParams(
+                size=self.dimension,
+                distance=Distance.COSINE,
+                on_disk=self.on_disk or None,
             )
-            try:
-                self.client.get_collection(self.collection_name)
-            except Exception:
-                self.client.create_collection(
+            compact_config = {
+                "hnsw_config": self._hnsw_config(),
+                "quantization_config": self._quantization_config(),
+            }
+
+            if self.recreate:
+                await self.client.recreate_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.dimension,
-                        distance=Distance.COSINE,
-                    ),
+                    vectors_config=vectors_config,
+                    **compact_config,
+                )
+            else:
+                try:
+                    await self.client.get_collection(self.collection_name)
+                except Exception:
+                    await self.client.create_collection(
+                        collection_name=self.collection_name,
+                        vectors_config=vectors_config,
+                        **compact_config,
+                    )
+                else:
+                    # Existing collections pick up HNSW and quantization
+                    # changes; the server rebuilds segments in the background
+                    if any(compact_config.values()):
+                        try:
+                            await self.client.update_collection(
+                                collection_name=self.collection_name,
+                                **compact_config,
+                            )
+                        except Exception as e:
+                            print(f"[WARN] Could not update collection config: {e}")
+
+            # Keyword indexes let filtered searches use the HNSW graph
+            # instead of scanning, and back per-source lookups and deletes
+            for field in FILTER_FIELDS:
+                try:
+                    await self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field,
+                        field_schema=PayloadSchemaType.KEYWORD,
+                    )
+                except Exception as e:
+                    print(f"[WARN] Could not create payload index on {field}: {e}")
+
+            self._collection_ready = True
+
+    def _hnsw_config(self) -> Optional[HnswConfigDiff]:
+        if not (self.hnsw_m or self.hnsw_ef_construct or self.on_disk):
+            return None
+        return HnswConfigDiff(
+            m=self.hnsw_m,
+            ef_construct=self.hnsw_ef_construct,
+            on_disk=self.on_disk or None,
+        )
+
+    def _quantization_config(self):
+        # Quantized vectors stay in RAM even when the originals are on disk
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True,
                 )
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
 
+    def _search_params(self) -> Optional[SearchParams]:
+        if not (self.quantization or self.search_ef):
+            return None
+        return SearchParams(
+            hnsw_ef=self.search_ef,
+            quantization=QuantizationSearchParams(
+                rescore=True,
+                oversampling=self.oversampling,
+            ) if self.quantization else None,
+        )
 
-    def upsert_chunks(
+    @timed("upsert")
+    async def upsert_chunks(
         self,
         chunks: List[Dict[str, Any]],
         embeddings: List[List[float]],
     ) -> int:
+        await self._ensure_collection()
+
         points = []
+        texts = {}
         for chunk, emb in zip(chunks, embeddings):
-            pid = uuid.uuid5(
-                uuid.NAMESPACE_DNS,
-                f"{chunk['source']}::{chunk['position']}",
-            ).int >> 64
-
-            points.append(
-                PointStruct(
-                    id=pid,
-                    vector=emb,
-                    payload={
-                        "text": chunk["text"],
-                        "source": chunk.get("source"),         
-                        "position": chunk.get("position"),
-                    },
-                )
-            )
+            pid = point_id(chunk["source"], chunk["position"])
+            payload = {
+                "source": chunk.get("source"),
+                "title": chunk.get("title"),
+                "section": chunk.get("section"),
+                "position": chunk.get("position"),
+                "token_count": chunk.get("token_count"),
+                "chunk_hash": chunk.get("chunk_hash") or chunk_hash(chunk),
+            }
+            if self.text_store is None:
+                payload["text"] = chunk["text"]
+            else:
+                texts[pid] = chunk["text"]
+
+            points.append(PointStruct(id=pid, vector=emb, payload=payload))
 
-        self.client.upsert(
+        # Texts land first so a searchable point always has its text
+        if texts:
+            await asyncio.to_thread(self.text_store.put_many, texts)
+
+        await self.client.upsert(
             collection_name=self.collection_name,
             points=points,
         )
         return len(points)
 
-    def search(
+    @timed("search")
+    async def search(
         self,
         query_embedding: List[float],
         limit: int = 8,
+        with_vectors: bool = False,
+        filters: Optional[Filters] = None,
     ) -> List[Dict[str, Any]]:
-        results = self.client.search(
+        await self._ensure_collection()
+        if self.limiter is not None:
+            await self.limiter.acquire("search")
+
+        results = await self.client.search(
             collection_name=self.collection_name,
             query_vector=query_embedding,
+            query_filter=self._to_filter(filters),
+            search_params=self._search_params(),
             limit=limit,
+            with_vectors=with_vectors,
         )
 
-        return [
-            {
-                "id": r.id,
-                "score": r.score,
-                **r.payload,
-            }
-            for r in results
-        ]
+        return [self._to_hit(r, with_vectors) for r in results]
+
+    @timed("search")
+    async def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        limit: int = 8,
+        with_vectors: bool = False,
+        filters: Optional[Filters] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """One search per embedding, sent to Qdrant as a single request."""
+        if not query_embeddings:
+            return []
+        await self._ensure_collection()
+        if self.limiter is not None:
+            await self.limiter.acquire("search")
+
+        query_filter = self._to_filter(filters)
+        params = self._search_params()
+        results = await self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                SearchRequest(
+                    vector=embedding,
+                    filter=query_filter,
+                    params=params,
+                    limit=limit,
+                    with_payload=True,
+                    with_vector=with_vectors,
+                )
+                for embedding in query_embeddings
+            ],
+        )
+        return [[self._to_hit(r, with_vectors) for r in batch] for batch in results]
+
+    @staticmethod
+    def _to_hit(result, with_vectors: bool) -> Dict[str, Any]:
+        hit = {
+            "id": result.id,
+            "score": result.score,
+            **result.payload,
+        }
+        if with_vectors:
+            hit["vector"] = result.vector
+        return hit
+
+    async def hydrate(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill in text for hits whose payload does not carry it."""
+        missing = [h["id"] for h in hits if "text" not in h]
+        if self.text_store is None or not missing:
+            return hits
+
+        texts = await asyncio.to_thread(self.text_store.get_many, missing)
+        for hit in hits:
+            if "text" not in hit:
+                hit["text"] = texts.get(hit["id"], "")
+        return hits
+
+    @staticmethod
+    def _to_filter(filters: Optional[Filters]) -> Optional[Filter]:
+        if not filters:
+            return None
+        conditions = []
+        for field, values in filters.items():
+            match = MatchValue(value=values[0]) if len(values) == 1 else MatchAny(any=values)
+            conditions.append(FieldCondition(key=field, match=match))
+        return Filter(must=conditions)
+
+    async def get_source_hashes(self, source: str) -> Dict[int, str]:
+        """position -> chunk_hash for every stored chunk of a source."""
+        await self._ensure_collection()
+
+        source_filter = self._to_filter({"source": [source]})
+        hashes = {}
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=source_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=["position", "chunk_hash"],
+                with_vectors=False,
+            )
+            for p in points:
+                hashes[p.payload["position"]] = p.payload.get("chunk_hash")
+            if offset is None:
+                return hashes
+
+    async def delete_positions(self, source: str, positions: Iterable[int]) -> int:
+        """Delete the given chunk positions of a source in one request."""
+        ids = [point_id(source, p) for p in positions]
+        if not ids:
+            return 0
+
+        await self._ensure_collection()
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=ids),
+        )
+        if self.text_store is not None:
+            await asyncio.to_thread(self.text_store.delete_many, ids)
+        return len(ids)
+
+    async def warmup(self) -> None:
+        """Connect and set up the collection before the first request."""
+        await self._ensure_collection()
+
+    async def close(self) -> None:
+        await self.client.close()
+        if self.text_store is not None:
+            self.text_store.close()
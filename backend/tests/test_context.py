@@ -0,0 +1,29 @@
+from rag.context import ContextPacker
+
+
+def _chunk(text, position, source="doc.pdf"):
+    return {"text": text, "source": source, "section": "main", "position": position}
+
+
+def test_over_long_first_sentence_is_cut_to_budget():
+    packer = ContextPacker(max_tokens=3000)
+    # PDF-extracted text: no sentence terminators, well over the budget
+    long_text = " ".join(f"word{i} value{i}" for i in range(2000))
+    chunks = [_chunk(long_text, 0), _chunk("A short second chunk.", 5)]
+
+    blocks, stats = packer.pack(chunks)
+
+    assert stats["context_blocks"] >= 1
+    assert 0 < stats["context_tokens_after"] <= 3000
+    assert blocks[0]["text"]
+
+
+def test_over_long_first_sentence_with_small_budget_override():
+    packer = ContextPacker(max_tokens=3000)
+    sentence = " ".join(f"term{i}" for i in range(500)) + "."
+    assert packer.count_tokens(sentence) > 400
+
+    blocks, stats = packer.pack([_chunk(sentence, 0)], max_tokens=400)
+
+    assert stats["context_blocks"] == 1
+    assert 0 < stats["context_tokens_after"] <= 400
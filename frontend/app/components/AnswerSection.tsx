@@ -11,7 +11,11 @@ interface Citation {
 
 interface Metrics {
   latency_ms: number
-  token_estimate: number
+  ttft_ms?: number
+  prompt_tokens: number
+  completion_tokens: number
+  total_tokens: number
+  tokens_estimated?: boolean
   retrieved_chunks: number
 }
 
@@ -21,6 +25,7 @@ interface AnswerResult {
   sources?: any[]
   metrics?: Metrics
   error?: string
+  streaming?: boolean
 }
 
 export default function AnswerSection({ result }: { result: AnswerResult }) {
@@ -51,6 +56,7 @@ export default function AnswerSection({ result }: { result: AnswerResult }) {
 
       <div className="answer-panel">
         {renderAnswerWithCitations(result.answer)}
+        {result.streaming && <span className="cursor">▍</span>}
       </div>
 
       {/* METRICS */}
@@ -61,8 +67,17 @@ export default function AnswerSection({ result }: { result: AnswerResult }) {
         </div>
 
         <div className="metric">
-          <span className="metric-label">Token Estimate</span>
-          <span>{metrics ? metrics.token_estimate : '—'}</span>
+          <span className="metric-label">First Token</span>
+          <span>{metrics?.ttft_ms !== undefined ? `${metrics.ttft_ms.toFixed(1)} ms` : '—'}</span>
+        </div>
+
+        <div className="metric">
+          <span className="metric-label">Tokens</span>
+          <span>
+            {metrics
+              ? `${metrics.total_tokens}${metrics.tokens_estimated ? ' (est.)' : ''}`
+              : '—'}
+          </span>
         </div>
 
         <div className="metric">
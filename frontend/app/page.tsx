@@ -17,7 +17,7 @@ export default function Home() {
     setQueryResult(null)
     
     try {
-      const response = await fetch(`${API_URL}/query`, {
+      const response = await fetch(`${API_URL}/query/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -25,12 +25,47 @@ export default function Home() {
         body: JSON.stringify({ q: query }),
       })
       
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`Query failed: ${response.statusText}`)
       }
       
-      const data = await response.json()
-      setQueryResult(data)
+      let result: any = { answer: '', citations: [], streaming: true }
+      setQueryResult(result)
+
+      // Server-Sent Events: blocks separated by a blank line,
+      // each with an "event:" and a "data:" line
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+
+        const blocks = buffer.split('\n\n')
+        buffer = blocks.pop() ?? ''
+
+        for (const block of blocks) {
+          const event = block.match(/^event: (.*)$/m)?.[1]
+          const data = block.match(/^data: (.*)$/m)?.[1]
+          if (!event || data === undefined) continue
+          const payload = JSON.parse(data)
+
+          if (event === 'token') {
+            result = { ...result, answer: result.answer + payload.text }
+          } else if (event === 'citation') {
+            result = { ...result, citations: [...result.citations, payload] }
+          } else if (event === 'metrics') {
+            result = { ...result, metrics: payload }
+          } else if (event === 'done') {
+            result = { ...result, streaming: false }
+          } else if (event === 'error') {
+            result = { ...result, error: payload.detail, streaming: false }
+          }
+          setQueryResult(result)
+        }
+      }
     } catch (error: any) {
       setQueryResult({ error: error.message })
     } finally {
@@ -80,7 +115,10 @@ export default function Home() {
       // // #region agent log
       // fetch('http://https://mini-rag-4b08.onrender.com/ingest',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({location:'page.tsx:77',message:'Response parsed successfully',data:{count:data.count,collection_name:data.collection_name},timestamp:Date.now(),sessionId:'debug-session',runId:'run1',hypothesisId:'M'})}).catch(()=>{});
       // // #endregion
-      setUploadStatus(`Successfully ingested ${data.count} chunks into collection "${data.collection_name}"`)
+      setUploadStatus(
+        `Successfully ingested ${data.count} chunks into collection "${data.collection_name}"` +
+          ` (${data.added ?? 0} added, ${data.updated ?? 0} updated, ${data.skipped ?? 0} unchanged, ${data.deleted ?? 0} removed)`
+      )
     } catch (error: any) {
       // // #region agent log
       // fetch('http://https://mini-rag-4b08.onrender.com/ingest',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({location:'page.tsx:81',message:'Error in handleUpload',data:{errorMessage:error.message,errorType:error.constructor.name},timestamp:Date.now(),sessionId:'debug-session',runId:'run1',hypothesisId:'N'})}).catch(()=>{});